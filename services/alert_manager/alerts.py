@@ -1,23 +1,21 @@
-from datetime import datetime, timezone, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from datetime import datetime
 from twilio.rest import Client
 import logging
 from typing import Dict, Any
+from services.alert_manager.outbox import digest_window, enqueue_notifications
+from services.alert_manager.smtp_pool import build_message, get_smtp_pool, split_addresses
+from services.alert_manager.throttle import alert_throttle
 from services.common.config import get_settings
 from services.common.database import get_db
-from services.common.models import Alert, Prediction, Site
+from services.common.models import Alert, AlertConfig, Prediction, Site
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 class AlertManager:
     def __init__(self):
-        self.smtp_server = settings.SMTP_SERVER
-        self.smtp_port = settings.SMTP_PORT
-        self.smtp_user = settings.SMTP_USER
-        self.smtp_password = settings.SMTP_PASSWORD
+        self.sender = settings.SMTP_FROM
+        self.throttle = alert_throttle
         
         self.twilio_client = Client(
             settings.TWILIO_ACCOUNT_SID,
@@ -26,19 +24,18 @@ class AlertManager:
         self.twilio_from = settings.TWILIO_FROM_NUMBER
 
     def send_email(self, subject: str, body: str, to_email: str) -> bool:
-        """Send email alert"""
+        """Send email alert to one or more comma-separated addresses"""
+        recipients = split_addresses(to_email)
+        if not recipients:
+            logger.warning("No email recipients")
+            return False
+
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_user
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
+            msg = build_message(subject, body, self.sender, recipients)
+            # Reuses an authenticated connection from the pool
+            refused = get_smtp_pool().send(msg)
+            if refused:
+                logger.warning(f"Email recipients refused: {', '.join(refused)}")
             
             return True
             
@@ -85,35 +82,16 @@ Please take appropriate precautions and monitor the situation.
 --
 Rockfall Prediction System
 """,
-            "sms_body": f"🪨 ALERT: {risk_level} rockfall risk ({prob}) detected at {site.name}. Check email for details."
+            "sms_body": f"🪨 ALERT: {risk_level} rockfall risk ({prob}) detected at {site.name}. Check email for details.",
+            "summary": f"{risk_level} risk ({prob}) at {site.name}"
         }
 
-    def should_alert(self, site_id: str, risk_level: str, db) -> bool:
-        """Check if alert should be sent based on throttling rules"""
-        throttle_minutes = {
-            "HIGH": settings.ALERT_THROTTLE_HIGH,
-            "MEDIUM": settings.ALERT_THROTTLE_MEDIUM,
-            "LOW": 0  # Don't alert for low risk
-        }
-        
-        if risk_level == "LOW":
-            return False
-            
-        cutoff_time = datetime.now(timezone.utc) - timedelta(
-            minutes=throttle_minutes[risk_level]
-        )
-        
-        recent_alert = db.query(Alert).filter(
-            Alert.site_id == site_id,
-            Alert.risk_level == risk_level,
-            Alert.created_at >= cutoff_time,
-            Alert.status == "sent"
-        ).first()
-        
-        return recent_alert is None
+    def should_alert(self, site_id: str, risk_level: str, db=None) -> bool:
+        """Check if alert should be sent based on throttling rules (a memory lookup)"""
+        return self.throttle.allows(str(site_id), risk_level)
 
     def process_prediction(self, prediction_id: str):
-        """Process a new prediction and send alerts if needed"""
+        """Process a new prediction and queue alert notifications if needed"""
         with get_db() as db:
             try:
                 # Get prediction details
@@ -131,59 +109,46 @@ Rockfall Prediction System
                     logger.error(f"Site not found for prediction {prediction_id}")
                     return
                 
-                # Check throttling
-                if not self.should_alert(site.id, prediction.risk_level, db):
+                # Check throttling and reserve the window in one step
+                created_at = datetime.utcnow()
+                if not self.throttle.acquire(str(site.id), prediction.risk_level, created_at):
                     logger.info(f"Alert throttled for {site.name}")
                     return
                 
-                # Create alert record
-                alert = Alert(
-                    prediction_id=prediction.id,
-                    site_id=site.id,
-                    risk_level=prediction.risk_level,
-                    status="pending",
-                    channels=["email", "sms"]
-                )
-                db.add(alert)
-                db.commit()
-                
                 try:
-                    # Format messages
+                    config = db.query(AlertConfig).filter(AlertConfig.site_id == site.id).first()
                     messages = self.format_alert_message(prediction, site)
                     
-                    # Send alerts
-                    email_success = self.send_email(
-                        messages["email_subject"],
-                        messages["email_body"],
-                        site.contact_email
+                    # The alert and its notifications commit together; the
+                    # outbox dispatcher sends them, so a crash cannot lose one
+                    alert = Alert(
+                        prediction_id=prediction.id,
+                        site_id=site.id,
+                        risk_level=prediction.risk_level,
+                        status="pending",
+                        created_at=created_at
                     )
+                    db.add(alert)
+                    db.flush()
                     
-                    sms_success = self.send_sms(
-                        messages["sms_body"],
-                        site.contact_phone
+                    # Below HIGH, notifications wait to go out in a per-recipient digest
+                    alert.channels = enqueue_notifications(
+                        db, alert, config, messages, window=digest_window(prediction.risk_level)
                     )
-                    
-                    # Update alert status
-                    if email_success and sms_success:
-                        alert.status = "sent"
-                        alert.sent_at = datetime.now(timezone.utc)
-                    else:
+                    if not alert.channels:
                         alert.status = "error"
-                        alert.error_message = "Failed to send some notifications"
-                    
-                    db.commit()
-                    
-                    if alert.status == "sent":
-                        logger.info(f"Alert sent successfully for {site.name}")
-                    else:
-                        logger.warning(f"Partial alert delivery for {site.name}")
-                    
-                except Exception as e:
-                    alert.status = "error"
-                    alert.error_message = str(e)
+                        alert.error_message = "No alert recipients configured"
                     db.commit()
+                except Exception:
+                    self.throttle.release(str(site.id), prediction.risk_level, created_at)
                     raise
                 
+                if alert.channels:
+                    logger.info(f"Alert queued for {site.name} via {', '.join(alert.channels)}")
+                else:
+                    self.throttle.release(str(site.id), prediction.risk_level, created_at)
+                    logger.warning(f"No alert recipients configured for {site.name}")
+                
             except Exception as e:
                 logger.error("Error processing prediction", extra={
                     "prediction_id": prediction_id,
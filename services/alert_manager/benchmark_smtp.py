@@ -0,0 +1,59 @@
+import argparse
+import smtplib
+import time
+from typing import Callable, List
+from services.alert_manager.smtp_pool import SMTPPool, build_message
+from services.alert_manager.smtp_standin import StandInSMTPServer
+
+
+def one_connection_per_message(server: StandInSMTPServer, alerts: List[List[str]], per_recipient: bool):
+    """The previous senders: connect and log in for every message"""
+    for recipients in alerts:
+        for batch in ([[address] for address in recipients] if per_recipient else [recipients]):
+            with smtplib.SMTP("127.0.0.1", server.port) as smtp:
+                smtp.login("alerts", "secret")
+                smtp.send_message(build_message("Rockfall alert", "body", "alerts@example.org", batch))
+
+
+def pooled(size: int) -> Callable:
+    def run(server: StandInSMTPServer, alerts: List[List[str]]):
+        pool = SMTPPool("127.0.0.1", server.port, "alerts", "secret", starttls=False, size=size)
+        futures = [
+            pool.submit(build_message("Rockfall alert", "body", "alerts@example.org", recipients))
+            for recipients in alerts
+        ]
+        for future in futures:
+            future.result()
+        pool.close()
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert email throughput against a local SMTP stand-in")
+    parser.add_argument("--alerts", type=int, default=200)
+    parser.add_argument("--recipients", type=int, default=3, help="Recipients per alert")
+    parser.add_argument("--connect-delay", type=float, default=0.05, help="Simulated TLS + AUTH handshake, seconds")
+    parser.add_argument("--message-delay", type=float, default=0.002, help="Simulated server time per message, seconds")
+    args = parser.parse_args()
+
+    alerts = [[f"ops{r}@site{a}.example.org" for r in range(args.recipients)] for a in range(args.alerts)]
+    runs = [
+        ("per recipient, new conn", lambda server, alerts: one_connection_per_message(server, alerts, True)),
+        ("per alert, new conn", lambda server, alerts: one_connection_per_message(server, alerts, False)),
+        ("pooled x1", pooled(1)),
+        ("pooled x4", pooled(4)),
+        ("pooled x8", pooled(8))
+    ]
+
+    print(f"{args.alerts} alerts x {args.recipients} recipients, handshake {args.connect_delay * 1000:.0f} ms")
+    print(f"{'sender':26s} {'seconds':>8s} {'alerts/s':>9s} {'messages':>9s} {'connections':>12s}")
+    for label, run in runs:
+        with StandInSMTPServer(args.connect_delay, args.message_delay) as server:
+            started = time.perf_counter()
+            run(server, alerts)
+            elapsed = time.perf_counter() - started
+            print(f"{label:26s} {elapsed:8.2f} {args.alerts / elapsed:9.1f} {len(server.messages):9d} {server.connections:12d}")
+
+
+if __name__ == "__main__":
+    main()
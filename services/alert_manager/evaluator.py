@@ -0,0 +1,180 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import func, select
+from services.common.config import get_settings
+from services.common.database import get_db
+from services.common.metrics import registry
+from services.common.models import AlertConfig
+
+settings = get_settings()
+
+alert_configs = AlertConfig.__table__
+
+# Row count and latest updated_at; any insert, update or delete changes it
+ConfigVersion = Tuple[int, Optional[datetime]]
+
+config_cache_refreshes = registry.counter(
+    "alert_config_cache_refreshes_total",
+    "Reloads of the alert manager's in-memory AlertConfig table"
+)
+bulk_decisions = registry.counter(
+    "alert_bulk_decisions_total",
+    "Predictions evaluated in bulk, by decision (alert, below_threshold, no_channels, no_config)"
+)
+
+
+@dataclass(frozen=True)
+class ConfigTable:
+    """AlertConfig as parallel arrays indexed by the site's position"""
+
+    version: ConfigVersion
+    site_ids: np.ndarray
+    positions: Dict[str, int]
+    threshold: np.ndarray
+    # Enabled and with at least one address or number
+    email: np.ndarray
+    sms: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.site_ids)
+
+    def lookup(self, site_ids: Sequence[str]) -> np.ndarray:
+        """Positions of `site_ids`, -1 where a site has no config"""
+        positions = self.positions
+        return np.fromiter((positions.get(str(site_id), -1) for site_id in site_ids), dtype=np.intp, count=len(site_ids))
+
+
+def _has_entries(value: Optional[str]) -> bool:
+    return any(entry.strip() for entry in (value or "").split(","))
+
+
+def build_table(rows: Sequence[Tuple[Any, float, bool, str, bool, str]], version: ConfigVersion) -> ConfigTable:
+    """Rows of (site_id, threshold, email_enabled, email_recipients, sms_enabled, phone_numbers)"""
+    site_ids = np.array([str(row[0]) for row in rows], dtype=object)
+    return ConfigTable(
+        version=version,
+        site_ids=site_ids,
+        positions={site_id: position for position, site_id in enumerate(site_ids.tolist())},
+        threshold=np.array([row[1] for row in rows], dtype=np.float64),
+        email=np.array([bool(row[2]) and _has_entries(row[3]) for row in rows], dtype=bool),
+        sms=np.array([bool(row[4]) and _has_entries(row[5]) for row in rows], dtype=bool)
+    )
+
+
+@dataclass(frozen=True)
+class Evaluation:
+    """Per-prediction outcome of a batch; `alert` marks the ones to dispatch"""
+
+    positions: np.ndarray
+    alert: np.ndarray
+    over_threshold: np.ndarray
+
+    def counts(self) -> Dict[str, int]:
+        configured = self.positions >= 0
+        return {
+            "alert": int(self.alert.sum()),
+            "below_threshold": int((configured & ~self.over_threshold).sum()),
+            "no_channels": int((self.over_threshold & ~self.alert).sum()),
+            "no_config": int((~configured).sum())
+        }
+
+
+def evaluate(table: ConfigTable, site_ids: Sequence[str], probabilities: Sequence[float]) -> Evaluation:
+    """Compare a batch of probabilities with their sites' thresholds in one pass"""
+    positions = table.lookup(site_ids)
+    probability = np.asarray(probabilities, dtype=np.float64)
+    configured = positions >= 0
+    # Unconfigured sites read position 0 here and are masked out
+    safe = np.where(configured, positions, 0)
+    if len(table):
+        over = configured & (probability >= table.threshold[safe])
+        alert = over & (table.email[safe] | table.sms[safe])
+    else:
+        over = alert = np.zeros(len(positions), dtype=bool)
+    return Evaluation(positions=positions, alert=alert, over_threshold=over)
+
+
+class AlertConfigCache:
+    """
+    The AlertConfig table held in memory. At most every `check_interval`
+    seconds one caller compares the table's version with the database (a
+    single aggregate query) and reloads it if anything changed; the others
+    keep using the current table. invalidate() forces the check on the
+    next read, for writers in this process.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = lambda: get_db(read_only=True),
+        check_interval: float = settings.ALERT_CONFIG_CACHE_CHECK_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.session_factory = session_factory
+        self.check_interval = check_interval
+        self.clock = clock
+        self._table: Optional[ConfigTable] = None
+        self._checked_at = -math.inf
+        self._lock = threading.Lock()
+
+    def table(self) -> ConfigTable:
+        """Current table, checked against the database first when due"""
+        if self._table is None or self.clock() - self._checked_at >= self.check_interval:
+            # Only the first load makes callers wait for another thread's check
+            if self._lock.acquire(blocking=self._table is None):
+                try:
+                    if self._table is None or self.clock() - self._checked_at >= self.check_interval:
+                        self.refresh()
+                finally:
+                    self._lock.release()
+        return self._table
+
+    def invalidate(self):
+        """Check the version on the next read, e.g. after configs were written"""
+        self._checked_at = -math.inf
+
+    def refresh(self):
+        with self.session_factory() as db:
+            count, updated_at = db.execute(
+                select(func.count(), func.max(alert_configs.c.updated_at)).select_from(alert_configs)
+            ).one()
+            version = (count, updated_at)
+            if self._table is None or self._table.version != version:
+                rows = db.execute(
+                    select(
+                        alert_configs.c.site_id,
+                        alert_configs.c.threshold,
+                        alert_configs.c.email_enabled,
+                        alert_configs.c.email_recipients,
+                        alert_configs.c.sms_enabled,
+                        alert_configs.c.phone_numbers
+                    )
+                ).all()
+                self._table = build_table(rows, version)
+                config_cache_refreshes.inc()
+        self._checked_at = self.clock()
+
+
+class AlertEvaluator:
+    """Decides which of a batch of predictions alert, against the cached AlertConfig table"""
+
+    def __init__(self, cache: Optional[AlertConfigCache] = None):
+        self.cache = cache or AlertConfigCache()
+
+    def evaluate(self, predictions: List[Dict[str, Any]]) -> Evaluation:
+        evaluation = evaluate(
+            self.cache.table(),
+            [prediction["site_id"] for prediction in predictions],
+            [prediction["probability"] for prediction in predictions]
+        )
+        for decision, count in evaluation.counts().items():
+            if count:
+                bulk_decisions.inc(count, labels={"decision": decision})
+        return evaluation
+
+
+alert_evaluator = AlertEvaluator()
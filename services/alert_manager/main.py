@@ -1,14 +1,21 @@
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, field_validator
 from sqlalchemy.orm import Session
 import uvicorn
-import smtplib
-from email.mime.text import MIMEText
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
 import logging
-import os
+from typing import List, Optional
+from uuid import UUID
 
-from services.common.database import get_db
-from services.common.models import Site, AlertConfig, AlertHistory
+from services.alert_manager.outbox import digest_window, enqueue_notifications, make_dispatcher
+from services.alert_manager.smtp_pool import get_smtp_pool
+from services.common.config import get_settings
+from services.common.database import get_session
+from services.common.models import Site, Alert, AlertConfig, AlertHistory
+
+settings = get_settings()
 
 app = FastAPI(
     title="Alert Manager Service",
@@ -18,58 +25,64 @@ app = FastAPI(
 
 logger = logging.getLogger(__name__)
 
+class BulkPrediction(BaseModel):
+    """One item of POST /alerts/bulk; validated before anything is queued"""
+
+    id: Optional[UUID] = None
+    site_id: UUID
+    probability: float = Field(ge=0, le=1)
+    risk_level: str
+    timestamp: datetime
+
+    @field_validator("risk_level")
+    @classmethod
+    def known_risk_level(cls, value: str) -> str:
+        if value.upper() not in ("LOW", "MEDIUM", "HIGH"):
+            raise ValueError("risk_level must be LOW, MEDIUM or HIGH")
+        return value.upper()
+
+    @field_validator("timestamp")
+    @classmethod
+    def naive_utc(cls, value: datetime) -> datetime:
+        # Stored timestamps are naive UTC
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def as_prediction(self) -> dict:
+        """The prediction dict taken by queue_alert"""
+        return {
+            "id": str(self.id) if self.id else None,
+            "site_id": str(self.site_id),
+            "probability": self.probability,
+            "risk_level": self.risk_level,
+            "timestamp": self.timestamp.isoformat()
+        }
+
 class AlertManager:
-    def __init__(self):
-        # Email configuration
-        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-        self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
-        self.smtp_username = os.getenv('SMTP_USERNAME')
-        self.smtp_password = os.getenv('SMTP_PASSWORD')
-        
-    def send_email(self, to_email: str, subject: str, body: str) -> bool:
-        """Send an email alert"""
-        if not all([self.smtp_username, self.smtp_password]):
-            logger.warning("Email credentials not configured")
-            return False
-            
-        try:
-            msg = MIMEText(body)
-            msg['Subject'] = subject
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
-                
-            logger.info(f"Email sent to {to_email}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send email: {str(e)}")
-            return False
-            
     def format_alert_message(self, site_name: str, prediction: dict) -> dict:
         """Format alert messages"""
         timestamp = datetime.fromisoformat(prediction['timestamp'])
         formatted_time = timestamp.strftime("%Y-%m-%d %H:%M:%S UTC")
         probability = prediction['probability'] * 100
+        risk_level = prediction['risk_level'].upper()
         
         subject = f"Rockfall Risk Alert - {site_name}"
         body = f"""
         Rockfall Risk Alert for {site_name}
         
         Time: {formatted_time}
-        Risk Level: {prediction['risk_level'].upper()}
+        Risk Level: {risk_level}
         Probability: {probability:.1f}%
         
         Please take necessary precautions.
         """
         
         return {
-            'subject': subject,
-            'body': body.strip()
+            'email_subject': subject,
+            'email_body': body.strip(),
+            'sms_body': f"ALERT: {risk_level} rockfall risk ({probability:.1f}%) at {site_name}. Check email for details.",
+            'summary': f"{risk_level} risk ({probability:.1f}%) at {site_name}, {formatted_time}"
         }
 
 alert_manager = AlertManager()
@@ -78,11 +91,100 @@ alert_manager = AlertManager()
 async def root():
     return {"message": "Alert Manager Service"}
 
+def queue_alert(db: Session, site: Site, alert_config: AlertConfig, prediction: dict) -> List[str]:
+    """
+    Add the alert, its outbox notifications and its history entry to the
+    session; returns the channels queued, none if the site has no recipients
+    """
+    risk_level = prediction['risk_level'].upper()
+    messages = alert_manager.format_alert_message(site.name, prediction)
+    
+    # Queued in the outbox with the alert; below HIGH risk it waits to
+    # go out in one digest per recipient instead of a message per site
+    alert = Alert(
+        prediction_id=prediction.get('id'),
+        site_id=site.id,
+        risk_level=risk_level,
+        status="pending",
+        created_at=datetime.utcnow()
+    )
+    db.add(alert)
+    db.flush()
+    channels = enqueue_notifications(db, alert, alert_config, messages, window=digest_window(risk_level))
+    if not channels:
+        alert.status = "error"
+        alert.error_message = "No alert recipients configured"
+        return channels
+    
+    # Log alert
+    db.add(AlertHistory(
+        site_id=site.id,
+        alert_type='risk_threshold',
+        probability=prediction['probability'],
+        risk_level=prediction['risk_level'],
+        timestamp=datetime.fromisoformat(prediction['timestamp'])
+    ))
+    return channels
+
+@app.post("/alerts/bulk")
+async def process_alerts_bulk(
+    items: List[BulkPrediction],
+    db: Session = Depends(get_session)
+):
+    """
+    Evaluate a batch of predictions against the cached alert configs in one
+    vectorized pass and queue alerts for those over their site's threshold
+    """
+    if len(items) > settings.ALERT_BULK_MAX_PREDICTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.ALERT_BULK_MAX_PREDICTIONS} predictions per batch"
+        )
+    
+    # numpy stays out of the service's cold start until the first batch
+    from services.alert_manager.evaluator import alert_evaluator
+    
+    predictions = [item.as_prediction() for item in items]
+    evaluation = await run_in_threadpool(alert_evaluator.evaluate, predictions)
+    
+    positive = [predictions[index] for index in evaluation.alert.nonzero()[0].tolist()]
+    site_ids = {str(prediction['site_id']) for prediction in positive}
+    sites, configs = {}, {}
+    if site_ids:
+        sites = {str(site.id): site for site in db.query(Site).filter(Site.id.in_(site_ids))}
+        configs = {
+            str(config.site_id): config
+            for config in db.query(AlertConfig).filter(AlertConfig.site_id.in_(site_ids))
+        }
+    
+    queued = 0
+    for prediction in positive:
+        site = sites.get(str(prediction['site_id']))
+        alert_config = configs.get(str(prediction['site_id']))
+        # Removed since the cached table was loaded
+        if site is None or alert_config is None:
+            continue
+        if queue_alert(db, site, alert_config, prediction):
+            queued += 1
+    
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to log alerts: {str(e)}"
+        )
+    
+    counts = evaluation.counts()
+    logger.info(f"Bulk alert evaluation: {len(predictions)} predictions, {counts['alert']} over threshold, {queued} queued")
+    return {"evaluated": len(predictions), "queued": queued, **counts}
+
 @app.post("/alerts/{site_id}")
 async def process_alert(
     site_id: str,
     prediction: dict,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Process alert for a site based on prediction"""
     # Get site and config
@@ -100,45 +202,40 @@ async def process_alert(
         
     # Check if alert threshold is exceeded
     if prediction['probability'] >= alert_config.threshold:
-        # Format messages
-        messages = alert_manager.format_alert_message(site.name, prediction)
-        alert_sent = False
-        
-        # Send email alerts
-        if alert_config.email_enabled and alert_config.email_recipients:
-            for email in alert_config.email_recipients.split(','):
-                if alert_manager.send_email(
-                    email.strip(),
-                    messages['subject'],
-                    messages['body']
-                ):
-                    alert_sent = True
+        channels = queue_alert(db, site, alert_config, prediction)
         
-        if alert_sent:
-            # Log alert
-            alert_history = AlertHistory(
-                site_id=site_id,
-                alert_type='risk_threshold',
-                probability=prediction['probability'],
-                risk_level=prediction['risk_level'],
-                timestamp=datetime.fromisoformat(prediction['timestamp'])
+        try:
+            db.commit()
+            if not channels:
+                return {"message": "No alerts were sent"}
+            return {
+                "message": "Alert queued" if not digest_window(prediction['risk_level']) else "Alert queued for digest",
+                "channels": channels
+            }
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to log alert: {str(e)}"
             )
-            db.add(alert_history)
-            
-            try:
-                db.commit()
-                return {"message": "Alert processed and sent successfully"}
-            except Exception as e:
-                db.rollback()
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to log alert: {str(e)}"
-                )
-                
-        return {"message": "No alerts were sent"}
         
     return {"message": "Alert threshold not exceeded"}
 
+outbox_dispatcher = make_dispatcher()
+
+@app.on_event("startup")
+async def start_outbox_dispatcher():
+    if settings.ALERT_OUTBOX_ENABLED:
+        app.state.outbox_task = asyncio.create_task(outbox_dispatcher.run())
+
+@app.on_event("shutdown")
+async def stop_outbox_dispatcher():
+    outbox_dispatcher.stop()
+    task = getattr(app.state, "outbox_task", None)
+    if task is not None:
+        await task
+    get_smtp_pool().close()
+
 def main():
     uvicorn.run(app, host="0.0.0.0", port=8002)
 
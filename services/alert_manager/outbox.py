@@ -0,0 +1,464 @@
+import argparse
+import asyncio
+import logging
+import random
+import smtplib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, bindparam, case, func, or_, select, tuple_, update
+from services.alert_manager.smtp_pool import build_message, get_smtp_pool, split_addresses
+from services.alert_manager.throttle import alert_throttle
+from services.common.config import get_settings
+from services.common.database import get_db
+from services.common.metrics import registry
+from services.common.models import Alert, AlertConfig, AlertOutbox
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+outbox = AlertOutbox.__table__
+alerts = Alert.__table__
+
+deliveries = registry.counter(
+    "alert_outbox_deliveries_total",
+    "Alert notification delivery attempts, by channel and outcome (sent, retry, failed)"
+)
+delivery_seconds = registry.histogram(
+    "alert_outbox_delivery_seconds",
+    "Time spent sending one alert notification, by channel",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+digest_sends_saved = registry.counter(
+    "alert_digest_sends_saved_total",
+    "Notifications delivered inside another message (a digest) instead of on their own, by channel"
+)
+
+# Twilio's limit for a concatenated SMS
+SMS_MAX_LENGTH = 1600
+
+
+class PermanentDeliveryError(Exception):
+    """The channel rejected the notification; retrying will not help"""
+
+
+@dataclass
+class ChannelPolicy:
+    concurrency: int
+    max_attempts: int = settings.ALERT_OUTBOX_MAX_ATTEMPTS
+    backoff: float = settings.ALERT_OUTBOX_BACKOFF_SECONDS
+    max_backoff: float = settings.ALERT_OUTBOX_MAX_BACKOFF_SECONDS
+    timeout: float = settings.ALERT_OUTBOX_SEND_TIMEOUT_SECONDS
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter, so a recovering provider is not hit in lockstep"""
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        return delay / 2 + random.random() * delay / 2
+
+
+class EmailChannel:
+    """One message per outbox row to all of its comma-separated recipients"""
+
+    def __init__(self, sender: str = settings.SMTP_FROM, pool_factory: Callable = get_smtp_pool):
+        self.sender = sender
+        self.pool_factory = pool_factory
+
+    async def send(self, recipient: str, subject: Optional[str], body: str):
+        message = build_message(subject or "", body, self.sender, split_addresses(recipient))
+        try:
+            refused = await asyncio.wrap_future(self.pool_factory().submit(message))
+        except smtplib.SMTPRecipientsRefused as e:
+            raise PermanentDeliveryError(f"All recipients refused: {', '.join(e.recipients)}")
+        except smtplib.SMTPResponseException as e:
+            if 500 <= e.smtp_code < 600:
+                raise PermanentDeliveryError(f"SMTP {e.smtp_code}: {e.smtp_error!r}")
+            raise
+        if refused:
+            logger.warning(f"Email recipients refused: {', '.join(refused)}")
+
+
+class SMSChannel:
+    """Twilio SMS to one number per outbox row"""
+
+    def __init__(self, client=None, from_number: str = settings.TWILIO_FROM_NUMBER):
+        self._client = client
+        self.from_number = from_number
+
+    @property
+    def client(self):
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        return self._client
+
+    def _create(self, to_number: str, body: str):
+        try:
+            self.client.messages.create(body=body, from_=self.from_number, to=to_number)
+        except Exception as e:
+            # TwilioRestException carries the HTTP status; 4xx other than 429 is final
+            status = getattr(e, "status", None)
+            if isinstance(status, int) and 400 <= status < 500 and status != 429:
+                raise PermanentDeliveryError(str(e))
+            raise
+
+    async def send(self, recipient: str, subject: Optional[str], body: str):
+        # The Twilio client is blocking; the channel's concurrency bounds the threads
+        await asyncio.to_thread(self._create, recipient, body)
+
+
+def digest_window(risk_level: str) -> float:
+    """Seconds a notification at `risk_level` may wait to be sent in a digest"""
+    immediate = {level.strip().upper() for level in settings.ALERT_DIGEST_IMMEDIATE_LEVELS.split(",")}
+    if (risk_level or "").upper() in immediate:
+        return 0.0
+    return settings.ALERT_DIGEST_WINDOW_SECONDS
+
+
+def enqueue_notifications(
+    db,
+    alert: Alert,
+    config: Optional[AlertConfig],
+    messages: Dict[str, str],
+    window: float = 0.0
+) -> List[str]:
+    """
+    Add the outbox rows for `alert` to the session, to be committed with it.
+    With a digest `window`, the rows are held that long and there is one
+    email row per address, so each recipient gets a single digest of
+    everything pending for them. Returns the channels that got a notification.
+    """
+    digest = window > 0
+    created_at = alert.created_at or datetime.utcnow()
+    held = dict(digest=digest, next_attempt_at=created_at + timedelta(seconds=window))
+    # One line per alert in a digest
+    summary = messages.get("summary") or messages["email_subject"]
+
+    rows = []
+    if config is not None:
+        recipients = split_addresses(config.email_recipients)
+        if config.email_enabled and recipients:
+            rows.extend(
+                AlertOutbox(
+                    alert_id=alert.id,
+                    channel="email",
+                    recipient=recipient,
+                    subject=messages["email_subject"][:200],
+                    body=messages["email_body"],
+                    **held
+                )
+                for recipient in (recipients if digest else [", ".join(recipients)])
+            )
+        if config.sms_enabled:
+            rows.extend(
+                AlertOutbox(
+                    alert_id=alert.id,
+                    channel="sms",
+                    recipient=number,
+                    subject=summary[:200],
+                    body=messages["sms_body"],
+                    **held
+                )
+                for number in split_addresses(config.phone_numbers)
+            )
+
+    db.add_all(rows)
+    return sorted({row.channel for row in rows})
+
+
+def compose_digest(channel: str, rows: List[Dict[str, Any]]) -> Tuple[Optional[str], str]:
+    """Subject and body of one message standing in for several outbox rows"""
+    # Rows for several addresses of one email carry the same alert
+    unique: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        unique.setdefault(str(row["alert_id"]), row)
+    rows = list(unique.values())
+    if len(rows) == 1:
+        return rows[0]["subject"], rows[0]["body"]
+
+    if channel == "sms":
+        lines = "; ".join(row["subject"] or row["body"] for row in rows)
+        body = f"🪨 ALERT digest, {len(rows)} rockfall alerts: {lines}"
+        if len(body) > SMS_MAX_LENGTH:
+            body = body[:SMS_MAX_LENGTH - 1] + "…"
+        return None, body
+
+    lines = "\n".join(f"- {row['subject']}" for row in rows)
+    details = "\n\n----\n".join(row["body"].strip() for row in rows)
+    body = f"Rockfall Alert System: {len(rows)} alerts\n\n{lines}\n\n----\n{details}\n"
+    return f"⚠️ Rockfall Alert digest: {len(rows)} alerts", body
+
+
+class OutboxDispatcher:
+    """
+    Delivers outbox rows. Each round claims up to `batch_size` due rows in
+    one statement (FOR UPDATE SKIP LOCKED on Postgres, so several
+    dispatchers never claim the same row), marking them `sending` for
+    `lease` seconds; a dispatcher that dies mid-round leaves rows that are
+    claimed again once the lease expires. Claimed rows are sent
+    concurrently, bounded per channel, and every outcome is written back:
+    sent, retried later with backoff, or failed for good. An alert is
+    marked sent or error once none of its notifications are outstanding.
+
+    When a digest row comes due, the recipient's other pending digest rows
+    are claimed with it and all of them go out as one message; addresses
+    with the same pending alerts share that message.
+    """
+
+    def __init__(
+        self,
+        channels: Dict[str, Any],
+        policies: Dict[str, ChannelPolicy],
+        session_factory: Callable = get_db,
+        batch_size: int = settings.ALERT_OUTBOX_BATCH_SIZE,
+        lease: float = settings.ALERT_OUTBOX_LEASE_SECONDS,
+        poll_interval: float = settings.ALERT_OUTBOX_POLL_SECONDS,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        throttle=None
+    ):
+        self.channels = channels
+        self.policies = policies
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease)
+        self.poll_interval = poll_interval
+        self.clock = clock
+        # Alerts that end in error give their throttle window back
+        self.throttle = throttle
+        self._limits = {name: asyncio.Semaphore(policy.concurrency) for name, policy in policies.items()}
+        self._stopping: Optional[asyncio.Event] = None
+
+    def claim(self) -> List[Dict[str, Any]]:
+        now = self.clock()
+        due = or_(
+            and_(outbox.c.status == "pending", outbox.c.next_attempt_at <= now),
+            and_(outbox.c.status == "sending", outbox.c.claimed_until < now)
+        )
+        batch = (
+            select(outbox.c.id)
+            .where(due)
+            .order_by(outbox.c.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = dict(status="sending", claimed_until=now + self.lease, attempts=outbox.c.attempts + 1)
+        columns = (
+            outbox.c.id, outbox.c.alert_id, outbox.c.channel, outbox.c.recipient,
+            outbox.c.subject, outbox.c.body, outbox.c.attempts, outbox.c.digest, outbox.c.created_at
+        )
+        with self.session_factory() as db:
+            rows = db.execute(
+                update(outbox)
+                .where(outbox.c.id.in_(batch.scalar_subquery()), due)
+                .values(**claimed)
+                .returning(*columns)
+            ).all()
+
+            # Everything else waiting for the same recipients joins their digest
+            groups = {(row.channel, row.recipient) for row in rows if row.digest}
+            if groups:
+                waiting = and_(
+                    outbox.c.status == "pending",
+                    outbox.c.digest.is_(True),
+                    tuple_(outbox.c.channel, outbox.c.recipient).in_(sorted(groups))
+                )
+                companions = select(outbox.c.id).where(waiting).with_for_update(skip_locked=True)
+                rows += db.execute(
+                    update(outbox)
+                    .where(outbox.c.id.in_(companions.scalar_subquery()), outbox.c.status == "pending")
+                    .values(**claimed)
+                    .returning(*columns)
+                ).all()
+            db.commit()
+        return [row._asdict() for row in rows]
+
+    def coalesce(self, rows: List[Dict[str, Any]]) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+        """
+        Group claimed rows into sends of (channel, recipient, rows): digest
+        rows per recipient, then email recipients with identical digests
+        merged into one message. Other rows are sent on their own.
+        """
+        sends = []
+        digests: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for row in rows:
+            if row["digest"]:
+                digests.setdefault((row["channel"], row["recipient"]), []).append(row)
+            else:
+                sends.append((row["channel"], row["recipient"], [row]))
+
+        shared: Dict[Tuple, Tuple[List[str], List[Dict[str, Any]]]] = {}
+        for (channel, recipient), group in digests.items():
+            group.sort(key=lambda row: (row["created_at"] or datetime.min, str(row["alert_id"])))
+            if channel != "email":
+                sends.append((channel, recipient, group))
+                continue
+            key = tuple(str(row["alert_id"]) for row in group)
+            recipients, merged = shared.setdefault(key, ([], []))
+            recipients.append(recipient)
+            merged.extend(group)
+        sends.extend(("email", ", ".join(recipients), merged) for recipients, merged in shared.values())
+        return sends
+
+    async def deliver(self, channel_name: str, recipient: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send one message for `rows`; every row gets the outcome, judged on its own attempts"""
+        outcomes = [{"id": row["id"], "alert_id": row["alert_id"], "attempts": row["attempts"]} for row in rows]
+        channel = self.channels.get(channel_name)
+        policy = self.policies.get(channel_name)
+        if channel is None or policy is None:
+            return [dict(outcome, status="failed", last_error=f"No channel {channel_name!r}") for outcome in outcomes]
+
+        subject, body = compose_digest(channel_name, rows)
+        # Alerts riding along in this message instead of going out on their own
+        folded = len({str(row["alert_id"]) for row in rows}) - 1
+
+        started = asyncio.get_running_loop().time()
+        async with self._limits[channel_name]:
+            try:
+                await asyncio.wait_for(channel.send(recipient, subject, body), policy.timeout)
+            except PermanentDeliveryError as e:
+                results = [dict(outcome, status="failed", last_error=str(e)[:500]) for outcome in outcomes]
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"[:500]
+                results = []
+                for outcome in outcomes:
+                    if outcome["attempts"] >= policy.max_attempts:
+                        results.append(dict(outcome, status="failed", last_error=error))
+                    else:
+                        retry_at = self.clock() + timedelta(seconds=policy.retry_delay(outcome["attempts"]))
+                        results.append(dict(outcome, status="pending", next_attempt_at=retry_at, last_error=error))
+            else:
+                sent_at = self.clock()
+                results = [dict(outcome, status="sent", sent_at=sent_at) for outcome in outcomes]
+                if folded:
+                    digest_sends_saved.inc(folded, labels={"channel": channel_name})
+                    logger.info(f"Sent a {channel_name} digest of {folded + 1} alerts to {recipient}, saving {folded} sends")
+
+        for result in results:
+            deliveries.inc(labels={
+                "channel": channel_name,
+                "outcome": "retry" if result["status"] == "pending" else result["status"]
+            })
+        delivery_seconds.observe(asyncio.get_running_loop().time() - started, labels={"channel": channel_name})
+        return results
+
+    def record(self, outcomes: List[Dict[str, Any]]):
+        """Write delivery outcomes, then settle the alerts with nothing left outstanding"""
+        now = self.clock()
+        params = [
+            {
+                "_id": outcome["id"],
+                "_attempts": outcome["attempts"],
+                "status": outcome["status"],
+                "next_attempt_at": outcome.get("next_attempt_at", now),
+                "last_error": outcome.get("last_error"),
+                "sent_at": outcome.get("sent_at")
+            }
+            for outcome in outcomes
+        ]
+        alert_ids = list({outcome["alert_id"] for outcome in outcomes})
+
+        with self.session_factory() as db:
+            conn = db.connection()
+            # Matching attempts: skip rows whose lease expired and were claimed again
+            conn.execute(
+                update(outbox)
+                .where(
+                    outbox.c.id == bindparam("_id"),
+                    outbox.c.attempts == bindparam("_attempts"),
+                    outbox.c.status == "sending"
+                )
+                .values(
+                    status=bindparam("status"),
+                    next_attempt_at=bindparam("next_attempt_at"),
+                    last_error=bindparam("last_error"),
+                    sent_at=bindparam("sent_at"),
+                    claimed_until=None
+                ),
+                params
+            )
+
+            totals = conn.execute(
+                select(
+                    outbox.c.alert_id,
+                    func.count().label("total"),
+                    func.sum(case((outbox.c.status == "sent", 1), else_=0)).label("sent"),
+                    func.sum(case((outbox.c.status == "failed", 1), else_=0)).label("failed")
+                )
+                .where(outbox.c.alert_id.in_(alert_ids))
+                .group_by(outbox.c.alert_id)
+            ).all()
+            failed_alerts = []
+            for alert_id, total, sent, failed in totals:
+                if sent + failed < total:
+                    continue
+                settled = conn.execute(
+                    update(alerts)
+                    .where(alerts.c.id == alert_id, alerts.c.status == "pending")
+                    .values(
+                        status="sent" if not failed else "error",
+                        sent_at=now if sent else None,
+                        error_message=f"{failed} of {total} notifications failed" if failed else None
+                    )
+                    .returning(alerts.c.site_id, alerts.c.risk_level, alerts.c.created_at)
+                ).first()
+                if settled is not None and failed:
+                    failed_alerts.append(settled)
+            db.commit()
+
+        if self.throttle is not None:
+            for site_id, risk_level, created_at in failed_alerts:
+                self.throttle.release(str(site_id), risk_level, created_at)
+
+    async def dispatch_once(self) -> int:
+        """One claim, deliver and record round; returns the number of rows claimed"""
+        rows = await asyncio.to_thread(self.claim)
+        if rows:
+            results = await asyncio.gather(*(self.deliver(*send) for send in self.coalesce(rows)))
+            await asyncio.to_thread(self.record, [outcome for outcomes in results for outcome in outcomes])
+        return len(rows)
+
+    async def run(self):
+        """Dispatch until stop(); a full batch goes straight into the next round"""
+        self._stopping = asyncio.Event()
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Alert outbox dispatch failed: {str(e)}")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+
+def make_dispatcher() -> OutboxDispatcher:
+    return OutboxDispatcher(
+        channels={"email": EmailChannel(), "sms": SMSChannel()},
+        policies={
+            "email": ChannelPolicy(concurrency=settings.SMTP_POOL_SIZE),
+            "sms": ChannelPolicy(concurrency=settings.ALERT_OUTBOX_SMS_CONCURRENCY)
+        },
+        throttle=alert_throttle
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued alert notifications from the outbox")
+    parser.add_argument("--once", action="store_true", help="Run a single round and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    dispatcher = make_dispatcher()
+    if args.once:
+        print(f"Claimed {asyncio.run(dispatcher.dispatch_once())} notifications")
+    else:
+        asyncio.run(dispatcher.run())
+
+
+if __name__ == "__main__":
+    main()
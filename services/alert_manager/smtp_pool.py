@@ -0,0 +1,245 @@
+import logging
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.message import EmailMessage
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from services.common.config import get_settings
+from services.common.metrics import registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+messages_sent = registry.counter(
+    "smtp_messages_total",
+    "Alert emails handed to the SMTP server, by result (sent, failed)"
+)
+connections_opened = registry.counter(
+    "smtp_connections_opened_total",
+    "SMTP connections opened (connect, STARTTLS and login)"
+)
+send_seconds = registry.histogram(
+    "smtp_send_seconds",
+    "Time to send one alert email, including waiting for a connection",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+
+def split_addresses(value: Optional[str]) -> List[str]:
+    """Comma-separated addresses as stored on AlertConfig"""
+    return [address.strip() for address in (value or "").split(",") if address.strip()]
+
+
+def build_message(subject: str, body: str, sender: str, recipients: Iterable[str]) -> EmailMessage:
+    """One message for all of an alert's recipients"""
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+
+class _Connection:
+    def __init__(self, smtp: smtplib.SMTP, now: float):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = now
+        self.reused = False
+
+
+class SMTPPool:
+    """
+    Up to `size` authenticated SMTP connections kept open between messages,
+    and as many worker threads to send on them. A connection is retired
+    after `max_messages` (servers cap messages per session) and checked
+    with NOOP after `idle_check` idle seconds. A message that fails on a
+    reused connection, which the server may have dropped, is retried once
+    on a fresh one; a failure on a fresh connection is reported. At most
+    `max_pending` messages wait for a worker; submit() blocks beyond that.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        use_ssl: bool = False,
+        size: int = 4,
+        max_messages: int = 100,
+        idle_check: float = 30.0,
+        timeout: float = 30.0,
+        max_pending: int = 1000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_check = idle_check
+        self.timeout = timeout
+        self.clock = clock
+        self._idle: "queue.LifoQueue[_Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _connect(self) -> _Connection:
+        context = ssl.create_default_context()
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls and not self.use_ssl:
+                smtp.starttls(context=context)
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        connections_opened.inc()
+        return _Connection(smtp, self.clock())
+
+    def _close(self, connection: _Connection):
+        try:
+            connection.smtp.quit()
+        except Exception:
+            connection.smtp.close()
+
+    def _acquire(self) -> _Connection:
+        """An idle connection, or a new one; the caller holds a slot"""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if self.clock() - connection.last_used < self.idle_check:
+                connection.reused = True
+                return connection
+            try:
+                if connection.smtp.noop()[0] == 250:
+                    connection.reused = True
+                    return connection
+            except OSError:
+                pass
+            connection.smtp.close()
+
+    def _release(self, connection: _Connection):
+        connection.last_used = self.clock()
+        if connection.sent >= self.max_messages:
+            self._close(connection)
+        else:
+            self._idle.put(connection)
+
+    def _reset(self, connection: _Connection):
+        try:
+            connection.smtp.rset()
+        except OSError:
+            connection.smtp.close()
+            return
+        self._release(connection)
+
+    def send(self, message: EmailMessage, to_addrs: Optional[List[str]] = None) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Send on a pooled connection. Returns the recipients the server
+        refused, if some were accepted; raises if none were or on failure.
+        """
+        started = time.perf_counter()
+        self._slots.acquire()
+        try:
+            for attempt in (1, 2):
+                connection = self._acquire()
+                try:
+                    refused = connection.smtp.send_message(message, to_addrs=to_addrs)
+                except smtplib.SMTPException as e:
+                    # 421: the server is closing the session, e.g. at its message limit
+                    if not isinstance(e, smtplib.SMTPServerDisconnected) and getattr(e, "smtp_code", None) != 421:
+                        # Rejected by the server; the session itself is still usable
+                        self._reset(connection)
+                        raise
+                    error = e
+                except OSError as e:
+                    # SMTPException is an OSError too, so this is the socket failing
+                    error = e
+                else:
+                    connection.sent += 1
+                    self._release(connection)
+                    messages_sent.inc(labels={"result": "sent"})
+                    return refused
+
+                # A pooled connection may just have gone stale
+                connection.smtp.close()
+                if attempt == 2 or not connection.reused:
+                    raise error
+                logger.info("Pooled SMTP connection dropped, reconnecting")
+        except Exception:
+            messages_sent.inc(labels={"result": "failed"})
+            raise
+        finally:
+            self._slots.release()
+            send_seconds.observe(time.perf_counter() - started)
+
+    def submit(self, message: EmailMessage, to_addrs: Optional[List[str]] = None) -> "Future[Dict[str, Tuple[int, bytes]]]":
+        """send() on a worker thread"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.size, thread_name_prefix="smtp")
+            executor = self._executor
+
+        self._pending.acquire()
+        try:
+            future = executor.submit(self.send, message, to_addrs)
+        except Exception:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def close(self):
+        """Wait for submitted messages, then log out of every idle connection"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+_pool: Optional[SMTPPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPPool(
+                    settings.SMTP_SERVER,
+                    settings.SMTP_PORT,
+                    username=settings.SMTP_USER,
+                    password=settings.SMTP_PASSWORD,
+                    starttls=settings.SMTP_STARTTLS,
+                    use_ssl=settings.SMTP_USE_SSL,
+                    size=settings.SMTP_POOL_SIZE,
+                    max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                    idle_check=settings.SMTP_IDLE_CHECK_SECONDS,
+                    timeout=settings.SMTP_TIMEOUT_SECONDS,
+                    max_pending=settings.SMTP_MAX_PENDING
+                )
+    return _pool
@@ -0,0 +1,102 @@
+import socketserver
+import threading
+import time
+from typing import List, Tuple
+
+
+class _Session(socketserver.StreamRequestHandler):
+    """Just enough ESMTP for smtplib: EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server: "StandInSMTPServer" = self.server.standin
+        with server.lock:
+            server.connections += 1
+        # Stands in for the TCP, TLS and AUTH round trips to a real relay
+        time.sleep(server.connect_delay)
+        self.reply("220 standin ESMTP")
+
+        sent = 0
+        recipients: List[str] = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-standin\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME" if verb == "EHLO" else "250 standin")
+            elif verb == "AUTH":
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                if server.max_messages_per_connection and sent >= server.max_messages_per_connection:
+                    self.reply("421 4.7.0 Too many messages, closing connection")
+                    return
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip(" <>")
+                if "refused" in address:
+                    self.reply("550 5.1.1 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data in self.rfile:
+                    if data in (b".\r\n", b".\n"):
+                        break
+                    size += len(data)
+                time.sleep(server.message_delay)
+                with server.lock:
+                    server.messages.append((tuple(recipients), size))
+                sent += 1
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StandInSMTPServer:
+    """
+    Local SMTP server for tests and benchmarks; accepts everything except
+    recipients containing "refused" and records what it received. No TLS:
+    point clients at it with STARTTLS off.
+    """
+
+    def __init__(self, connect_delay: float = 0.0, message_delay: float = 0.0, max_messages_per_connection: int = 0):
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.max_messages_per_connection = max_messages_per_connection
+        self.connections = 0
+        self.messages: List[Tuple[Tuple[str, ...], int]] = []
+        self.lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), _Session)
+        self._server.standin = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def __enter__(self) -> "StandInSMTPServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy import func, select
+from services.common.config import get_settings
+from services.common.database import get_db
+from services.common.metrics import registry
+from services.common.models import Alert
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+alerts = Alert.__table__
+
+# Alerts that hold their throttle window; error alerts give it back
+THROTTLING_STATUSES = ("pending", "sent")
+
+throttle_decisions = registry.counter(
+    "alert_throttle_decisions_total",
+    "Alert throttle lookups, by decision (allowed, throttled)"
+)
+
+
+def epoch(value: datetime) -> float:
+    """Naive UTC datetime (as stored on Alert) to epoch seconds"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def warm_query(cutoff: datetime):
+    """Latest throttling alert per site and risk level since `cutoff`; served by idx_alerts_throttle"""
+    return (
+        select(alerts.c.site_id, alerts.c.risk_level, func.max(alerts.c.created_at))
+        .where(alerts.c.status.in_(THROTTLING_STATUSES), alerts.c.created_at >= cutoff)
+        .group_by(alerts.c.site_id, alerts.c.risk_level)
+    )
+
+
+def _stamp(at: float) -> str:
+    return f"{at:.6f}"
+
+
+class LocalThrottleStore:
+    """Last alert time per (site, risk level) in this process, dropped once its window has passed"""
+
+    def __init__(self, clock: Callable[[], float] = time.time, sweep_every: int = 1024):
+        self.clock = clock
+        self.sweep_every = sweep_every
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    def _write(self, key: str, value: str, expires_at: float, now: float):
+        self._entries[key] = (value, expires_at)
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self._entries = {k: entry for k, entry in self._entries.items() if entry[1] > now}
+
+    def acquire(self, key: str, at: float, ttl: float) -> bool:
+        with self._lock:
+            now = self.clock()
+            if self._live(key, now) is not None:
+                return False
+            self._write(key, _stamp(at), at + ttl, now)
+            return True
+
+    def record(self, key: str, at: float, ttl: float):
+        with self._lock:
+            now = self.clock()
+            current = self._live(key, now)
+            if at + ttl > now and (current is None or float(current) < at):
+                self._write(key, _stamp(at), at + ttl, now)
+
+    def release(self, key: str, at: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == _stamp(at):
+                del self._entries[key]
+
+    def throttled(self, key: str) -> bool:
+        with self._lock:
+            return self._live(key, self.clock()) is not None
+
+
+# Keep the newer of the stored and the given alert time
+_RECORD_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if (not current) or tonumber(current) < tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+end
+return 0
+"""
+
+# Delete only if the slot still holds this alert's reservation
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisThrottleStore:
+    """Throttle index shared by the alert manager workers; key expiry is the window"""
+
+    def __init__(self, url: str, prefix: str = "rockfall:throttle:", clock: Callable[[], float] = time.time):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("redis is required when ALERT_THROTTLE_STORE_URL is set")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.clock = clock
+        self._record = self.client.register_script(_RECORD_SCRIPT)
+        self._release = self.client.register_script(_RELEASE_SCRIPT)
+
+    def acquire(self, key: str, at: float, ttl: float) -> bool:
+        # SET NX makes check-and-reserve atomic across workers
+        return bool(self.client.set(self.prefix + key, _stamp(at), nx=True, px=max(1, int(ttl * 1000))))
+
+    def record(self, key: str, at: float, ttl: float):
+        remaining = at + ttl - self.clock()
+        if remaining > 0:
+            self._record(keys=[self.prefix + key], args=[_stamp(at), max(1, int(remaining * 1000))])
+
+    def release(self, key: str, at: float):
+        self._release(keys=[self.prefix + key], args=[_stamp(at)])
+
+    def throttled(self, key: str) -> bool:
+        return bool(self.client.exists(self.prefix + key))
+
+
+class ThrottleIndex:
+    """
+    Whether a site may alert again at a risk level, answered from memory
+    (or the shared store) instead of querying alerts per prediction.
+    acquire() checks and reserves the window in one step; an alert whose
+    delivery fails gives its window back with release(). On first use the
+    index is warmed from the pending and sent alerts still inside their
+    windows, so a restart does not re-alert.
+    """
+
+    def __init__(
+        self,
+        store,
+        windows: Dict[str, float],
+        session_factory: Callable = get_db,
+        clock: Callable[[], float] = time.time
+    ):
+        self.store = store
+        # Seconds per risk level; levels without a window never alert
+        self.windows = windows
+        self.session_factory = session_factory
+        self.clock = clock
+        self._warm = False
+        self._warm_lock = threading.Lock()
+
+    @staticmethod
+    def _key(site_id: str, risk_level: str) -> str:
+        return f"{site_id}:{risk_level}"
+
+    def ensure_warm(self):
+        if self._warm:
+            return
+        with self._warm_lock:
+            if not self._warm:
+                self.warm()
+
+    def warm(self):
+        """Load the latest throttling alert per site and risk level from the database"""
+        longest = max(self.windows.values(), default=0)
+        cutoff = datetime.utcfromtimestamp(self.clock() - longest)
+        with self.session_factory() as db:
+            rows = db.execute(warm_query(cutoff)).all()
+        for site_id, risk_level, created_at in rows:
+            self.record(str(site_id), risk_level, created_at)
+        self._warm = True
+        logger.info(f"Alert throttle index warmed with {len(rows)} entries")
+
+    def allows(self, site_id: str, risk_level: str) -> bool:
+        """Read-only check; prefer acquire() when about to alert"""
+        if risk_level not in self.windows:
+            return False
+        self.ensure_warm()
+        return not self.store.throttled(self._key(site_id, risk_level))
+
+    def acquire(self, site_id: str, risk_level: str, at: datetime) -> bool:
+        """Reserve the window for an alert created at `at`; False if throttled"""
+        window = self.windows.get(risk_level)
+        if window is None:
+            return False
+        self.ensure_warm()
+        allowed = self.store.acquire(self._key(site_id, risk_level), epoch(at), window)
+        throttle_decisions.inc(labels={"decision": "allowed" if allowed else "throttled"})
+        return allowed
+
+    def record(self, site_id: str, risk_level: str, at: datetime):
+        """Note an alert made elsewhere (or found in the database)"""
+        window = self.windows.get(risk_level)
+        if window is not None:
+            self.store.record(self._key(site_id, risk_level), epoch(at), window)
+
+    def release(self, site_id: str, risk_level: str, at: datetime):
+        """Give back the window reserved by the alert created at `at`"""
+        self.store.release(self._key(site_id, risk_level), epoch(at))
+
+
+def make_store():
+    if settings.ALERT_THROTTLE_STORE_URL:
+        return RedisThrottleStore(settings.ALERT_THROTTLE_STORE_URL)
+    return LocalThrottleStore()
+
+
+alert_throttle = ThrottleIndex(
+    make_store(),
+    windows={
+        "HIGH": settings.ALERT_THROTTLE_HIGH * 60,
+        "MEDIUM": settings.ALERT_THROTTLE_MEDIUM * 60
+    }
+)
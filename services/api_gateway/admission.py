@@ -0,0 +1,281 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+from fastapi import HTTPException, Request
+from services.common.config import get_settings
+from services.common.metrics import registry
+
+settings = get_settings()
+
+decisions = registry.counter(
+    "admission_decisions_total",
+    "Admission decisions for rate-limited endpoints, by decision"
+)
+in_flight_gauge = registry.gauge(
+    "admission_in_flight",
+    "Requests holding a concurrency slot"
+)
+queue_depth_gauge = registry.gauge(
+    "admission_queue_depth",
+    "Requests waiting for a concurrency slot"
+)
+queue_wait = registry.histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests waited for a concurrency slot",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+
+class Rejected(Exception):
+    def __init__(self, decision: str, retry_after: float):
+        super().__init__(decision)
+        self.decision = decision
+        self.retry_after = retry_after
+
+
+class LocalBucketStore:
+    """Token buckets in this process, least recently seen clients evicted first"""
+
+    def __init__(self, max_clients: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token; returns 0 if allowed, else seconds until a token is available"""
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+# Same refill arithmetic as LocalBucketStore, atomic in Redis
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+class RedisBucketStore:
+    """Token buckets shared by the gateway workers on one host"""
+
+    def __init__(self, url: str, prefix: str = "rockfall:ratelimit:"):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("redis is required when ADMISSION_STORE_URL is set")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        return float(self._take(keys=[self.prefix + key], args=[rate, burst, time.time()]))
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` requests at a time, with up to `max_queue` waiting at
+    most `queue_timeout` seconds for a slot. Shedding follows CoDel: if
+    even the shortest queue wait in an `interval` was above
+    `target_delay`, the queue is standing rather than absorbing a burst,
+    and requests that would have to wait are turned away at once until a
+    wait drops below the target again. Used from one event loop.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        target_delay: float,
+        interval: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.target_delay = target_delay
+        self.interval = interval
+        self.clock = clock
+        self.in_flight = 0
+        self.overloaded = False
+        self._waiters: deque = deque()
+        self._window_start = clock()
+        self._window_min = math.inf
+        # Moving average of how long a request holds its slot
+        self._service_time = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        """Rough time for the current queue to drain"""
+        return max(1.0, self._service_time * (len(self._waiters) + 1) / self.limit)
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the queue wait or raises Rejected"""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self._observe_delay(0.0)
+            self._update_gauges()
+            return 0.0
+
+        if self.overloaded:
+            raise Rejected("shed", self.retry_after())
+        if len(self._waiters) >= self.max_queue:
+            raise Rejected("queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        started = self.clock()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._remove(waiter)
+            self._update_gauges()
+            if isinstance(e, asyncio.TimeoutError):
+                raise Rejected("queue_timeout", self.retry_after())
+            raise
+
+        delay = self.clock() - started
+        self._observe_delay(delay)
+        return delay
+
+    def release(self, held_for: Optional[float] = None):
+        if held_for is not None:
+            self._service_time = held_for if not self._service_time else 0.8 * self._service_time + 0.2 * held_for
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the oldest waiter
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self.in_flight -= 1
+        self._update_gauges()
+
+    def _remove(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _observe_delay(self, delay: float):
+        now = self.clock()
+        self._window_min = min(self._window_min, delay)
+        if delay <= self.target_delay:
+            self.overloaded = False
+        if now - self._window_start >= self.interval:
+            self.overloaded = self._window_min > self.target_delay
+            self._window_start = now
+            self._window_min = math.inf
+
+    def _update_gauges(self):
+        in_flight_gauge.set(self.in_flight)
+        queue_depth_gauge.set(len(self._waiters))
+
+
+class AdmissionController:
+    """Per-client rate limit (429) followed by the concurrency limiter (503)"""
+
+    def __init__(self, store, rate: float, burst: int, limiter: ConcurrencyLimiter, trust_forwarded_for: bool = False):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.limiter = limiter
+        self.trust_forwarded_for = trust_forwarded_for
+
+    def client_key(self, request: Request) -> str:
+        if self.trust_forwarded_for:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    async def admit(self, request: Request):
+        """FastAPI dependency: holds a concurrency slot for the rest of the request"""
+        retry_after = self.store.take(self.client_key(request), self.rate, self.burst)
+        if retry_after > 0:
+            decisions.inc(labels={"decision": "rate_limited"})
+            raise HTTPException(
+                status_code=429,
+                detail="Too many prediction requests",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+        try:
+            waited = await self.limiter.acquire()
+        except Rejected as e:
+            decisions.inc(labels={"decision": e.decision})
+            raise HTTPException(
+                status_code=503,
+                detail="Prediction capacity exhausted, retry later",
+                headers={"Retry-After": str(math.ceil(e.retry_after))}
+            )
+
+        decisions.inc(labels={"decision": "admitted"})
+        queue_wait.observe(waited)
+        started = self.limiter.clock()
+        try:
+            yield
+        finally:
+            self.limiter.release(self.limiter.clock() - started)
+
+
+def make_store():
+    if settings.ADMISSION_STORE_URL:
+        return RedisBucketStore(settings.ADMISSION_STORE_URL)
+    return LocalBucketStore()
+
+
+prediction_admission = AdmissionController(
+    make_store(),
+    rate=settings.ADMISSION_RATE_PER_SECOND,
+    burst=settings.ADMISSION_BURST,
+    limiter=ConcurrencyLimiter(
+        settings.ADMISSION_MAX_CONCURRENT,
+        settings.ADMISSION_MAX_QUEUE,
+        settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        settings.ADMISSION_TARGET_QUEUE_DELAY_SECONDS,
+        settings.ADMISSION_SHED_INTERVAL_SECONDS
+    ),
+    trust_forwarded_for=settings.ADMISSION_TRUST_FORWARDED_FOR
+)
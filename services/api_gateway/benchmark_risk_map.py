@@ -0,0 +1,107 @@
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from services.common.models import Base, Site, Model, Prediction
+from services.api_gateway.routers import sites as sites_router
+from services.api_gateway.serialization import dumps
+from services.api_gateway import site_index as site_index_module
+from services.api_gateway.site_index import SiteIndex
+
+# (label, bbox, zoom)
+VIEWS = [
+    ("world z2", (-180.0, -85.0, 180.0, 85.0), 2),
+    ("continent z5", (-10.0, 35.0, 30.0, 60.0), 5),
+    ("region z9", (6.0, 45.5, 8.0, 46.5), 9),
+    ("valley z13", (7.0, 46.0, 7.2, 46.1), 13),
+    ("antimeridian z6", (170.0, -50.0, -170.0, -30.0), 6)
+]
+
+
+def seed(engine, count: int) -> None:
+    """`count` sites, half of them packed into the Alps, each with a recent prediction"""
+    Base.metadata.create_all(engine, tables=[Site.__table__, Model.__table__, Prediction.__table__])
+    now = datetime.utcnow()
+    site_rows, prediction_rows = [], []
+    for i in range(count):
+        if i % 2:
+            latitude, longitude = random.uniform(45.5, 47.5), random.uniform(6.0, 11.0)
+        else:
+            latitude, longitude = random.uniform(-60, 70), random.uniform(-180, 180)
+        site_id = str(uuid.uuid4())
+        site_rows.append({
+            "id": site_id, "name": f"site {i}", "location": "bench",
+            "latitude": latitude, "longitude": longitude, "is_active": True, "created_at": now - timedelta(days=30)
+        })
+        probability = random.random()
+        prediction_rows.append({
+            "id": str(uuid.uuid4()), "site_id": site_id, "timestamp": now - timedelta(minutes=random.randint(0, 600)),
+            "probability": probability, "risk_level": "HIGH" if probability > 0.7 else "MEDIUM" if probability > 0.4 else "LOW"
+        })
+
+    with engine.begin() as conn:
+        conn.execute(Site.__table__.insert(), site_rows)
+        conn.execute(Prediction.__table__.insert(), prediction_rows)
+
+
+def percentile(samples, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the site risk-map index and endpoint")
+    parser.add_argument("--sites", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    seed(engine, args.sites)
+    index = SiteIndex(session_factory=lambda: Session(engine), refresh_interval=3600)
+
+    started = time.perf_counter()
+    index.refresh()
+    print(f"{args.sites} sites: full load {1000 * (time.perf_counter() - started):.0f} ms")
+    started = time.perf_counter()
+    index.refresh()
+    print(f"incremental refresh (no changes) {1000 * (time.perf_counter() - started):.1f} ms")
+
+    # The router looks the index up when it handles a request
+    site_index_module.site_index = index
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(sites_router.router)
+    client = TestClient(app)
+
+    print(f"{'view':18s} {'in view':>8s} {'markers':>8s} {'index p50':>10s} {'p99':>8s} {'http p50':>10s} {'p99':>8s} {'bytes':>9s}")
+    for label, bbox, zoom in VIEWS:
+        direct = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            body = dumps(index.risk_map(bbox, zoom))
+            direct.append(time.perf_counter() - started)
+
+        http = []
+        query = {"bbox": ",".join(str(part) for part in bbox), "zoom": zoom}
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            response = client.get("/api/sites/risk-map", params=query)
+            http.append(time.perf_counter() - started)
+        payload = response.json()
+
+        print(
+            f"{label:18s} {payload['total']:8d} {len(payload['sites']) + len(payload['clusters']):8d} "
+            f"{1000 * statistics.median(direct):8.2f}ms {1000 * percentile(direct, 0.99):6.2f}ms "
+            f"{1000 * statistics.median(http):8.2f}ms {1000 * percentile(http, 0.99):6.2f}ms {len(body):9d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from services.common.models import Base, Site, Model, Prediction
+from services.api_gateway.schemas import PredictionSummary
+from services.api_gateway.serialization import dumps
+
+predictions = Prediction.__table__
+
+
+def seed(engine, rows: int, with_features: bool) -> str:
+    Base.metadata.create_all(engine, tables=[Site.__table__, Model.__table__, predictions])
+    site_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(Site.__table__.insert(), [{
+            "id": site_id, "name": "bench", "location": "bench", "latitude": 0.0, "longitude": 0.0
+        }])
+        conn.execute(predictions.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "site_id": site_id,
+                "timestamp": now - timedelta(minutes=i),
+                "probability": random.random(),
+                "risk_level": random.choice(["LOW", "MEDIUM", "HIGH"]),
+                "inference_time_ms": random.random() * 10,
+                "features_snapshot": {"rain_24h_mm": random.random() * 50, "humidity_pct": 80.0} if with_features else None,
+                "created_at": now
+            }
+            for i in range(rows)
+        ])
+    return site_id
+
+
+def orm_jsonable(engine, site_id: str) -> bytes:
+    """The previous path: ORM objects, every column, jsonable_encoder then json.dumps"""
+    with Session(engine) as db:
+        rows = db.query(Prediction).filter(Prediction.site_id == site_id).order_by(Prediction.timestamp.desc()).all()
+        payload = [{column.name: getattr(row, column.name) for column in predictions.columns} for row in rows]
+    return json.dumps(jsonable_encoder({"items": payload})).encode()
+
+
+def projected_pydantic(engine, site_id: str) -> bytes:
+    """Schema columns only, validated and dumped by the Pydantic schema"""
+    adapter = TypeAdapter(List[PredictionSummary])
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(*[predictions.c[column] for column in PredictionSummary.columns()])
+            .where(predictions.c.site_id == site_id)
+            .order_by(predictions.c.timestamp.desc())
+        ).all()
+    return b'{"items":' + adapter.dump_json(adapter.validate_python(rows, from_attributes=True)) + b"}"
+
+
+def projected_orjson(engine, site_id: str) -> bytes:
+    """The gateway's path: schema columns only, orjson per fetched batch"""
+    chunks = [b'{"items":[']
+    with engine.connect() as conn:
+        result = conn.execute(
+            select(*[predictions.c[column] for column in PredictionSummary.columns()])
+            .where(predictions.c.site_id == site_id)
+            .order_by(predictions.c.timestamp.desc())
+            .execution_options(yield_per=500)
+        )
+        for position, rows in enumerate(result.partitions()):
+            chunks.append((b"," if position else b"") + dumps([row._asdict() for row in rows])[1:-1])
+    chunks.append(b"]}")
+    return b"".join(chunks)
+
+
+def run(label: str, serialize: Callable[..., bytes], engine, site_id: str, rows: int, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        body = serialize(engine, site_id)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(
+        f"{label:20s} {best * 1000:9.1f} ms {rows / best:12.0f} rows/s "
+        f"{len(body) / best / 1e6:8.1f} MB/s {len(body) / 1e6:8.2f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serialization throughput of prediction history payloads")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--with-features", action="store_true", help="Fill features_snapshot (only the old path sends it)")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    site_id = seed(engine, args.rows, args.with_features)
+
+    print(f"{args.rows} predictions, best of {args.repeats} (query + encode)")
+    run("orm + jsonable", orm_jsonable, engine, site_id, args.rows, args.repeats)
+    run("columns + pydantic", projected_pydantic, engine, site_id, args.rows, args.repeats)
+    run("columns + orjson", projected_orjson, engine, site_id, args.rows, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Callable, Dict, Optional
+from fastapi import Request, Response
+from sqlalchemy import select
+from services.common.config import get_settings
+from services.common.database import get_db
+from services.common.metrics import registry
+from services.common.models import Prediction
+from services.api_gateway.serialization import apply_schema, dumps
+
+settings = get_settings()
+
+predictions = Prediction.__table__
+
+cache_requests = registry.counter(
+    "response_cache_requests_total",
+    "Cached read endpoint requests, by result (hit, miss, not_modified)"
+)
+
+
+class LRUBackend:
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisBackend:
+    """Shared backend for several gateway workers; values are stored as JSON"""
+
+    def __init__(self, url: str, prefix: str = "rockfall:api:"):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("redis is required when RESPONSE_CACHE_URL is set")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: float):
+        self.client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+
+def _load_marker(site_id: str) -> Optional[Dict[str, str]]:
+    """Latest prediction (id, timestamp) of a site; an index-only lookup"""
+    with get_db(read_only=True) as db:
+        row = db.execute(
+            select(predictions.c.id, predictions.c.timestamp)
+            .where(predictions.c.site_id == site_id)
+            .order_by(predictions.c.timestamp.desc(), predictions.c.id.desc())
+            .limit(1)
+        ).first()
+    if row is None:
+        return None
+    return {"id": row.id, "timestamp": row.timestamp.isoformat()}
+
+
+class ResponseCache:
+    """
+    Conditional GET and response caching for per-site read endpoints.
+    A site's latest prediction is its version marker: it derives the ETag
+    and Last-Modified headers and is part of every cache key, so a new
+    prediction makes all of the site's cached responses unreachable.
+    """
+
+    def __init__(
+        self,
+        backend,
+        ttl: float,
+        marker_ttl: float,
+        marker_loader: Callable[[str], Optional[Dict[str, str]]] = _load_marker
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.marker_ttl = marker_ttl
+        self.marker_loader = marker_loader
+
+    def site_marker(self, site_id: str) -> Optional[Dict[str, str]]:
+        marker = self.backend.get(f"marker:{site_id}")
+        if marker is None:
+            marker = self.marker_loader(site_id)
+            if marker is not None:
+                self.backend.set(f"marker:{site_id}", marker, self.marker_ttl)
+        return marker
+
+    def invalidate_site(self, site_id: str):
+        """Call after writing a prediction for the site"""
+        self.backend.delete(f"marker:{site_id}")
+
+    def follow(self, hub):
+        """
+        Invalidate a site on every prediction event `hub` delivers. With the
+        hub's relay this covers predictions written by other processes (the
+        prediction service, the collector); without it they are picked up
+        when the marker expires.
+        """
+        hub.add_listener(lambda data: self.invalidate_site(str(data["site_id"])))
+
+    def respond(
+        self,
+        request: Request,
+        site_id: str,
+        compute: Callable[[], Any],
+        vary: str = "",
+        schema: Any = None
+    ) -> Any:
+        """
+        Serve `compute()` for this request with validators, answering 304
+        when the client's If-None-Match holds the current ETag and reusing
+        cached JSON bodies. Last-Modified is informational: the marker's
+        timestamp is shared by every response of the site whatever its
+        query or `vary`, so If-Modified-Since alone never gets a 304.
+        Responses that are already Response objects (streams) get the
+        validators but are not stored. `vary` adds anything besides the
+        site's predictions that the response depends on. `schema` is the
+        endpoint's response model; other values are validated against it
+        before they are encoded, since FastAPI does not see them.
+        """
+        marker = self.site_marker(site_id)
+        if marker is None:
+            return compute()
+
+        resource = f"{request.url.path}?{request.url.query}|{vary}"
+        etag = '"' + hashlib.sha1(
+            f"{marker['id']}|{marker['timestamp']}|{resource}".encode()
+        ).hexdigest()[:20] + '"'
+        last_modified = datetime.fromisoformat(marker["timestamp"]).replace(tzinfo=timezone.utc)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": "no-cache"
+        }
+
+        if self._not_modified(request, etag):
+            cache_requests.inc(labels={"result": "not_modified"})
+            return Response(status_code=304, headers=headers)
+
+        key = f"response:{site_id}:{etag}"
+        body = self.backend.get(key)
+        if body is not None:
+            cache_requests.inc(labels={"result": "hit"})
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        cache_requests.inc(labels={"result": "miss"})
+        value = compute()
+        if isinstance(value, Response):
+            value.headers.update(headers)
+            return value
+
+        if schema is not None:
+            value = apply_schema(schema, value)
+        body = dumps(value).decode()
+        self.backend.set(key, body, self.ttl)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    @staticmethod
+    def _not_modified(request: Request, etag: str) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is None:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def make_backend():
+    if settings.RESPONSE_CACHE_URL:
+        return RedisBackend(settings.RESPONSE_CACHE_URL)
+    return LRUBackend(settings.RESPONSE_CACHE_SIZE)
+
+
+response_cache = ResponseCache(
+    make_backend(),
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    marker_ttl=settings.RESPONSE_CACHE_MARKER_TTL_SECONDS
+)
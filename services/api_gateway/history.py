@@ -0,0 +1,171 @@
+import base64
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import select, or_, and_, func
+from services.common.database import get_db
+from services.common.models import Prediction
+from services.api_gateway.schemas import DownsampledPoint, PredictionSummary, PredictionDetail
+from services.api_gateway.serialization import apply_schema, dumps
+
+predictions = Prediction.__table__
+
+# Columns returned when no fields= projection is given; features_snapshot is
+# the heavy JSON column and has to be asked for explicitly
+DEFAULT_FIELDS = PredictionSummary.columns()
+ALLOWED_FIELDS = PredictionDetail.columns()
+
+STREAM_BATCH_SIZE = 500
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; convert an aware query bound to match"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Validate a comma-separated fields= projection; timestamp and id are always included"""
+    if not fields:
+        return list(DEFAULT_FIELDS)
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in ALLOWED_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    return list(dict.fromkeys(["id", "timestamp"] + requested))
+
+
+def encode_cursor(timestamp: datetime, prediction_id: str) -> str:
+    raw = f"{timestamp.isoformat()}|{prediction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        timestamp, prediction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return naive_utc(datetime.fromisoformat(timestamp)), prediction_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _range_filters(site_id: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> list:
+    filters = [predictions.c.site_id == site_id]
+    if start_date:
+        filters.append(predictions.c.timestamp >= start_date)
+    if end_date:
+        filters.append(predictions.c.timestamp <= end_date)
+    return filters
+
+
+def history_page_query(
+    site_id: str,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    fields: List[str],
+    limit: int,
+    after: Optional[Tuple[datetime, str]] = None
+):
+    """Keyset page query, newest first; `after` is the decoded (timestamp, id) cursor"""
+    filters = _range_filters(site_id, start_date, end_date)
+    if after:
+        cursor_ts, cursor_id = after
+        filters.append(or_(
+            predictions.c.timestamp < cursor_ts,
+            and_(predictions.c.timestamp == cursor_ts, predictions.c.id < cursor_id)
+        ))
+
+    return (
+        select(*[predictions.c[field] for field in fields])
+        .where(*filters)
+        .order_by(predictions.c.timestamp.desc(), predictions.c.id.desc())
+        .limit(limit)
+    )
+
+
+def stream_history_page(
+    site_id: str,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    fields: List[str],
+    limit: int,
+    after: Optional[Tuple[datetime, str]] = None
+) -> Iterator[bytes]:
+    """
+    Stream one keyset page, newest first, as a JSON object
+    {"items": [...], "next_cursor": ...}. Rows are fetched in batches from a
+    server-side cursor so memory does not depend on the page or range size.
+    `after` is the decoded (timestamp, id) cursor of the previous page.
+    """
+    query = history_page_query(
+        site_id, start_date, end_date, fields, limit, after
+    ).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    yield b'{"items":['
+    count = 0
+    last = None
+    with get_db(read_only=True) as db:
+        # One orjson call per fetched batch rather than per row
+        for rows in db.execute(query).partitions():
+            batch = dumps([row._asdict() for row in rows])
+            yield (b"," if count else b"") + batch[1:-1]
+            count += len(rows)
+            last = rows[-1]
+
+    next_cursor = encode_cursor(last.timestamp, last.id) if last is not None and count == limit else None
+    yield b'],"next_cursor":' + dumps(next_cursor) + b"}"
+
+
+def stream_downsampled(
+    site_id: str,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    points: int
+) -> Iterator[bytes]:
+    """
+    Stream at most `points` equal-width time buckets (mean and max
+    probability) for charts. Aggregation happens while scanning, so memory
+    is bounded by the number of points.
+    """
+    with get_db(read_only=True) as db:
+        if start_date is None or end_date is None:
+            bounds = db.execute(
+                select(func.min(predictions.c.timestamp), func.max(predictions.c.timestamp))
+                .where(predictions.c.site_id == site_id)
+            ).first()
+            start_date = start_date or bounds[0]
+            end_date = end_date or bounds[1]
+
+        if start_date is None or end_date is None:
+            yield b"[]"
+            return
+
+        span = max((end_date - start_date).total_seconds(), 1.0)
+        buckets: Dict[int, Dict[str, float]] = {}
+
+        query = (
+            select(predictions.c.timestamp, predictions.c.probability)
+            .where(*_range_filters(site_id, start_date, end_date))
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        for timestamp, probability in db.execute(query):
+            index = min(int((timestamp - start_date).total_seconds() / span * points), points - 1)
+            bucket = buckets.get(index)
+            if bucket is None:
+                buckets[index] = {"count": 1, "sum": probability, "max": probability}
+            else:
+                bucket["count"] += 1
+                bucket["sum"] += probability
+                bucket["max"] = max(bucket["max"], probability)
+
+    yield dumps(apply_schema(List[DownsampledPoint], [
+        {
+            "bucket_start": start_date + (end_date - start_date) * index / points,
+            "count": buckets[index]["count"],
+            "avg_probability": buckets[index]["sum"] / buckets[index]["count"],
+            "max_probability": buckets[index]["max"]
+        }
+        for index in sorted(buckets)
+    ]))
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+import uuid
+from typing import Dict, List
+import httpx
+from fastapi import FastAPI
+from services.api_gateway.routers import stream
+from services.common.pubsub import prediction_hub
+
+logger = logging.getLogger(__name__)
+
+RISK_LEVELS = ["LOW", "MEDIUM", "HIGH"]
+
+
+def start_server(port: int):
+    """Serve only the stream router, in a background thread"""
+    import uvicorn
+
+    app = FastAPI()
+    app.include_router(stream.router)
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, log_level="warning", backlog=4096
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def publish(events: int, rate: float, site_ids: List[str]):
+    """Publish synthetic predictions, stamped with their publish time"""
+    for i in range(events):
+        prediction_hub.publish({
+            "prediction_id": str(uuid.uuid4()),
+            "site_id": site_ids[i % len(site_ids)],
+            "risk_level": RISK_LEVELS[i % len(RISK_LEVELS)],
+            "probability": 0.5,
+            "published_at": time.time()
+        })
+        time.sleep(1.0 / rate)
+
+
+async def subscriber(client: httpx.AsyncClient, url: str, expected: int, stats: Dict, ready: asyncio.Event):
+    received = 0
+    async with client.stream("GET", url) as response:
+        stats["connected"] += 1
+        if stats["connected"] == stats["subscribers"]:
+            ready.set()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event == "prediction":
+                data = json.loads(line[len("data: "):])
+                stats["latencies"].append(time.time() - data["published_at"])
+                received += 1
+                if received == expected:
+                    break
+            elif line.startswith("data: ") and event == "overflow":
+                stats["overflows"] += 1
+                break
+    stats["received"].append(received)
+
+
+async def run(args):
+    server = start_server(args.port)
+    url = f"http://127.0.0.1:{args.port}/api/predictions/stream"
+    site_ids = [str(uuid.uuid4()) for _ in range(args.sites)]
+
+    stats = {"subscribers": args.subscribers, "connected": 0, "latencies": [], "received": [], "overflows": 0}
+    ready = asyncio.Event()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        tasks = [
+            asyncio.create_task(subscriber(client, url, args.events, stats, ready))
+            for _ in range(args.subscribers)
+        ]
+        await asyncio.wait_for(ready.wait(), timeout=60)
+        # Let the last subscriptions register with the hub
+        await asyncio.sleep(0.5)
+        logger.info(f"{stats['connected']} subscribers connected; publishing {args.events} events")
+
+        started = time.perf_counter()
+        await asyncio.to_thread(publish, args.events, args.rate, site_ids)
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=args.timeout)
+        elapsed = time.perf_counter() - started
+
+    server.should_exit = True
+
+    latencies = sorted(stats["latencies"])
+    delivered = len(latencies)
+    print(f"subscribers          {args.subscribers}")
+    print(f"events published     {args.events}")
+    print(f"events delivered     {delivered} / {args.subscribers * args.events}")
+    print(f"overflowed clients   {stats['overflows']}")
+    print(f"delivery rate        {delivered / elapsed:.0f} events/s")
+    if latencies:
+        print(f"latency p50          {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"latency p99          {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+        print(f"latency max          {latencies[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the prediction SSE stream with many subscribers")
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=20.0, help="Events published per second")
+    parser.add_argument("--sites", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,23 @@ from typing import Optional
 import jwt
 from services.common.config import get_settings
 from services.common.logging import setup_logging
-from services.api_gateway.routers import predictions, sites, alerts
-from services.common.database import get_db, engine
-from services.common.models import Base
+from services.api_gateway.routers import predictions, sites, alerts, stream
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from services.common.database import get_db, engine, pool_status
+from services.common.metrics import registry
+from services.common.pubsub import prediction_hub
+from services.api_gateway.cache import response_cache
 
 # Initialize settings and logging
 settings = get_settings()
 logger = setup_logging(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="Rockfall Prediction API",
     description="AI-powered rockfall prediction and monitoring system",
-    version="1.0.0"
+    version="1.0.0",
+    # Endpoints returning plain data are encoded with orjson
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware configuration
@@ -86,7 +88,22 @@ async def health_check():
         "environment": settings.APP_ENV
     }
 
+@app.get("/debug/db-pool")
+async def db_pool_debug():
+    """Connection pool occupancy, configuration and checkout metrics"""
+    return pool_status(engine)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return registry.render()
+
+@app.on_event("startup")
+def follow_predictions():
+    # Drop cached responses of sites as their predictions arrive, from any process
+    response_cache.follow(prediction_hub)
+
 # Include routers
+app.include_router(stream.router)
 app.include_router(predictions.router)
 app.include_router(sites.router)
 app.include_router(alerts.router)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from uuid import UUID
+from services.api_gateway.schemas import AlertSummary
+from services.common.database import get_read_session
+from services.common.models import Alert
+
+router = APIRouter(prefix="/api/alerts", tags=["alerts"])
+
+alerts = Alert.__table__
+
+@router.get("/sites/{site_id}", response_model=List[AlertSummary])
+async def get_site_alerts(
+    site_id: UUID,
+    status: Optional[str] = Query(None, description="pending, sent or error"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_session)
+):
+    """A site's most recent alerts, newest first"""
+    query = select(*[alerts.c[column] for column in AlertSummary.columns()]).where(alerts.c.site_id == str(site_id))
+    if status is not None:
+        query = query.where(alerts.c.status == status)
+    rows = db.execute(query.order_by(alerts.c.created_at.desc()).limit(limit)).all()
+    return [row._asdict() for row in rows]
@@ -1,26 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 from uuid import UUID
-from services.common.database import get_db
+from services.common.database import get_read_session
 from services.common.models import Prediction, Site
-from services.prediction_service.predictor import PredictionService
+from services.common.rollups import choose_granularity, prediction_history, daily_prediction_stats
+from services.api_gateway.history import (
+    naive_utc, parse_fields, decode_cursor, stream_history_page, stream_downsampled
+)
+from services.api_gateway.admission import prediction_admission
+from services.api_gateway.cache import response_cache
+from services.api_gateway.schemas import (
+    PredictionCreated, PredictionDetail, PredictionPage, PredictionRollup, DownsampledPoint, PredictionStats
+)
+from services.api_gateway.scoring import get_predictor, PredictionUnavailable, PredictionRequestError
+from services.common.config import get_settings
 from services.common.logging import setup_logger
 
 router = APIRouter(prefix="/api/predictions", tags=["predictions"])
+settings = get_settings()
 logger = setup_logger("predictions")
-predictor = PredictionService()
 
-@router.post("/sites/{site_id}/predict")
-async def create_prediction(
-    site_id: UUID,
-    db: Session = Depends(get_db)
-):
-    """Generate a new prediction for a site"""
+predictions = Prediction.__table__
+
+@router.post(
+    "/sites/{site_id}/predict",
+    response_model=PredictionCreated,
+    dependencies=[Depends(prediction_admission.admit)]
+)
+async def create_prediction(site_id: UUID):
+    """
+    Generate a new prediction for a site. Callers over their rate limit
+    get 429, and 503 when the gateway is at capacity; both carry Retry-After.
+    """
     try:
-        prediction = predictor.predict(str(site_id))
+        # Scoring blocks (model inference or the remote call); keep it off the event loop
+        prediction = await run_in_threadpool(get_predictor().predict, str(site_id))
+        response_cache.invalidate_site(str(site_id))
         return prediction
+    except PredictionRequestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except PredictionUnavailable as e:
+        logger.warning(f"Prediction service unavailable: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="Prediction service unavailable",
+            headers={"Retry-After": str(int(settings.PREDICTION_BREAKER_RESET_SECONDS))}
+        )
     except Exception as e:
         logger.error(f"Failed to generate prediction: {str(e)}")
         raise HTTPException(
@@ -28,74 +58,120 @@ async def create_prediction(
             detail="Failed to generate prediction"
         )
 
-@router.get("/{site_id}/latest")
+@router.get("/{site_id}/latest", response_model=PredictionDetail)
 async def get_latest_prediction(
+    request: Request,
     site_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_session)
 ):
     """Get the latest prediction for a site"""
-    prediction = (
-        db.query(Prediction)
-        .filter(Prediction.site_id == site_id)
-        .order_by(Prediction.timestamp.desc())
-        .first()
-    )
+    def latest():
+        # Only the schema's columns, as a plain row; no ORM instance is built
+        prediction = db.execute(
+            select(*[predictions.c[column] for column in PredictionDetail.columns()])
+            .where(predictions.c.site_id == str(site_id))
+            .order_by(predictions.c.timestamp.desc(), predictions.c.id.desc())
+            .limit(1)
+        ).first()
+        
+        if not prediction:
+            raise HTTPException(
+                status_code=404,
+                detail="No predictions found for this site"
+            )
+        
+        return prediction._asdict()
     
-    if not prediction:
-        raise HTTPException(
-            status_code=404,
-            detail="No predictions found for this site"
-        )
-    
-    return prediction
+    return response_cache.respond(request, str(site_id), latest, schema=PredictionDetail)
 
-@router.get("/{site_id}/history")
+@router.get(
+    "/{site_id}/history",
+    response_model=Union[List[PredictionRollup], PredictionPage, List[DownsampledPoint]]
+)
 async def get_prediction_history(
+    request: Request,
     site_id: UUID,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db)
+    granularity: str = Query("auto", pattern="^(auto|raw|hour|day)$"),
+    fields: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    points: Optional[int] = Query(None, ge=1, le=5000),
+    db: Session = Depends(get_read_session)
 ):
-    """Get prediction history for a site"""
-    query = db.query(Prediction).filter(Prediction.site_id == site_id)
-    
-    if start_date:
-        query = query.filter(Prediction.timestamp >= start_date)
-    if end_date:
-        query = query.filter(Prediction.timestamp <= end_date)
-    
-    predictions = query.order_by(Prediction.timestamp.desc()).all()
-    return predictions
+    """
+    Get prediction history for a site. Long ranges are served from the
+    hourly or daily rollups unless a granularity is requested explicitly.
+    Raw history is keyset-paginated (newest first, pass back next_cursor),
+    projected to `fields` and streamed; `points` downsamples it for charts.
+    Responses carry an ETag and are cached until the site's next prediction.
+    """
+    # Compared with stored naive UTC timestamps and with utcnow()
+    start_date, end_date = naive_utc(start_date), naive_utc(end_date)
+
+    return response_cache.respond(
+        request,
+        str(site_id),
+        lambda: _history_response(
+            site_id, start_date, end_date, granularity, fields, limit, cursor, points, db
+        ),
+        # Open-ended ranges pick their granularity from the current time
+        vary=granularity if end_date else f"{granularity}|{datetime.utcnow().date().isoformat()}",
+        # Rollup lists; raw pages and downsampled points are streamed
+        schema=List[PredictionRollup]
+    )
+
+def _history_response(site_id, start_date, end_date, granularity, fields, limit, cursor, points, db):
+    if granularity == "auto":
+        granularity = choose_granularity(start_date, end_date or datetime.utcnow())
+        if cursor or fields or points:
+            # Paging, projection and downsampling apply to raw rows
+            granularity = "raw"
+
+    if granularity != "raw":
+        return prediction_history(
+            db,
+            str(site_id),
+            granularity,
+            start_date or datetime.min,
+            end_date or datetime.utcnow()
+        )
+
+    if points:
+        return StreamingResponse(
+            stream_downsampled(str(site_id), start_date, end_date, points),
+            media_type="application/json"
+        )
 
-@router.get("/sites/{site_id}/stats")
+    return StreamingResponse(
+        stream_history_page(
+            str(site_id),
+            start_date,
+            end_date,
+            parse_fields(fields),
+            limit,
+            decode_cursor(cursor) if cursor else None
+        ),
+        media_type="application/json"
+    )
+
+@router.get("/sites/{site_id}/stats", response_model=PredictionStats)
 async def get_site_prediction_stats(
     site_id: UUID,
-    days: int = 7,
-    db: Session = Depends(get_db)
+    request: Request,
+    days: int = Query(7, ge=1, le=3650),
+    db: Session = Depends(get_read_session)
 ):
-    """Get prediction statistics for a site"""
-    from sqlalchemy import func
-    from datetime import datetime, timedelta
-    
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
+    """Get prediction statistics for a site over the last `days` calendar days"""
+    def stats():
+        # A sum over at most `days` per-site daily counter rows
+        return {
+            "period_days": days,
+            **daily_prediction_stats(db, str(site_id), days)
+        }
     
-    stats = (
-        db.query(
-            func.count().label("total_predictions"),
-            func.avg(Prediction.probability).label("avg_probability"),
-            func.count().filter(Prediction.risk_level == "HIGH").label("high_risk_count")
-        )
-        .filter(
-            Prediction.site_id == site_id,
-            Prediction.timestamp.between(start_date, end_date)
-        )
-        .first()
+    # The window moves at midnight even without new predictions
+    return response_cache.respond(
+        request, str(site_id), stats, vary=datetime.utcnow().date().isoformat(), schema=PredictionStats
     )
-    
-    return {
-        "period_days": days,
-        "total_predictions": stats.total_predictions,
-        "average_probability": float(stats.avg_probability) if stats.avg_probability else 0.0,
-        "high_risk_count": stats.high_risk_count
-    }
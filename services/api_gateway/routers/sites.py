@@ -0,0 +1,72 @@
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from services.api_gateway.schemas import RiskMap, SiteImportSummary
+from services.common.config import get_settings
+from services.common.logging import setup_logger
+from services.database_service.site_import import FORMATS, detect_format, import_file
+
+router = APIRouter(prefix="/api/sites", tags=["sites"])
+settings = get_settings()
+logger = setup_logger("sites")
+
+@router.get("/risk-map", response_model=RiskMap)
+async def get_risk_map(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat (WGS84)"),
+    zoom: int = Query(..., ge=0, le=22)
+):
+    """
+    Active sites in the map view with their latest risk, in one response.
+    Below SITE_MAP_CLUSTER_MAX_ZOOM nearby sites come back as clusters
+    carrying the count and the highest risk among them.
+    """
+    # numpy and shapely load with the first map request, not at startup
+    from services.api_gateway.site_index import parse_bbox, site_index
+
+    try:
+        bounds = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return await run_in_threadpool(site_index.risk_map, bounds, zoom)
+
+@router.post("/import", response_model=SiteImportSummary)
+async def import_sites(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern=f"^({'|'.join(FORMATS)})$"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=50000),
+    dedupe_meters: Optional[float] = Query(None, ge=0),
+    dry_run: bool = False
+):
+    """
+    Create sites and their alert configs from a GeoJSON, GeoJSONSeq,
+    GeoPackage or CSV upload. The file is streamed and inserted in chunks;
+    rows that fail validation or lie within dedupe_meters of an existing
+    site are skipped and reported in the summary. A file that becomes
+    unreadable after some chunks were inserted keeps them and reports the
+    error in the summary; one unreadable from the start is rejected (400).
+    """
+    try:
+        fmt = format or detect_format(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        summary = await run_in_threadpool(import_file, file.file, fmt, chunk_size, dedupe_meters, dry_run)
+    except ValueError as e:
+        # Structurally unreadable file
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    finally:
+        await file.close()
+        if not dry_run:
+            # Chunks may have been committed even if the import then failed
+            from services.api_gateway.site_index import site_index
+            site_index.invalidate()
+
+    logger.info(
+        f"Site import of {file.filename}: {summary['created']} created, "
+        f"{summary['duplicates']} duplicates, {summary['invalid']} invalid"
+    )
+    return summary
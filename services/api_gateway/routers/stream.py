@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Query, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from uuid import UUID
+from services.api_gateway.streaming import sse_events, websocket_events
+from services.common.pubsub import prediction_hub
+
+# Push stream of new predictions; kept apart from the predictions router so
+# it does not load the prediction model
+router = APIRouter(prefix="/api/predictions", tags=["predictions"])
+
+def _resume_id(request_or_socket, last_event_id: Optional[int]) -> Optional[int]:
+    """Resume point from the Last-Event-ID header (set by EventSource) or the query"""
+    header = request_or_socket.headers.get("last-event-id")
+    if header and header.isdigit():
+        return int(header)
+    return last_event_id
+
+@router.get("/stream")
+async def stream_predictions(
+    request: Request,
+    site_id: Optional[List[UUID]] = Query(None),
+    min_risk: Optional[str] = Query(None, pattern="^(LOW|MEDIUM|HIGH)$"),
+    last_event_id: Optional[int] = Query(None, ge=0)
+):
+    """
+    Server-sent events for new predictions, optionally limited to some
+    sites and a minimum risk level. Reconnecting with Last-Event-ID replays
+    what was missed while the events are still buffered.
+    """
+    subscription = prediction_hub.subscribe(
+        [str(site) for site in site_id or []],
+        min_risk,
+        _resume_id(request, last_event_id)
+    )
+    return StreamingResponse(
+        sse_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/stream")
+async def stream_predictions_ws(
+    websocket: WebSocket,
+    site_id: Optional[List[UUID]] = Query(None),
+    min_risk: Optional[str] = Query(None, pattern="^(LOW|MEDIUM|HIGH)$"),
+    last_event_id: Optional[int] = Query(None, ge=0)
+):
+    """WebSocket variant of the prediction stream, with the same filters and resume"""
+    await websocket.accept()
+    subscription = prediction_hub.subscribe(
+        [str(site) for site in site_id or []],
+        min_risk,
+        _resume_id(websocket, last_event_id)
+    )
+    await websocket_events(websocket, subscription)
@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class Schema(BaseModel):
+    # protected_namespaces: model_id and model_version are plain fields here
+    model_config = ConfigDict(from_attributes=True, protected_namespaces=())
+
+    @classmethod
+    def columns(cls) -> List[str]:
+        """Table columns to select for this schema, so nothing else is loaded"""
+        return list(cls.model_fields)
+
+
+class PredictionSummary(Schema):
+    """A prediction without its feature snapshot; the default history projection"""
+
+    id: str
+    site_id: str
+    model_id: Optional[str] = None
+    timestamp: datetime
+    probability: float
+    risk_level: str
+    inference_time_ms: Optional[float] = None
+
+
+class PredictionDetail(PredictionSummary):
+    features_snapshot: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+
+
+class PredictionCreated(Schema):
+    id: str
+    timestamp: datetime
+    probability: float
+    risk_level: str
+    model_version: Optional[str] = None
+
+
+class PredictionPage(Schema):
+    """One raw history page; items hold the requested fields= projection"""
+
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+class PredictionRollup(Schema):
+    granularity: str
+    bucket_start: datetime
+    prediction_count: int
+    avg_probability: float
+    max_probability: float
+    high_risk_count: int
+
+
+class DownsampledPoint(Schema):
+    bucket_start: datetime
+    count: int
+    avg_probability: float
+    max_probability: float
+
+
+class PredictionStats(Schema):
+    period_days: int
+    window_start: datetime
+    total_predictions: int
+    average_probability: float
+    high_risk_count: int
+
+
+class AlertSummary(Schema):
+    id: str
+    site_id: str
+    prediction_id: Optional[str] = None
+    risk_level: str
+    status: str
+    channels: Optional[List[str]] = None
+    sent_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class SiteImportSummary(Schema):
+    """Outcome of a bulk site import; errors and duplicate_rows are capped"""
+
+    rows_read: int
+    created: int
+    duplicates: int
+    invalid: int
+    chunks: int
+    dry_run: bool
+    elapsed_seconds: float
+    errors: List[Dict[str, Any]]
+    duplicate_rows: List[Dict[str, Any]]
+    # Set when the file became unreadable after some chunks were imported
+    error: Optional[str] = None
+
+
+class RiskMapSite(Schema):
+    id: str
+    name: str
+    latitude: float
+    longitude: float
+    probability: Optional[float] = None
+    risk_level: Optional[str] = None
+    predicted_at: Optional[datetime] = None
+
+
+class RiskMapCluster(Schema):
+    latitude: float
+    longitude: float
+    count: int
+    max_probability: Optional[float] = None
+    risk_level: Optional[str] = None
+    high_risk_count: int
+
+
+class RiskMap(Schema):
+    """Sites in a map view; at low zoom nearby sites are merged into clusters"""
+
+    zoom: int
+    clustered: bool
+    total: int
+    sites: List[RiskMapSite]
+    clusters: List[RiskMapCluster]
@@ -0,0 +1,250 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+from services.common.config import get_settings
+from services.common.metrics import registry
+from services.common.pubsub import prediction_hub
+
+if TYPE_CHECKING:
+    import requests
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+client_requests = registry.counter(
+    "prediction_client_requests_total",
+    "Requests from the gateway to the prediction service, by result"
+)
+breaker_open = registry.gauge(
+    "prediction_client_breaker_open",
+    "1 while the prediction service circuit breaker is open"
+)
+
+
+class PredictionUnavailable(Exception):
+    """The prediction service cannot be reached or the circuit is open"""
+
+
+class PredictionRequestError(Exception):
+    """The prediction service rejected the request (4xx); not retried"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. After that a single probe call is let
+    through; its success closes the circuit, its failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+        breaker_open.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Prediction service circuit opened after {self.failures} failures")
+                self.opened_at = self.clock()
+        if self.opened_at is not None:
+            breaker_open.set(1)
+
+
+class LocalPredictor:
+    """Scores in the gateway process; the model is loaded on the first prediction"""
+
+    def predict(self, site_id: str) -> Dict[str, Any]:
+        from services.prediction_service.predictor import get_prediction_service
+
+        return get_prediction_service().predict(site_id)
+
+
+class RemotePredictor:
+    """
+    Client for the prediction service. Requests share one keep-alive
+    connection pool. If an attempt has not answered within `hedge_delay`
+    (or fails), another is sent and the first success wins. Every attempt
+    carries the same prediction id, so the service stores one prediction
+    however many attempts reach it.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        hedge_delay: float,
+        max_attempts: int,
+        pool_size: int,
+        breaker: CircuitBreaker,
+        session: Optional["requests.Session"] = None
+    ):
+        # requests loads with the first remote predictor, not at gateway startup
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.hedge_delay = hedge_delay
+        self.max_attempts = max(1, max_attempts)
+        self.breaker = breaker
+
+        if session is None:
+            session = requests.Session()
+            # Retries are handled here, not by urllib3
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._request_error = requests.RequestException
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="prediction-client")
+
+    def _attempt(self, site_id: str, prediction_id: str) -> Dict[str, Any]:
+        try:
+            response = self.session.post(
+                f"{self.base_url}/sites/{site_id}/predict",
+                headers={"Idempotency-Key": prediction_id},
+                timeout=self.timeout
+            )
+        except self._request_error:
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise PredictionUnavailable(f"Prediction service returned {response.status_code}")
+
+        # A 4xx answer still means the service is up
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            raise PredictionRequestError(response.status_code, str(detail))
+        return response.json()
+
+    def predict(self, site_id: str) -> Dict[str, Any]:
+        if not self.breaker.allow():
+            client_requests.inc(labels={"result": "rejected"})
+            raise PredictionUnavailable("Prediction service circuit is open")
+
+        prediction_id = str(uuid.uuid4())
+        pending = {self._executor.submit(self._attempt, site_id, prediction_id)}
+        attempts = 1
+        last_error: Optional[Exception] = None
+
+        while pending:
+            can_hedge = attempts < self.max_attempts
+            done, pending = wait(
+                pending,
+                timeout=self.hedge_delay if can_hedge else None,
+                return_when=FIRST_COMPLETED
+            )
+
+            for future in done:
+                try:
+                    prediction = future.result()
+                except PredictionRequestError:
+                    client_requests.inc(labels={"result": "rejected_by_service"})
+                    raise
+                except (self._request_error, PredictionUnavailable) as e:
+                    last_error = e
+                    continue
+                client_requests.inc(labels={"result": "success"})
+                self._publish(site_id, prediction)
+                return prediction
+
+            # The hedge delay passed or an attempt failed: send another
+            if can_hedge and self.breaker.allow():
+                attempts += 1
+                client_requests.inc(labels={"result": "hedged" if pending else "retried"})
+                pending.add(self._executor.submit(self._attempt, site_id, prediction_id))
+
+        client_requests.inc(labels={"result": "failed"})
+        raise PredictionUnavailable(f"Prediction service failed after {attempts} attempts: {last_error}")
+
+    @staticmethod
+    def _publish(site_id: str, prediction: Dict[str, Any]):
+        # The service's own event reaches this process through the relay
+        if prediction_hub.relay is not None:
+            return
+        # Otherwise it stays in the service's process; push it to this one's streams
+        prediction_hub.deliver({
+            "prediction_id": prediction["id"],
+            "site_id": site_id,
+            "timestamp": prediction["timestamp"],
+            "probability": prediction["probability"],
+            "risk_level": prediction["risk_level"],
+            "model_version": prediction.get("model_version")
+        })
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def get_predictor():
+    """The gateway's predictor for PREDICTION_MODE, created on first use"""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                if settings.PREDICTION_MODE == "remote":
+                    _predictor = RemotePredictor(
+                        settings.PREDICTION_SERVICE_URL,
+                        connect_timeout=settings.PREDICTION_CONNECT_TIMEOUT_SECONDS,
+                        read_timeout=settings.PREDICTION_READ_TIMEOUT_SECONDS,
+                        hedge_delay=settings.PREDICTION_HEDGE_DELAY_SECONDS,
+                        max_attempts=settings.PREDICTION_MAX_ATTEMPTS,
+                        pool_size=settings.PREDICTION_POOL_SIZE,
+                        breaker=CircuitBreaker(
+                            settings.PREDICTION_BREAKER_FAILURES,
+                            settings.PREDICTION_BREAKER_RESET_SECONDS
+                        )
+                    )
+                elif settings.PREDICTION_MODE == "local":
+                    _predictor = LocalPredictor()
+                else:
+                    raise ValueError(f"Unknown PREDICTION_MODE: {settings.PREDICTION_MODE}")
+    return _predictor
@@ -0,0 +1,36 @@
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+import orjson
+from pydantic import BaseModel, TypeAdapter
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    JSON-encode a response body with orjson. Datetimes, UUIDs and row
+    dicts are encoded natively, without a jsonable_encoder pass first.
+    """
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def apply_schema(schema: Any, value: Any) -> Any:
+    """
+    Validate plain response data against a response schema and return it
+    as plain data holding only the schema's fields, as FastAPI does for a
+    response_model; for bodies encoded here rather than by FastAPI.
+    """
+    adapter = _adapter(schema)
+    return adapter.dump_python(adapter.validate_python(value))
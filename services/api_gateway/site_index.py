@@ -0,0 +1,392 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import shapely
+from shapely import STRtree
+from sqlalchemy import and_, func, select
+from services.common.config import get_settings
+from services.common.database import get_db
+from services.common.metrics import registry
+from services.common.models import Prediction, Site
+from services.common.pubsub import RISK_ORDER
+
+settings = get_settings()
+
+sites = Site.__table__
+predictions = Prediction.__table__
+
+RISK_LEVELS = sorted(RISK_ORDER, key=RISK_ORDER.get)
+HIGH_RANK = RISK_ORDER["HIGH"]
+
+# Web Mercator stops here; beyond it y is infinite
+MAX_MERCATOR_LAT = 85.05112878
+TILE_SIZE_PX = 256
+MAX_ZOOM = 22
+
+# (min_lon, min_lat, max_lon, max_lat); min_lon > max_lon crosses the antimeridian
+BBox = Tuple[float, float, float, float]
+
+index_sites = registry.gauge(
+    "site_index_sites",
+    "Active sites in the gateway's spatial index"
+)
+index_refreshes = registry.counter(
+    "site_index_refreshes_total",
+    "Spatial index refreshes, by kind (full, incremental, tree_rebuild)"
+)
+index_refresh_seconds = registry.histogram(
+    "site_index_refresh_seconds",
+    "Time to refresh the spatial index from the database",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+
+@dataclass(frozen=True)
+class SiteSnapshot:
+    """
+    Immutable view of the active sites and their latest risk, in parallel
+    arrays. The STRtree covers the first `indexed` sites; sites appended
+    since are scanned directly until there are enough to rebuild the tree.
+    """
+
+    ids: np.ndarray
+    names: np.ndarray
+    latitude: np.ndarray
+    longitude: np.ndarray
+    # NaN / -1 / None when the site has no recent prediction
+    probability: np.ndarray
+    risk_rank: np.ndarray
+    predicted_at: np.ndarray
+    positions: Dict[str, int]
+    tree: Optional[STRtree]
+    indexed: int
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def query(self, bbox: BBox) -> np.ndarray:
+        """Positions of the sites inside `bbox`"""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if min_lon > max_lon:
+            return np.concatenate([
+                self.query((min_lon, min_lat, 180.0, max_lat)),
+                self.query((-180.0, min_lat, max_lon, max_lat))
+            ])
+
+        hits = [np.empty(0, dtype=np.intp)]
+        if self.tree is not None:
+            hits.append(self.tree.query(shapely.box(min_lon, min_lat, max_lon, max_lat)))
+        if self.indexed < len(self.ids):
+            lat = self.latitude[self.indexed:]
+            lon = self.longitude[self.indexed:]
+            inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+            hits.append(np.flatnonzero(inside) + self.indexed)
+        return np.concatenate(hits)
+
+
+def _rebuild_threshold(indexed: int) -> int:
+    return max(1000, indexed // 10)
+
+
+def build_snapshot(rows: Sequence[Tuple[str, str, float, float]]) -> SiteSnapshot:
+    """Snapshot of (id, name, latitude, longitude) rows with no risk yet"""
+    count = len(rows)
+    ids = np.array([str(row[0]) for row in rows], dtype=object)
+    latitude = np.array([row[2] for row in rows], dtype=np.float64)
+    longitude = np.array([row[3] for row in rows], dtype=np.float64)
+    return SiteSnapshot(
+        ids=ids,
+        names=np.array([row[1] for row in rows], dtype=object),
+        latitude=latitude,
+        longitude=longitude,
+        probability=np.full(count, np.nan),
+        risk_rank=np.full(count, -1, dtype=np.int8),
+        predicted_at=np.full(count, None, dtype=object),
+        positions={site_id: position for position, site_id in enumerate(ids)},
+        tree=STRtree(shapely.points(longitude, latitude)) if count else None,
+        indexed=count
+    )
+
+
+def with_sites(snapshot: SiteSnapshot, rows: Sequence[Tuple[str, str, float, float]]) -> SiteSnapshot:
+    """Snapshot with new sites appended; the tree is rebuilt once enough are outside it"""
+    rows = [row for row in rows if str(row[0]) not in snapshot.positions]
+    if not rows:
+        return snapshot
+
+    added = build_snapshot(rows)
+    positions = dict(snapshot.positions)
+    positions.update((site_id, position + len(snapshot)) for position, site_id in enumerate(added.ids))
+    latitude = np.concatenate([snapshot.latitude, added.latitude])
+    longitude = np.concatenate([snapshot.longitude, added.longitude])
+
+    tree, indexed = snapshot.tree, snapshot.indexed
+    if len(latitude) - indexed > _rebuild_threshold(indexed):
+        tree, indexed = STRtree(shapely.points(longitude, latitude)), len(latitude)
+        index_refreshes.inc(labels={"kind": "tree_rebuild"})
+
+    return SiteSnapshot(
+        ids=np.concatenate([snapshot.ids, added.ids]),
+        names=np.concatenate([snapshot.names, added.names]),
+        latitude=latitude,
+        longitude=longitude,
+        probability=np.concatenate([snapshot.probability, added.probability]),
+        risk_rank=np.concatenate([snapshot.risk_rank, added.risk_rank]),
+        predicted_at=np.concatenate([snapshot.predicted_at, added.predicted_at]),
+        positions=positions,
+        tree=tree,
+        indexed=indexed
+    )
+
+
+def with_predictions(snapshot: SiteSnapshot, rows: Sequence[Tuple[str, datetime, float, str]]) -> SiteSnapshot:
+    """Snapshot with (site_id, timestamp, probability, risk_level) applied where newer"""
+    if not rows:
+        return snapshot
+
+    probability = snapshot.probability.copy()
+    risk_rank = snapshot.risk_rank.copy()
+    predicted_at = snapshot.predicted_at.copy()
+    for site_id, timestamp, value, risk_level in rows:
+        position = snapshot.positions.get(str(site_id))
+        if position is None:
+            continue
+        current = predicted_at[position]
+        if current is not None and current > timestamp:
+            continue
+        probability[position] = value
+        risk_rank[position] = RISK_ORDER.get(risk_level, -1)
+        predicted_at[position] = timestamp
+
+    return SiteSnapshot(
+        ids=snapshot.ids,
+        names=snapshot.names,
+        latitude=snapshot.latitude,
+        longitude=snapshot.longitude,
+        probability=probability,
+        risk_rank=risk_rank,
+        predicted_at=predicted_at,
+        positions=snapshot.positions,
+        tree=snapshot.tree,
+        indexed=snapshot.indexed
+    )
+
+
+def parse_bbox(value: str) -> BBox:
+    """"min_lon,min_lat,max_lon,max_lat" in WGS84 degrees"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not all(math.isfinite(part) for part in (min_lon, min_lat, max_lon, max_lat)):
+        raise ValueError("bbox must be finite")
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise ValueError("bbox longitudes must be within [-180, 180]")
+    if not -90 <= min_lat <= max_lat <= 90:
+        raise ValueError("bbox latitudes must be within [-90, 90] with min_lat <= max_lat")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else float(value)
+
+
+def _site(snapshot: SiteSnapshot, position: int) -> Dict[str, Any]:
+    rank = snapshot.risk_rank[position]
+    return {
+        "id": snapshot.ids[position],
+        "name": snapshot.names[position],
+        "latitude": float(snapshot.latitude[position]),
+        "longitude": float(snapshot.longitude[position]),
+        "probability": _optional(snapshot.probability[position]),
+        "risk_level": RISK_LEVELS[rank] if rank >= 0 else None,
+        "predicted_at": snapshot.predicted_at[position]
+    }
+
+
+def cluster(snapshot: SiteSnapshot, positions: np.ndarray, zoom: int, radius_px: int) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Grid clustering in Web Mercator pixels at `zoom`: sites in the same
+    `radius_px` cell are merged. Returns the clusters of two or more sites
+    and the positions of the sites left on their own.
+    """
+    latitude = snapshot.latitude[positions]
+    longitude = snapshot.longitude[positions]
+    world_px = TILE_SIZE_PX * 2.0 ** zoom
+
+    x = (longitude + 180.0) / 360.0 * world_px
+    sin_lat = np.sin(np.radians(np.clip(latitude, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)))
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)) * world_px
+    cells = np.floor(x / radius_px).astype(np.int64) * (1 << 32) + np.floor(y / radius_px).astype(np.int64)
+
+    # One sort groups the sites by cell
+    order = np.argsort(cells)
+    cells = cells[order]
+    starts = np.flatnonzero(np.concatenate([[True], cells[1:] != cells[:-1]]))
+    counts = np.diff(np.append(starts, len(cells)))
+
+    mean_lat = np.add.reduceat(latitude[order], starts) / counts
+    mean_lon = np.add.reduceat(longitude[order], starts) / counts
+    # fmax skips NaN, so sites with no recent prediction do not hide the others
+    max_probability = np.fmax.reduceat(snapshot.probability[positions][order], starts)
+    rank = snapshot.risk_rank[positions][order]
+    max_rank = np.maximum.reduceat(rank, starts)
+    high_risk = np.add.reduceat((rank == HIGH_RANK).astype(np.int64), starts)
+
+    clusters = [
+        {
+            "latitude": float(mean_lat[cell]),
+            "longitude": float(mean_lon[cell]),
+            "count": int(counts[cell]),
+            "max_probability": _optional(max_probability[cell]),
+            "risk_level": RISK_LEVELS[max_rank[cell]] if max_rank[cell] >= 0 else None,
+            "high_risk_count": int(high_risk[cell])
+        }
+        for cell in np.flatnonzero(counts > 1)
+    ]
+    return clusters, positions[order[starts[counts == 1]]]
+
+
+def risk_map(
+    snapshot: SiteSnapshot,
+    bbox: BBox,
+    zoom: int,
+    cluster_max_zoom: int = settings.SITE_MAP_CLUSTER_MAX_ZOOM,
+    radius_px: int = settings.SITE_MAP_CLUSTER_RADIUS_PX,
+    max_items: int = settings.SITE_MAP_MAX_SITES
+) -> Dict[str, Any]:
+    """
+    Sites inside `bbox` with their latest risk. Below `cluster_max_zoom`,
+    or whenever the view holds more than `max_items` sites, nearby sites
+    are clustered; the cluster grid is coarsened until at most `max_items`
+    markers remain.
+    """
+    positions = snapshot.query(bbox)
+    clustered = zoom < cluster_max_zoom or len(positions) > max_items
+    clusters: List[Dict[str, Any]] = []
+    single = positions
+
+    if clustered and len(positions):
+        cluster_zoom = min(zoom, MAX_ZOOM)
+        while True:
+            clusters, single = cluster(snapshot, positions, cluster_zoom, radius_px)
+            if len(clusters) + len(single) <= max_items or cluster_zoom == 0:
+                break
+            cluster_zoom -= 1
+
+    return {
+        "zoom": zoom,
+        "clustered": clustered,
+        "total": int(len(positions)),
+        "sites": [_site(snapshot, position) for position in single.tolist()],
+        "clusters": clusters
+    }
+
+
+class SiteIndex:
+    """
+    The gateway's in-memory spatial index of active sites. Requests read an
+    immutable snapshot; at most every `refresh_interval` seconds one caller
+    refreshes it from the database while the others keep using the
+    current one. Refreshes are incremental: sites created and predictions
+    made since the previous refresh (with `overlap` seconds of slack for
+    late commits) are merged in. A change in the number of active sites
+    means some were removed or deactivated, and triggers a full reload.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = lambda: get_db(read_only=True),
+        refresh_interval: float = settings.SITE_MAP_REFRESH_SECONDS,
+        lookback_hours: float = settings.SITE_MAP_RISK_LOOKBACK_HOURS,
+        overlap: float = settings.SITE_MAP_PREDICTION_OVERLAP_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.lookback = timedelta(hours=lookback_hours)
+        self.overlap = timedelta(seconds=overlap)
+        self.clock = clock
+        self._snapshot: Optional[SiteSnapshot] = None
+        self._refreshed_at = -math.inf
+        self._since: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> SiteSnapshot:
+        """Current snapshot, refreshed first when stale"""
+        if self._snapshot is None or self.clock() - self._refreshed_at >= self.refresh_interval:
+            # Only the first load makes callers wait for another thread's refresh
+            if self._lock.acquire(blocking=self._snapshot is None):
+                try:
+                    if self._snapshot is None or self.clock() - self._refreshed_at >= self.refresh_interval:
+                        self.refresh()
+                finally:
+                    self._lock.release()
+        return self._snapshot
+
+    def invalidate(self):
+        """Refresh on the next read, e.g. after sites were imported"""
+        self._refreshed_at = -math.inf
+
+    def risk_map(self, bbox: BBox, zoom: int) -> Dict[str, Any]:
+        return risk_map(self.snapshot(), bbox, zoom)
+
+    def refresh(self):
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            active = sites.c.is_active.isnot(False)
+            if self._snapshot is None:
+                snapshot = self._load(db, active, now - self.lookback)
+                kind = "full"
+            else:
+                since = self._since - self.overlap
+                new_sites = db.execute(
+                    select(sites.c.id, sites.c.name, sites.c.latitude, sites.c.longitude)
+                    .where(active, sites.c.created_at >= since)
+                ).all()
+                snapshot = with_sites(self._snapshot, new_sites)
+                active_count = db.execute(select(func.count()).select_from(sites).where(active)).scalar()
+                if active_count != len(snapshot):
+                    snapshot = self._load(db, active, now - self.lookback)
+                    kind = "full"
+                else:
+                    snapshot = with_predictions(snapshot, self._latest_predictions(db, since))
+                    kind = "incremental"
+
+        self._snapshot = snapshot
+        self._since = now
+        self._refreshed_at = self.clock()
+        index_sites.set(len(snapshot))
+        index_refreshes.inc(labels={"kind": kind})
+        index_refresh_seconds.observe(time.perf_counter() - started)
+
+    def _load(self, db, active, since: datetime) -> SiteSnapshot:
+        rows = db.execute(
+            select(sites.c.id, sites.c.name, sites.c.latitude, sites.c.longitude).where(active)
+        ).all()
+        return with_predictions(build_snapshot(rows), self._latest_predictions(db, since))
+
+    @staticmethod
+    def _latest_predictions(db, since: datetime) -> List[Tuple[str, datetime, float, str]]:
+        """Each site's newest prediction at or after `since`"""
+        latest = (
+            select(predictions.c.site_id, func.max(predictions.c.timestamp).label("timestamp"))
+            .where(predictions.c.timestamp >= since)
+            .group_by(predictions.c.site_id)
+            .subquery()
+        )
+        return db.execute(
+            select(predictions.c.site_id, predictions.c.timestamp, predictions.c.probability, predictions.c.risk_level)
+            .join(latest, and_(
+                predictions.c.site_id == latest.c.site_id,
+                predictions.c.timestamp == latest.c.timestamp
+            ))
+        ).all()
+
+
+site_index = SiteIndex()
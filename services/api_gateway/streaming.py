@@ -0,0 +1,79 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+from services.common.config import get_settings
+from services.common.pubsub import OVERFLOW, Subscription
+
+settings = get_settings()
+
+
+def _sse(event: str, data: str, event_id: Optional[int] = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {data}\n\n"
+
+
+async def sse_events(subscription: Subscription) -> AsyncIterator[str]:
+    """
+    Server-sent events for one subscription. Emits `reset` first when the
+    resume point is no longer buffered, a comment every heartbeat interval
+    while idle, and `overflow` before closing a subscriber that fell too far
+    behind (the client reconnects with Last-Event-ID).
+    """
+    try:
+        yield "retry: 3000\n\n"
+        if subscription.gap:
+            yield _sse("reset", "{}")
+
+        while True:
+            event = await subscription.get(settings.STREAM_HEARTBEAT_SECONDS)
+            if event is None:
+                yield ": keep-alive\n\n"
+            elif event is OVERFLOW:
+                yield _sse("overflow", "{}")
+                return
+            else:
+                yield _sse("prediction", json.dumps(event["data"], default=str), event["id"])
+    finally:
+        subscription.close()
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+async def websocket_events(websocket: WebSocket, subscription: Subscription):
+    """Same stream as sse_events, as JSON messages on an accepted WebSocket"""
+    # Client messages are ignored, but reading them is how a close is noticed
+    disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        if subscription.gap:
+            await websocket.send_json({"event": "reset"})
+
+        while True:
+            next_event = asyncio.create_task(subscription.get(settings.STREAM_HEARTBEAT_SECONDS))
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_event.cancel()
+                return
+
+            event = next_event.result()
+            if event is None:
+                await websocket.send_json({"event": "heartbeat"})
+            elif event is OVERFLOW:
+                await websocket.send_json({"event": "overflow"})
+                await websocket.close(code=1013)
+                return
+            else:
+                await websocket.send_text(json.dumps(
+                    {"id": event["id"], "event": "prediction", "data": event["data"]},
+                    default=str
+                ))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        subscription.close()
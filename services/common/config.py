@@ -1,4 +1,10 @@
 # Basic settings class and get_settings function
+import os
+import secrets
+
+# Signing key for this process when SECRET_KEY is unset
+_PROCESS_SECRET_KEY = secrets.token_urlsafe(32)
+
 class Settings:
 	def __init__(self):
 		self.api_gateway_host = "localhost"
@@ -8,5 +14,196 @@ class Settings:
 		self.alert_manager_host = "localhost"
 		self.alert_manager_port = 8002
 
+		# Reported by the gateway's /health
+		self.APP_VERSION = os.getenv("APP_VERSION", "1.0.0")
+		self.APP_ENV = os.getenv("APP_ENV", "development")
+
+		# Gateway access tokens. Without SECRET_KEY each process signs with a
+		# random key, so tokens only work on the worker that issued them
+		self.SECRET_KEY = os.getenv("SECRET_KEY") or _PROCESS_SECRET_KEY
+		self.ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+		self.ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+
+		# Feature store: weather and seismic readings are merged per time bucket
+		self.FEATURE_BUCKET_MINUTES = int(os.getenv("FEATURE_BUCKET_MINUTES", "5"))
+
+		# Risk-adaptive collection scheduler
+		self.COLLECT_INTERVAL_HIGH_SECONDS = float(os.getenv("COLLECT_INTERVAL_HIGH_SECONDS", "60"))
+		self.COLLECT_INTERVAL_ELEVATED_SECONDS = float(os.getenv("COLLECT_INTERVAL_ELEVATED_SECONDS", "120"))
+		self.COLLECT_INTERVAL_DEFAULT_SECONDS = float(os.getenv("COLLECT_INTERVAL_DEFAULT_SECONDS", "300"))
+		self.COLLECT_INTERVAL_QUIET_SECONDS = float(os.getenv("COLLECT_INTERVAL_QUIET_SECONDS", "1800"))
+		self.COLLECT_RAIN_INTENSITY_MM_H = float(os.getenv("COLLECT_RAIN_INTENSITY_MM_H", "5.0"))
+		self.COLLECT_SEISMIC_MAGNITUDE = float(os.getenv("COLLECT_SEISMIC_MAGNITUDE", "3.0"))
+		self.COLLECT_SITE_REFRESH_SECONDS = float(os.getenv("COLLECT_SITE_REFRESH_SECONDS", "300"))
+		self.COLLECTOR_METRICS_PORT = int(os.getenv("COLLECTOR_METRICS_PORT", "0"))
+
+		# Database connection pool. SERVICE_NAME selects per-service overrides,
+		# e.g. API_GATEWAY_DB_POOL_SIZE takes precedence over DB_POOL_SIZE.
+		self.SERVICE_NAME = os.getenv("SERVICE_NAME", "default")
+		self.DB_POOL_SIZE = self._service_int("DB_POOL_SIZE", 5)
+		self.DB_MAX_OVERFLOW = self._service_int("DB_MAX_OVERFLOW", 10)
+		self.DB_POOL_TIMEOUT = self._service_int("DB_POOL_TIMEOUT", 30)
+		self.DB_POOL_RECYCLE = self._service_int("DB_POOL_RECYCLE", 1800)
+		self.DB_POOL_PRE_PING = self._service_value("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+		# Read replicas for read-only sessions (comma-separated URLs); an
+		# unhealthy replica is skipped until its next health check
+		self.DATABASE_REPLICA_URLS = [
+			url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+		]
+		self.DB_REPLICA_HEALTH_INTERVAL_SECONDS = float(os.getenv("DB_REPLICA_HEALTH_INTERVAL_SECONDS", "30"))
+
+		# Monthly partitions of site_features and predictions (Postgres only)
+		self.PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+		self.PARTITION_RETAIN_MONTHS = int(os.getenv("PARTITION_RETAIN_MONTHS", "24"))
+		self.PARTITION_ARCHIVE_SCHEMA = os.getenv("PARTITION_ARCHIVE_SCHEMA", "archive")
+		# How often the data collector creates upcoming partitions and archives expired ones; 0 disables
+		self.PARTITION_MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SECONDS", "86400"))
+
+		# History requests longer than these spans are served from rollups
+		self.ROLLUP_HOURLY_AFTER_HOURS = int(os.getenv("ROLLUP_HOURLY_AFTER_HOURS", "48"))
+		self.ROLLUP_DAILY_AFTER_DAYS = int(os.getenv("ROLLUP_DAILY_AFTER_DAYS", "90"))
+
+		# Retention: rows older than a table's hot window are exported to
+		# Parquet under RETENTION_ARCHIVE_DIR and deleted; 0 keeps everything
+		self.RETENTION_HOT_DAYS = {
+			"site_features": int(os.getenv("RETENTION_SITE_FEATURES_DAYS", "180")),
+			"predictions": int(os.getenv("RETENTION_PREDICTIONS_DAYS", "365")),
+			"prediction_keys": int(os.getenv("RETENTION_PREDICTION_KEYS_DAYS", "7")),
+			"alert_history": int(os.getenv("RETENTION_ALERT_HISTORY_DAYS", "365")),
+			"alert_outbox": int(os.getenv("RETENTION_ALERT_OUTBOX_DAYS", os.getenv("RETENTION_ALERTS_DAYS", "365"))),
+			"alerts": int(os.getenv("RETENTION_ALERTS_DAYS", "365"))
+		}
+		self.RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "archive")
+		self.RETENTION_CHECKPOINT_DIR = os.getenv("RETENTION_CHECKPOINT_DIR", "archive/.checkpoints")
+		self.RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "5000"))
+
+		# API gateway response cache. Responses are keyed by each site's latest
+		# prediction; without STREAM_BROKER_URL the marker TTL bounds staleness
+		# for writes made by other processes. RESPONSE_CACHE_URL (redis://...) shares the cache between
+		# gateway workers instead of keeping an in-process LRU per worker.
+		self.RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+		self.RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+		self.RESPONSE_CACHE_MARKER_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_MARKER_TTL_SECONDS", "10"))
+		self.RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+
+		# Prediction push stream (SSE/WebSocket): events kept for Last-Event-ID
+		# resume, and per-connection queue size before a slow client is cut off
+		self.STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "10000"))
+		self.STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+		self.STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+		# Redis (redis://...) relaying stream events between processes. Without
+		# it a gateway worker only streams predictions made in its own process,
+		# so it is required with PREDICTION_MODE=remote, with several gateway
+		# workers, or to stream the collector's scheduled predictions
+		self.STREAM_BROKER_URL = os.getenv("STREAM_BROKER_URL", "")
+
+		# Gateway predictions: "local" loads the model in the gateway process on
+		# first use; "remote" calls the prediction service over pooled keep-alive
+		# connections, with a circuit breaker and a hedged second attempt
+		self.PREDICTION_MODE = os.getenv("PREDICTION_MODE", "local")
+		self.PREDICTION_SERVICE_URL = os.getenv(
+			"PREDICTION_SERVICE_URL", f"http://{self.prediction_service_host}:{self.prediction_service_port}"
+		)
+		self.PREDICTION_CONNECT_TIMEOUT_SECONDS = float(os.getenv("PREDICTION_CONNECT_TIMEOUT_SECONDS", "1"))
+		self.PREDICTION_READ_TIMEOUT_SECONDS = float(os.getenv("PREDICTION_READ_TIMEOUT_SECONDS", "5"))
+		self.PREDICTION_HEDGE_DELAY_SECONDS = float(os.getenv("PREDICTION_HEDGE_DELAY_SECONDS", "0.5"))
+		self.PREDICTION_MAX_ATTEMPTS = int(os.getenv("PREDICTION_MAX_ATTEMPTS", "2"))
+		self.PREDICTION_POOL_SIZE = int(os.getenv("PREDICTION_POOL_SIZE", "10"))
+		self.PREDICTION_BREAKER_FAILURES = int(os.getenv("PREDICTION_BREAKER_FAILURES", "5"))
+		self.PREDICTION_BREAKER_RESET_SECONDS = float(os.getenv("PREDICTION_BREAKER_RESET_SECONDS", "30"))
+
+		# Probability cut-offs for the HIGH and MEDIUM risk levels
+		self.PREDICTION_THRESHOLD_HIGH = float(os.getenv("PREDICTION_THRESHOLD_HIGH", "0.7"))
+		self.PREDICTION_THRESHOLD_MEDIUM = float(os.getenv("PREDICTION_THRESHOLD_MEDIUM", "0.4"))
+
+		# Admission control for on-demand predictions: a token bucket per
+		# client, then at most ADMISSION_MAX_CONCURRENT predictions per worker
+		# with a bounded wait queue. New requests are shed while queue delay
+		# stays above the target for a whole interval. ADMISSION_STORE_URL
+		# (redis://...) shares the client buckets between workers.
+		self.ADMISSION_RATE_PER_SECOND = float(os.getenv("ADMISSION_RATE_PER_SECOND", "1"))
+		self.ADMISSION_BURST = int(os.getenv("ADMISSION_BURST", "10"))
+		self.ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+		self.ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+		self.ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+		self.ADMISSION_TARGET_QUEUE_DELAY_SECONDS = float(os.getenv("ADMISSION_TARGET_QUEUE_DELAY_SECONDS", "0.1"))
+		self.ADMISSION_SHED_INTERVAL_SECONDS = float(os.getenv("ADMISSION_SHED_INTERVAL_SECONDS", "1"))
+		self.ADMISSION_STORE_URL = os.getenv("ADMISSION_STORE_URL", "")
+		self.ADMISSION_TRUST_FORWARDED_FOR = os.getenv("ADMISSION_TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+
+		# Bulk site import: rows per insert transaction, and the distance within
+		# which an imported site counts as a duplicate of an existing one
+		self.SITE_IMPORT_CHUNK_SIZE = int(os.getenv("SITE_IMPORT_CHUNK_SIZE", "1000"))
+		self.SITE_IMPORT_DEDUPE_METERS = float(os.getenv("SITE_IMPORT_DEDUPE_METERS", "50"))
+		self.SITE_IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("SITE_IMPORT_MAX_REPORTED_ERRORS", "100"))
+
+		# Site risk map: seconds between incremental index refreshes, how far
+		# back a prediction still counts as a site's latest risk, and clustering
+		self.SITE_MAP_REFRESH_SECONDS = float(os.getenv("SITE_MAP_REFRESH_SECONDS", "15"))
+		self.SITE_MAP_RISK_LOOKBACK_HOURS = float(os.getenv("SITE_MAP_RISK_LOOKBACK_HOURS", "168"))
+		self.SITE_MAP_PREDICTION_OVERLAP_SECONDS = float(os.getenv("SITE_MAP_PREDICTION_OVERLAP_SECONDS", "120"))
+		self.SITE_MAP_CLUSTER_MAX_ZOOM = int(os.getenv("SITE_MAP_CLUSTER_MAX_ZOOM", "11"))
+		self.SITE_MAP_CLUSTER_RADIUS_PX = int(os.getenv("SITE_MAP_CLUSTER_RADIUS_PX", "60"))
+		self.SITE_MAP_MAX_SITES = int(os.getenv("SITE_MAP_MAX_SITES", "5000"))
+
+		# Outgoing alert email: server, credentials and the pooled sender's
+		# connection count, per-connection message cap and idle recheck
+		self.SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+		self.SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+		self.SMTP_USER = os.getenv("SMTP_USER", os.getenv("SMTP_USERNAME", ""))
+		self.SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+		self.SMTP_FROM = os.getenv("SMTP_FROM", self.SMTP_USER)
+		self.SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+		self.SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "false").lower() in ("1", "true", "yes")
+		self.SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+		self.SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+		self.SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+		self.SMTP_IDLE_CHECK_SECONDS = float(os.getenv("SMTP_IDLE_CHECK_SECONDS", "30"))
+		self.SMTP_MAX_PENDING = int(os.getenv("SMTP_MAX_PENDING", "1000"))
+
+		# Alert notification outbox: rows claimed per batch, how long a claim
+		# lasts before another dispatcher may retry it, and retry backoff
+		self.ALERT_OUTBOX_ENABLED = os.getenv("ALERT_OUTBOX_ENABLED", "true").lower() in ("1", "true", "yes")
+		self.ALERT_OUTBOX_BATCH_SIZE = int(os.getenv("ALERT_OUTBOX_BATCH_SIZE", "50"))
+		self.ALERT_OUTBOX_POLL_SECONDS = float(os.getenv("ALERT_OUTBOX_POLL_SECONDS", "1"))
+		self.ALERT_OUTBOX_LEASE_SECONDS = float(os.getenv("ALERT_OUTBOX_LEASE_SECONDS", "120"))
+		self.ALERT_OUTBOX_MAX_ATTEMPTS = int(os.getenv("ALERT_OUTBOX_MAX_ATTEMPTS", "6"))
+		self.ALERT_OUTBOX_BACKOFF_SECONDS = float(os.getenv("ALERT_OUTBOX_BACKOFF_SECONDS", "5"))
+		self.ALERT_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("ALERT_OUTBOX_MAX_BACKOFF_SECONDS", "600"))
+		self.ALERT_OUTBOX_SEND_TIMEOUT_SECONDS = float(os.getenv("ALERT_OUTBOX_SEND_TIMEOUT_SECONDS", "30"))
+		self.ALERT_OUTBOX_SMS_CONCURRENCY = int(os.getenv("ALERT_OUTBOX_SMS_CONCURRENCY", "8"))
+
+		# SMS via Twilio
+		self.TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
+		self.TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
+		self.TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER", "")
+
+		# Alert throttling: minutes after an alert before the same site and
+		# risk level may alert again; the optional Redis store shares the
+		# throttle index between alert manager workers
+		self.ALERT_THROTTLE_HIGH = int(os.getenv("ALERT_THROTTLE_HIGH", "30"))
+		self.ALERT_THROTTLE_MEDIUM = int(os.getenv("ALERT_THROTTLE_MEDIUM", "120"))
+		self.ALERT_THROTTLE_STORE_URL = os.getenv("ALERT_THROTTLE_STORE_URL", "")
+
+		# Alert digests: notifications below these risk levels wait up to the
+		# window and go out as one digest per recipient; 0 sends each at once
+		self.ALERT_DIGEST_WINDOW_SECONDS = float(os.getenv("ALERT_DIGEST_WINDOW_SECONDS", "120"))
+		self.ALERT_DIGEST_IMMEDIATE_LEVELS = os.getenv("ALERT_DIGEST_IMMEDIATE_LEVELS", "HIGH")
+
+		# Bulk alert evaluation: seconds between checks of the AlertConfig
+		# version (row count and latest updated_at) behind the cached table,
+		# and the largest batch accepted by POST /alerts/bulk
+		self.ALERT_CONFIG_CACHE_CHECK_SECONDS = float(os.getenv("ALERT_CONFIG_CACHE_CHECK_SECONDS", "5"))
+		self.ALERT_BULK_MAX_PREDICTIONS = int(os.getenv("ALERT_BULK_MAX_PREDICTIONS", "10000"))
+
+	def _service_value(self, name, default):
+		"""Per-service override (<SERVICE_NAME>_<name>) falling back to <name>"""
+		prefix = self.SERVICE_NAME.upper().replace("-", "_")
+		return os.getenv(f"{prefix}_{name}", os.getenv(name, str(default)))
+
+	def _service_int(self, name, default):
+		return int(self._service_value(name, default))
+
 def get_settings():
 	return Settings()
@@ -1,22 +1,276 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+import itertools
+import logging
 import os
+import threading
+import time
+from services.common.config import get_settings
+from services.common.metrics import registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 # Use SQLite for local development
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./rockfall.db')
 
-# Create database engine
-engine = create_engine(DATABASE_URL)
+pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection"
+)
+pool_checkout_timeouts = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT"
+)
+pool_checked_out = registry.gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool"
+)
+pool_connections_opened = registry.counter(
+    "db_pool_connections_opened_total",
+    "New DBAPI connections opened by the pool"
+)
+pool_connections_closed = registry.counter(
+    "db_pool_connections_closed_total",
+    "DBAPI connections closed, by reason"
+)
+replica_healthy = registry.gauge(
+    "db_replica_healthy",
+    "1 if the read replica passed its last health check"
+)
+replica_fallbacks = registry.counter(
+    "db_replica_fallbacks_total",
+    "Read-only sessions sent to the primary because no replica was healthy"
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_checkout_timeouts.inc()
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start)
+
+
+def pool_options(url: str) -> Dict[str, Any]:
+    """create_engine pool arguments for this service, from settings"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE
+    }
+
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite keeps its per-thread pool
+        return options
+
+    options.update({
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT
+    })
+    return options
+
+
+def instrument_pool(engine):
+    """Track occupancy and connection churn through pool events"""
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        pool_connections_opened.inc()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        pool_checked_out.dec()
+
+    @event.listens_for(engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        pool_connections_closed.inc(labels={"reason": "closed"})
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool_connections_closed.inc(labels={"reason": "invalidated"})
+
+
+def pool_status(engine) -> Dict[str, Any]:
+    """Current pool state and configuration for the debug endpoint"""
+    pool = engine.pool
+    status = {
+        "service": settings.SERVICE_NAME,
+        "pool_class": type(pool).__name__,
+        "status": pool.status()
+    }
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "config": {
+                "pool_size": settings.DB_POOL_SIZE,
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "pool_timeout": settings.DB_POOL_TIMEOUT,
+                "pool_recycle": settings.DB_POOL_RECYCLE,
+                "pool_pre_ping": settings.DB_POOL_PRE_PING
+            }
+        })
+
+    if replicas:
+        status["replicas"] = replicas.status()
+
+    metrics = registry.snapshot()
+    status["metrics"] = {
+        name: value for name, value in metrics.items()
+        if name.startswith(("db_pool_", "db_replica_"))
+    }
+    return status
+
+
+def dialect_name(conn) -> str:
+    """Dialect name for a Session or Connection"""
+    if isinstance(conn, Session):
+        return conn.get_bind().dialect.name
+    return conn.dialect.name
+
+
+class ReplicaSet:
+    """
+    Round-robin over read replica engines. Each replica is health-checked
+    with a SELECT 1 at most once per `health_interval` seconds; an unhealthy
+    replica is skipped until a later check succeeds.
+    """
+
+    def __init__(self, engines: List[Any], health_interval: float = 30.0, clock=time.monotonic):
+        self.engines = engines
+        self.health_interval = health_interval
+        self.clock = clock
+        self._healthy = [True] * len(engines)
+        self._checked_at = [None] * len(engines)
+        self._cycle = itertools.cycle(range(len(engines)))
+        self._lock = threading.Lock()
+
+    def _check(self, index: int) -> bool:
+        now = self.clock()
+        checked_at = self._checked_at[index]
+        if checked_at is not None and now - checked_at < self.health_interval:
+            return self._healthy[index]
+
+        try:
+            with self.engines[index].connect() as conn:
+                conn.execute(text("SELECT 1"))
+            healthy = True
+        except Exception as e:
+            if self._healthy[index]:
+                logger.warning(f"Read replica {index} failed its health check: {str(e)}")
+            healthy = False
+
+        self._healthy[index] = healthy
+        self._checked_at[index] = now
+        replica_healthy.set(1 if healthy else 0, labels={"replica": str(index)})
+        return healthy
+
+    def choose(self) -> Optional[Any]:
+        """Next healthy replica engine, or None if there is none"""
+        with self._lock:
+            for _ in range(len(self.engines)):
+                index = next(self._cycle)
+                if self._check(index):
+                    return self.engines[index]
+        return None
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"replica": index, "healthy": healthy}
+            for index, healthy in enumerate(self._healthy)
+        ]
+
+
+class SessionRouter:
+    """Hands out sessions on the primary, or on a replica for read-only work"""
+
+    def __init__(self, primary, replicas: Optional[ReplicaSet] = None):
+        self.primary = primary
+        self.replicas = replicas
+        self.write_sessions = sessionmaker(autocommit=False, autoflush=False, bind=primary)
+        self.read_sessions = sessionmaker(autocommit=False, autoflush=False)
+
+    def session(self, read_only: bool = False) -> Session:
+        if not read_only:
+            return self.write_sessions()
+
+        bind = self.replicas.choose() if self.replicas else None
+        if bind is None:
+            if self.replicas:
+                replica_fallbacks.inc()
+            bind = self.primary
+
+        db = self.read_sessions(bind=bind)
+        db.info["read_only"] = True
+        return db
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_read_only_flush(session, flush_context, instances):
+    if session.info.get("read_only"):
+        raise RuntimeError("Attempted to write through a read-only session")
+
+
+def make_engine(url: str):
+    """Engine with this service's pool settings and pool instrumentation"""
+    new_engine = create_engine(url, **pool_options(url))
+    instrument_pool(new_engine)
+    return new_engine
+
+
+# Create database engines
+engine = make_engine(DATABASE_URL)
+replicas = None
+if settings.DATABASE_REPLICA_URLS:
+    replicas = ReplicaSet(
+        [make_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+        health_interval=settings.DB_REPLICA_HEALTH_INTERVAL_SECONDS
+    )
+
+session_router = SessionRouter(engine, replicas)
 
 # Create sessionmaker
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = session_router.write_sessions
 
 @contextmanager
-def get_db() -> Session:
-    """Get database session"""
-    db = SessionLocal()
+def get_db(read_only: bool = False) -> Session:
+    """
+    Get database session. Read-only sessions go to a healthy read replica
+    when DATABASE_REPLICA_URLS is set, otherwise to the primary.
+    """
+    db = session_router.session(read_only)
     try:
         yield db
     finally:
         db.close()
+
+def get_session() -> Iterator[Session]:
+    """FastAPI dependency: read-write session on the primary"""
+    with get_db() as db:
+        yield db
+
+def get_read_session() -> Iterator[Session]:
+    """FastAPI dependency: read-only session, routed to a replica if configured"""
+    with get_db(read_only=True) as db:
+        yield db
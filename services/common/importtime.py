@@ -0,0 +1,128 @@
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Service entry points and the import time each may add on top of the
+# frameworks every service shares (FRAMEWORK_MODULES), in seconds
+ENTRY_POINTS: Dict[str, Tuple[str, float]] = {
+    "api_gateway": ("services.api_gateway.main", 0.35),
+    "prediction_service": ("services.prediction_service.main", 0.25),
+    "alert_manager": ("services.alert_manager.main", 0.25),
+    "data_collector": ("services.data_collector.main", 0.35)
+}
+
+FRAMEWORK_MODULES = ("fastapi", "sqlalchemy.orm")
+
+# Must never be imported just to start a service
+HEAVY_MODULES = ("torch", "transformers", "pytorch_lightning", "wandb", "sklearn", "tensorflow")
+
+# Shared modules that import HEAVY_MODULES only inside the code paths that
+# need them, so importing them stays cheap
+LAZY_IMPORT_MODULES = ("services.model_trainer.model_factory",)
+
+
+@dataclass
+class ImportProfile:
+    """Parsed `python -X importtime` output of one interpreter start"""
+
+    total: float = 0.0
+    # module -> (self seconds, cumulative seconds)
+    modules: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def loaded(self) -> Set[str]:
+        return set(self.modules)
+
+    def slowest(self, count: int = 10, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """Modules with the largest self time, leaving out `exclude`"""
+        exclude = set(exclude)
+        own = [
+            (name, self_time) for name, (self_time, _) in self.modules.items()
+            if name not in exclude
+        ]
+        return sorted(own, key=lambda item: item[1], reverse=True)[:count]
+
+    def added(self, baseline: "ImportProfile") -> float:
+        """
+        Self time of the modules `baseline` did not load. Unlike comparing
+        totals, noise in the shared frameworks' own import time cancels out.
+        """
+        return sum(self_time for name, (self_time, _) in self.modules.items() if name not in baseline.modules)
+
+
+def parse_importtime(output: str) -> ImportProfile:
+    profile = ImportProfile()
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative = int(cumulative_us) / 1e6
+        profile.modules[name.strip()] = (int(self_us) / 1e6, cumulative)
+        # Nested imports are indented; top-level ones add up to the total
+        if name.startswith(" ") and not name.startswith("  "):
+            profile.total += cumulative
+    return profile
+
+
+def measure(*modules: str, python: str = sys.executable) -> ImportProfile:
+    """Import `modules` in a fresh interpreter and profile it"""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", "; ".join(f"import {module}" for module in modules)],
+        capture_output=True,
+        text=True
+    )
+    profile = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        profile.error = result.stderr.strip().splitlines()[-1]
+    return profile
+
+
+def startup_overhead(module: str, repeat: int = 3) -> Tuple[float, ImportProfile, ImportProfile]:
+    """
+    Import time an entry point adds on top of FRAMEWORK_MODULES, best of
+    `repeat` runs, with the profiles of both. Comparing against the shared frameworks on the same
+    machine keeps the number meaningful across fast and slow hosts.
+    """
+    baseline = min((measure(*FRAMEWORK_MODULES) for _ in range(repeat)), key=lambda profile: profile.total)
+    best = min((measure(*FRAMEWORK_MODULES, module) for _ in range(repeat)), key=lambda profile: profile.added(baseline))
+    return best.added(baseline), best, baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure service import (cold start) time with -X importtime")
+    parser.add_argument("--service", action="append", choices=list(ENTRY_POINTS), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list per service")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a service exceeds its budget")
+    args = parser.parse_args()
+
+    over_budget = False
+    for service in args.service or list(ENTRY_POINTS):
+        module, budget = ENTRY_POINTS[service]
+        overhead, profile, baseline = startup_overhead(module, args.repeat)
+        if profile.error:
+            print(f"{service:20s} import failed: {profile.error}")
+            over_budget = True
+            continue
+
+        heavy = sorted(name for name in profile.loaded if name.split(".")[0] in HEAVY_MODULES)
+        status = "ok" if overhead <= budget and not heavy else "OVER BUDGET"
+        over_budget |= status != "ok"
+        print(
+            f"{service:20s} total {profile.total * 1000:7.1f} ms  "
+            f"over frameworks {overhead * 1000:7.1f} ms  budget {budget * 1000:.0f} ms  {status}"
+        )
+        if heavy:
+            print(f"    heavy modules imported: {', '.join(heavy)}")
+        for name, self_time in profile.slowest(args.top, exclude=baseline.loaded):
+            print(f"    {self_time * 1000:7.1f} ms  {name}")
+
+    if args.check and over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
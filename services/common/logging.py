@@ -0,0 +1,19 @@
+import logging
+import os
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+
+def setup_logging(name: str) -> logging.Logger:
+    """Configure service-wide logging once and return a named logger"""
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(
+            level=os.getenv("LOG_LEVEL", "INFO").upper(),
+            format=LOG_FORMAT
+        )
+    return logging.getLogger(name)
+
+
+# Alias used by the API gateway routers
+setup_logger = setup_logging
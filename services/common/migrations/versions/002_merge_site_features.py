@@ -0,0 +1,96 @@
+"""merge_site_features
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+import os
+from datetime import timedelta
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+# Feature bucket width and columns as of this revision
+BUCKET_MINUTES = int(os.getenv("FEATURE_BUCKET_MINUTES", "5"))
+FEATURE_COLUMNS = [
+    'rain_1h_mm', 'rain_24h_mm', 'rain_72h_mm', 'api_value',
+    'temperature_c', 'temp_change_6h_c', 'temp_change_24h_c', 'humidity_pct',
+    'quake_count_72h', 'max_magnitude_72h', 'weighted_magnitude_72h', 'minutes_since_m3'
+]
+MERGED_SOURCE = 'merged'
+
+site_features = sa.table(
+    'site_features',
+    sa.column('id', sa.String),
+    sa.column('site_id', sa.String),
+    sa.column('timestamp', sa.DateTime),
+    sa.column('source', sa.String),
+    sa.column('created_at', sa.DateTime),
+    *[sa.column(col) for col in FEATURE_COLUMNS]
+)
+
+def _bucket(timestamp):
+    midnight = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    bucket_seconds = BUCKET_MINUTES * 60
+    return midnight + timedelta(seconds=int((timestamp - midnight).total_seconds()) // bucket_seconds * bucket_seconds)
+
+def _compact_site(bind, site_id):
+    """Collapse a site's rows into one per bucket, keeping the latest non-null value per column"""
+    rows = bind.execute(
+        sa.select(site_features)
+        .where(site_features.c.site_id == site_id)
+        .order_by(site_features.c.timestamp, site_features.c.created_at)
+    ).all()
+
+    buckets = {}
+    for row in rows:
+        buckets.setdefault(_bucket(row.timestamp), []).append(row)
+
+    for bucket, bucket_rows in buckets.items():
+        keeper, duplicates = bucket_rows[0], bucket_rows[1:]
+        if not duplicates and keeper.timestamp == bucket:
+            continue
+
+        merged = {}
+        for row in bucket_rows:
+            for col in FEATURE_COLUMNS:
+                if getattr(row, col) is not None:
+                    merged[col] = getattr(row, col)
+        sources = {row.source for row in bucket_rows}
+        merged['source'] = sources.pop() if len(sources) == 1 else MERGED_SOURCE
+
+        if duplicates:
+            bind.execute(site_features.delete().where(site_features.c.id.in_([row.id for row in duplicates])))
+        bind.execute(
+            site_features.update()
+            .where(site_features.c.id == keeper.id)
+            .values(timestamp=bucket, **merged)
+        )
+
+def upgrade():
+    # Collapse existing weather-only/seismic-only rows into one row per
+    # bucket, site by site so memory is bounded by one site's history
+    bind = op.get_bind()
+    site_ids = bind.execute(sa.select(site_features.c.site_id).distinct()).scalars().all()
+    for site_id in site_ids:
+        _compact_site(bind, site_id)
+
+    # The unique index replaces the plain (site_id, timestamp) index and is
+    # the conflict target for the feature store upsert
+    op.drop_index('idx_site_features_site_id_timestamp', table_name='site_features')
+    op.create_index(
+        'uq_site_features_site_id_timestamp',
+        'site_features',
+        ['site_id', 'timestamp'],
+        unique=True
+    )
+
+def downgrade():
+    op.drop_index('uq_site_features_site_id_timestamp', table_name='site_features')
+    op.create_index('idx_site_features_site_id_timestamp', 'site_features', ['site_id', 'timestamp'])
@@ -0,0 +1,196 @@
+"""partition_time_series
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 10:00:00.000000
+
+Converts site_features and predictions to monthly range partitions on
+Postgres, each with a DEFAULT partition for rows outside the monthly
+ones. Partitioned tables need the partition key in every unique
+constraint, so their primary key becomes (id, timestamp) and alerts no
+longer carries a database-level foreign key to predictions. On SQLite the
+tables stay plain heap tables. Later partitions are created by the
+partition maintenance job (services.database_service.partition_manager).
+
+"""
+import os
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+# Monthly partitions created ahead of the current month
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+SITE_FEATURES_COLUMNS = """
+    id VARCHAR(36) NOT NULL,
+    site_id VARCHAR(36) NOT NULL REFERENCES sites (id),
+    timestamp TIMESTAMP NOT NULL,
+    rain_1h_mm DOUBLE PRECISION,
+    rain_24h_mm DOUBLE PRECISION,
+    rain_72h_mm DOUBLE PRECISION,
+    api_value DOUBLE PRECISION,
+    temperature_c DOUBLE PRECISION,
+    temp_change_6h_c DOUBLE PRECISION,
+    temp_change_24h_c DOUBLE PRECISION,
+    humidity_pct DOUBLE PRECISION,
+    quake_count_72h INTEGER,
+    max_magnitude_72h DOUBLE PRECISION,
+    weighted_magnitude_72h DOUBLE PRECISION,
+    minutes_since_m3 INTEGER,
+    source VARCHAR(50),
+    created_at TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (id, timestamp)
+"""
+
+PREDICTIONS_COLUMNS = """
+    id VARCHAR(36) NOT NULL,
+    site_id VARCHAR(36) NOT NULL REFERENCES sites (id),
+    model_id VARCHAR(36) REFERENCES models (id),
+    timestamp TIMESTAMP NOT NULL,
+    probability DOUBLE PRECISION NOT NULL,
+    risk_level VARCHAR(20) NOT NULL,
+    features_snapshot JSON,
+    inference_time_ms DOUBLE PRECISION,
+    created_at TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (id, timestamp)
+"""
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _create_partitions(table, first_month, last_month):
+    month = first_month
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE {table}_p{month.year:04d}{month.month:02d} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+def _create_models_and_alerts():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('models'):
+        op.create_table(
+            'models',
+            sa.Column('id', sa.String(36), primary_key=True),
+            sa.Column('name', sa.String(100), nullable=False),
+            sa.Column('version', sa.String(50), nullable=False),
+            sa.Column('type', sa.String(50)),
+            sa.Column('trained_at', sa.DateTime),
+            sa.Column('metrics', sa.JSON),
+            sa.Column('parameters', sa.JSON),
+            sa.Column('feature_columns', sa.JSON),
+            sa.Column('file_path', sa.String(500)),
+            sa.Column('status', sa.String(20), default='active'),
+            sa.Column('created_at', sa.DateTime, default=sa.func.now())
+        )
+
+    if not inspector.has_table('alerts'):
+        op.create_table(
+            'alerts',
+            sa.Column('id', sa.String(36), primary_key=True),
+            sa.Column('prediction_id', sa.String(36)),
+            sa.Column('site_id', sa.String(36), sa.ForeignKey('sites.id'), nullable=False),
+            sa.Column('risk_level', sa.String(20), nullable=False),
+            sa.Column('status', sa.String(20), nullable=False),
+            sa.Column('channels', sa.JSON),
+            sa.Column('sent_at', sa.DateTime),
+            sa.Column('error_message', sa.String(500)),
+            sa.Column('created_at', sa.DateTime, default=sa.func.now())
+        )
+
+def _partition_table(table, columns_sql, unique_indexes):
+    """Recreate `table` as a monthly range-partitioned table, keeping its rows"""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    legacy = f"{table}_legacy"
+    first_month = _month_start(datetime.utcnow())
+
+    exists = inspector.has_table(table)
+    if exists:
+        # Free the index and constraint names for the new parent table
+        for index in inspector.get_indexes(table):
+            op.execute(f"DROP INDEX {index['name']}")
+        op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey")
+
+        oldest = bind.execute(sa.text(f"SELECT min(timestamp) FROM {legacy}")).scalar()
+        if oldest is not None:
+            first_month = _month_start(oldest)
+
+    op.execute(f"CREATE TABLE {table} ({columns_sql}) PARTITION BY RANGE (timestamp)")
+    for name, columns in unique_indexes.items():
+        op.execute(f"CREATE UNIQUE INDEX {name} ON {table} ({', '.join(columns)})")
+
+    _create_partitions(table, first_month, _add_months(_month_start(datetime.utcnow()), MONTHS_AHEAD))
+
+    if exists:
+        columns = ", ".join(column['name'] for column in inspector.get_columns(legacy))
+        op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}")
+        # CASCADE drops the old alerts -> predictions foreign key, if any
+        op.execute(f"DROP TABLE {legacy} CASCADE")
+
+def upgrade():
+    _create_models_and_alerts()
+
+    if op.get_bind().dialect.name != 'postgresql':
+        # Local development: plain tables, no partitioning
+        if not sa.inspect(op.get_bind()).has_table('predictions'):
+            op.create_table(
+                'predictions',
+                sa.Column('id', sa.String(36), primary_key=True),
+                sa.Column('site_id', sa.String(36), sa.ForeignKey('sites.id'), nullable=False),
+                sa.Column('model_id', sa.String(36), sa.ForeignKey('models.id')),
+                sa.Column('timestamp', sa.DateTime, nullable=False),
+                sa.Column('probability', sa.Float, nullable=False),
+                sa.Column('risk_level', sa.String(20), nullable=False),
+                sa.Column('features_snapshot', sa.JSON),
+                sa.Column('inference_time_ms', sa.Float),
+                sa.Column('created_at', sa.DateTime, default=sa.func.now())
+            )
+        return
+
+    _partition_table(
+        'site_features',
+        SITE_FEATURES_COLUMNS,
+        {'uq_site_features_site_id_timestamp': ['site_id', 'timestamp']}
+    )
+    _partition_table('predictions', PREDICTIONS_COLUMNS, {})
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.drop_table('predictions')
+        op.drop_table('alerts')
+        op.drop_table('models')
+        return
+
+    # Back to a plain site_features table; partitions are dropped with the parent
+    op.execute("CREATE TABLE site_features_plain (LIKE site_features INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO site_features_plain SELECT * FROM site_features")
+    op.execute("DROP TABLE site_features")
+    op.execute("ALTER TABLE site_features_plain RENAME TO site_features")
+    op.execute("ALTER TABLE site_features ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE site_features ADD FOREIGN KEY (site_id) REFERENCES sites (id)")
+    op.create_index(
+        'uq_site_features_site_id_timestamp',
+        'site_features',
+        ['site_id', 'timestamp'],
+        unique=True
+    )
+
+    op.drop_table('predictions')
+    op.drop_table('alerts')
+    op.drop_table('models')
@@ -0,0 +1,98 @@
+"""rollup_tables
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# Features summarised in feature_rollups as of this revision
+ROLLUP_FEATURES = [
+    'rain_1h_mm', 'rain_72h_mm', 'temperature_c', 'humidity_pct', 'max_magnitude_72h'
+]
+
+def _sql_helpers(dialect):
+    """(new id, bucket start of `column` for a granularity) SQL for the dialect"""
+    if dialect == 'postgresql':
+        return "gen_random_uuid()::text", lambda granularity, column: f"date_trunc('{granularity}', {column})"
+
+    formats = {'hour': '%Y-%m-%d %H:00:00.000000', 'day': '%Y-%m-%d 00:00:00.000000'}
+    # Same text format SQLAlchemy stores DateTime values in on SQLite
+    return "lower(hex(randomblob(16)))", lambda granularity, column: f"strftime('{formats[granularity]}', {column})"
+
+def _seed_rollups():
+    """Fold existing predictions and feature rows into hourly and daily rollups"""
+    new_id, bucket = _sql_helpers(op.get_bind().dialect.name)
+
+    for granularity in ('hour', 'day'):
+        op.execute(
+            f"INSERT INTO prediction_rollups (id, site_id, granularity, bucket_start, prediction_count, "
+            f"probability_sum, probability_max, high_risk_count) "
+            f"SELECT {new_id}, site_id, '{granularity}', bucket, count(*), sum(probability), max(probability), "
+            f"sum(CASE WHEN risk_level = 'HIGH' THEN 1 ELSE 0 END) "
+            f"FROM (SELECT site_id, {bucket(granularity, 'timestamp')} AS bucket, probability, risk_level "
+            f"FROM predictions) AS raw GROUP BY site_id, bucket"
+        )
+
+        for feature in ROLLUP_FEATURES:
+            op.execute(
+                f"INSERT INTO feature_rollups (id, site_id, granularity, bucket_start, feature, sample_count, "
+                f"value_sum, value_min, value_max) "
+                f"SELECT {new_id}, site_id, '{granularity}', bucket, '{feature}', count(*), sum(value), "
+                f"min(value), max(value) "
+                f"FROM (SELECT site_id, {bucket(granularity, 'timestamp')} AS bucket, {feature} AS value "
+                f"FROM site_features WHERE {feature} IS NOT NULL) AS raw GROUP BY site_id, bucket"
+            )
+
+def upgrade():
+    op.create_table(
+        'prediction_rollups',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('site_id', sa.String(36), sa.ForeignKey('sites.id'), nullable=False),
+        sa.Column('granularity', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime, nullable=False),
+        sa.Column('prediction_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('probability_sum', sa.Float, nullable=False, server_default='0'),
+        sa.Column('probability_max', sa.Float),
+        sa.Column('high_risk_count', sa.Integer, nullable=False, server_default='0')
+    )
+    op.create_index(
+        'uq_prediction_rollups_site_granularity_bucket',
+        'prediction_rollups',
+        ['site_id', 'granularity', 'bucket_start'],
+        unique=True
+    )
+
+    op.create_table(
+        'feature_rollups',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('site_id', sa.String(36), sa.ForeignKey('sites.id'), nullable=False),
+        sa.Column('granularity', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime, nullable=False),
+        sa.Column('feature', sa.String(50), nullable=False),
+        sa.Column('sample_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('value_sum', sa.Float, nullable=False, server_default='0'),
+        sa.Column('value_min', sa.Float),
+        sa.Column('value_max', sa.Float)
+    )
+    op.create_index(
+        'uq_feature_rollups_site_granularity_bucket_feature',
+        'feature_rollups',
+        ['site_id', 'granularity', 'bucket_start', 'feature'],
+        unique=True
+    )
+
+    # Seed the rollups from existing history
+    _seed_rollups()
+
+def downgrade():
+    op.drop_table('feature_rollups')
+    op.drop_table('prediction_rollups')
@@ -0,0 +1,258 @@
+"""native_uuid_keys
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 12:00:00.000000
+
+Stores every UUID key as native uuid on Postgres and as a 16-byte BLOB on
+SQLite (see services.common.types.GUID). On Postgres the conversion is
+online: shadow columns are added and kept in sync by triggers, existing
+rows are backfilled in committed batches, and only the final column swap
+takes table locks.
+
+"""
+import logging
+import uuid
+from typing import Dict, List
+from alembic import op
+from sqlalchemy import inspect, text
+
+# revision identifiers, used by Alembic
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Every UUID key column in the schema, by table
+UUID_COLUMNS: Dict[str, List[str]] = {
+    "sites": ["id"],
+    "site_features": ["id", "site_id"],
+    "rockfall_events": ["id", "site_id"],
+    "alert_configs": ["id", "site_id"],
+    "alert_history": ["id", "site_id"],
+    "models": ["id"],
+    "predictions": ["id", "site_id", "model_id"],
+    "alerts": ["id", "prediction_id", "site_id"],
+    "prediction_rollups": ["id", "site_id"],
+    "feature_rollups": ["id", "site_id"],
+}
+
+SHADOW_SUFFIX = "_uuid"
+
+def existing_tables(conn) -> Dict[str, List[str]]:
+    inspector = inspect(conn)
+    return {
+        table: columns for table, columns in UUID_COLUMNS.items()
+        if inspector.has_table(table)
+    }
+
+def _shadow(column: str) -> str:
+    return f"{column}{SHADOW_SUFFIX}"
+
+# Postgres: shadow columns, batched backfill, then a short swap
+
+def add_shadow_columns(conn):
+    """
+    Add a nullable uuid shadow column next to every text key, plus a trigger
+    that keeps it in sync for rows written while the backfill runs. Adding a
+    nullable column without a default does not rewrite the table.
+    """
+    for table, columns in existing_tables(conn).items():
+        for column in columns:
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {_shadow(column)} uuid"
+            ))
+
+        assignments = " ".join(
+            f"NEW.{_shadow(column)} := NEW.{column}::uuid;" for column in columns
+        )
+        conn.execute(text(
+            f"CREATE OR REPLACE FUNCTION {table}_uuid_shadow() RETURNS trigger AS $$ "
+            f"BEGIN {assignments} RETURN NEW; END $$ LANGUAGE plpgsql"
+        ))
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_uuid_shadow ON {table}"))
+        conn.execute(text(
+            f"CREATE TRIGGER {table}_uuid_shadow BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_uuid_shadow()"
+        ))
+
+def backfill_shadow_columns(conn, batch_size: int = 10000):
+    """
+    Fill the shadow columns in primary-key order, one short statement per
+    batch. Meant to run in autocommit mode so each batch commits on its own
+    and normal traffic is never blocked for long.
+    """
+    for table, columns in existing_tables(conn).items():
+        assignments = ", ".join(f"{_shadow(column)} = {column}::uuid" for column in columns)
+        last_id = ""
+        converted = 0
+
+        while True:
+            ids = conn.execute(
+                text(f"SELECT id FROM {table} WHERE id > :last_id ORDER BY id LIMIT :batch_size"),
+                {"last_id": last_id, "batch_size": batch_size}
+            ).scalars().all()
+            if not ids:
+                break
+
+            conn.execute(
+                text(f"UPDATE {table} SET {assignments} WHERE id = ANY(:ids) AND id{SHADOW_SUFFIX} IS NULL"),
+                {"ids": ids}
+            )
+            converted += len(ids)
+            last_id = ids[-1]
+
+        logger.info(f"Backfilled uuid keys for {converted} rows of {table}")
+
+def swap_shadow_columns(conn):
+    """
+    Replace the text keys with their shadow columns in one transaction:
+    foreign keys, primary keys and indexes on the old columns are dropped
+    and recreated on the uuid ones.
+    """
+    tables = existing_tables(conn)
+    inspector = inspect(conn)
+
+    foreign_keys = []
+    for table in tables:
+        for fk in inspector.get_foreign_keys(table):
+            foreign_keys.append((table, fk))
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {fk['name']}"))
+
+    for table, columns in tables.items():
+        conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+
+        primary_key = inspector.get_pk_constraint(table)
+        indexes = [
+            index for index in inspector.get_indexes(table)
+            if set(index["column_names"]) & set(columns)
+        ]
+        unique_constraints = [
+            constraint for constraint in inspector.get_unique_constraints(table)
+            if set(constraint["column_names"]) & set(columns)
+        ]
+        not_null = {
+            column["name"] for column in inspector.get_columns(table)
+            if column["name"] in columns and not column["nullable"]
+        }
+
+        conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {primary_key['name']}"))
+        # Dropping the old columns also drops their indexes and unique constraints
+        for column in columns:
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+            conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {_shadow(column)} TO {column}"))
+            if column in not_null:
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {primary_key['name']} "
+            f"PRIMARY KEY ({', '.join(primary_key['constrained_columns'])})"
+        ))
+        for constraint in unique_constraints:
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD CONSTRAINT {constraint['name']} "
+                f"UNIQUE ({', '.join(constraint['column_names'])})"
+            ))
+        unique_names = {constraint["name"] for constraint in unique_constraints}
+        for index in indexes:
+            if index["name"] in unique_names:
+                continue
+            unique = "UNIQUE " if index["unique"] else ""
+            conn.execute(text(
+                f"CREATE {unique}INDEX {index['name']} ON {table} ({', '.join(index['column_names'])})"
+            ))
+
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_uuid_shadow ON {table}"))
+        conn.execute(text(f"DROP FUNCTION IF EXISTS {table}_uuid_shadow()"))
+
+    for table, fk in foreign_keys:
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {fk['name']} "
+            f"FOREIGN KEY ({', '.join(fk['constrained_columns'])}) "
+            f"REFERENCES {fk['referred_table']} ({', '.join(fk['referred_columns'])})"
+        ))
+
+def revert_postgres_keys(conn):
+    """Turn uuid keys back into VARCHAR(36); used by the downgrade"""
+    tables = existing_tables(conn)
+    inspector = inspect(conn)
+
+    foreign_keys = []
+    for table in tables:
+        for fk in inspector.get_foreign_keys(table):
+            foreign_keys.append((table, fk))
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {fk['name']}"))
+
+    for table, columns in tables.items():
+        for column in columns:
+            conn.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE VARCHAR(36) USING {column}::text"
+            ))
+
+    for table, fk in foreign_keys:
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {fk['name']} "
+            f"FOREIGN KEY ({', '.join(fk['constrained_columns'])}) "
+            f"REFERENCES {fk['referred_table']} ({', '.join(fk['referred_columns'])})"
+        ))
+
+# SQLite: values are typed per row, so keys are rewritten in place
+
+def convert_sqlite_keys(conn, to_bytes: bool = True, batch_size: int = 10000):
+    """
+    Rewrite text keys as 16-byte blobs (or back, for the downgrade) in
+    batches of rowids. SQLite keeps a BLOB as-is even in a VARCHAR column,
+    so the declared column types do not need the table to be rebuilt.
+    """
+    source_type = "text" if to_bytes else "blob"
+
+    for table, columns in existing_tables(conn).items():
+        pending = " OR ".join(f"typeof({column}) = '{source_type}'" for column in columns)
+        assignments = ", ".join(f"{column} = :{column}" for column in columns)
+        converted = 0
+
+        while True:
+            rows = conn.execute(
+                text(f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE {pending} LIMIT :batch_size"),
+                {"batch_size": batch_size}
+            ).all()
+            if not rows:
+                break
+
+            params = []
+            for row in rows:
+                values = {"_rowid": row[0]}
+                for column, value in zip(columns, row[1:]):
+                    if value is None:
+                        values[column] = None
+                    elif to_bytes:
+                        values[column] = uuid.UUID(value).bytes if isinstance(value, str) else value
+                    else:
+                        values[column] = str(uuid.UUID(bytes=bytes(value))) if isinstance(value, bytes) else value
+                params.append(values)
+
+            conn.execute(text(f"UPDATE {table} SET {assignments} WHERE rowid = :_rowid"), params)
+            converted += len(rows)
+
+        logger.info(f"Converted uuid keys for {converted} rows of {table}")
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        convert_sqlite_keys(bind)
+        return
+
+    add_shadow_columns(bind)
+    with op.get_context().autocommit_block():
+        backfill_shadow_columns(bind)
+    swap_shadow_columns(bind)
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        convert_sqlite_keys(bind, to_bytes=False)
+        return
+
+    revert_postgres_keys(bind)
@@ -0,0 +1,62 @@
+"""hot_path_indexes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 13:00:00.000000
+
+Indexes for the hot reads: prediction history by (site_id, timestamp), the
+alert throttle warm-up and the latest-active-model lookup. On Postgres the
+prediction index covers probability and risk_level, the alert and model
+indexes are partial, and the two non-partitioned ones are built
+CONCURRENTLY so writers are not blocked.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+
+    # Partitioned on Postgres: CONCURRENTLY is not supported on the parent
+    op.create_index(
+        'idx_predictions_site_id_timestamp',
+        'predictions',
+        ['site_id', 'timestamp', 'id'],
+        postgresql_include=['probability', 'risk_level']
+    )
+
+    if not postgres:
+        op.create_index(
+            'idx_alerts_throttle',
+            'alerts',
+            ['site_id', 'risk_level', 'status', 'created_at']
+        )
+        op.create_index('idx_models_status_trained_at', 'models', ['status', 'trained_at'])
+        return
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_alerts_throttle',
+            'alerts',
+            ['site_id', 'risk_level', 'status', 'created_at'],
+            postgresql_where=sa.text("status IN ('pending', 'sent')"),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_models_status_trained_at',
+            'models',
+            ['status', 'trained_at'],
+            postgresql_where=sa.text("status = 'active'"),
+            postgresql_concurrently=True
+        )
+
+def downgrade():
+    op.drop_index('idx_models_status_trained_at', table_name='models')
+    op.drop_index('idx_alerts_throttle', table_name='alerts')
+    op.drop_index('idx_predictions_site_id_timestamp', table_name='predictions')
@@ -0,0 +1,30 @@
+"""predictions_timestamp_brin
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 14:00:00.000000
+
+Index on predictions.timestamp for "every site's predictions since T",
+which the gateway's site risk map polls. Predictions are appended in
+timestamp order, so on Postgres a BRIN index answers it at a fraction of
+a B-tree's size and write cost; elsewhere it is a plain B-tree.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        'idx_predictions_timestamp',
+        'predictions',
+        ['timestamp'],
+        postgresql_using='brin'
+    )
+
+def downgrade():
+    op.drop_index('idx_predictions_timestamp', table_name='predictions')
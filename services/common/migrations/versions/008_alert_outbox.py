@@ -0,0 +1,45 @@
+"""alert_outbox
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 15:00:00.000000
+
+Transactional outbox for alert notifications: one row per email or SMS
+to deliver, inserted with its alert and claimed by the alert manager's
+dispatcher.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from services.common.types import GUID
+
+# revision identifiers, used by Alembic
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'alert_outbox',
+        sa.Column('id', GUID, primary_key=True),
+        sa.Column('alert_id', GUID, sa.ForeignKey('alerts.id'), nullable=False),
+        sa.Column('channel', sa.String(20), nullable=False),
+        sa.Column('recipient', sa.String(500), nullable=False),
+        sa.Column('subject', sa.String(200)),
+        sa.Column('body', sa.Text, nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column('claimed_until', sa.DateTime),
+        sa.Column('last_error', sa.String(500)),
+        sa.Column('sent_at', sa.DateTime),
+        sa.Column('created_at', sa.DateTime, server_default=sa.func.now())
+    )
+    op.create_index('idx_alert_outbox_due', 'alert_outbox', ['status', 'next_attempt_at'])
+    op.create_index('ix_alert_outbox_alert_id', 'alert_outbox', ['alert_id'])
+
+def downgrade():
+    op.drop_index('ix_alert_outbox_alert_id', table_name='alert_outbox')
+    op.drop_index('idx_alert_outbox_due', table_name='alert_outbox')
+    op.drop_table('alert_outbox')
@@ -0,0 +1,27 @@
+"""alert_outbox_digest
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 17:00:00.000000
+
+Marks outbox rows that wait for the digest window and are sent as one
+message per recipient.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column(
+        'alert_outbox',
+        sa.Column('digest', sa.Boolean, nullable=False, server_default=sa.false())
+    )
+
+def downgrade():
+    op.drop_column('alert_outbox', 'digest')
@@ -0,0 +1,25 @@
+"""alert_config_updated_at
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 18:00:00.000000
+
+Backfills alert_configs.updated_at (created by 001), which with the row
+count versions the alert manager's in-memory AlertConfig table. Rows that
+never had it set start at their created_at.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("UPDATE alert_configs SET updated_at = created_at WHERE updated_at IS NULL")
+
+def downgrade():
+    # The column belongs to the baseline schema; the backfilled values stay
+    pass
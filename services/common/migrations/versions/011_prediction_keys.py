@@ -0,0 +1,30 @@
+"""prediction_keys
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 19:00:00.000000
+
+Idempotency keys for caller-chosen prediction ids. predictions.id is only
+unique together with timestamp on the partitioned table, so hedged
+attempts claim their id here before inserting the prediction.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from services.common.types import GUID
+
+# revision identifiers, used by Alembic
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'prediction_keys',
+        sa.Column('id', GUID, primary_key=True),
+        sa.Column('created_at', sa.DateTime, server_default=sa.func.now())
+    )
+
+def downgrade():
+    op.drop_table('prediction_keys')
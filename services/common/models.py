@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Boolean, ForeignKey, Index, JSON, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from services.common.types import GUID
 from datetime import datetime
 import uuid
 
@@ -9,7 +10,7 @@ Base = declarative_base()
 class Site(Base):
     __tablename__ = 'sites'
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(100), nullable=False)
     location = Column(String(100), nullable=False)
     latitude = Column(Float, nullable=False)
@@ -26,20 +27,30 @@ class Site(Base):
 
 class SiteFeature(Base):
     __tablename__ = 'site_features'
+    __table_args__ = (
+        # One merged row per site and time bucket (see data_collector.feature_store)
+        Index('uq_site_features_site_id_timestamp', 'site_id', 'timestamp', unique=True),
+    )
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    site_id = Column(String(36), ForeignKey('sites.id'), nullable=False)
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    site_id = Column(GUID, ForeignKey('sites.id'), nullable=False)
     timestamp = Column(DateTime, nullable=False)
     
     # Weather features
     rain_1h_mm = Column(Float)
     rain_24h_mm = Column(Float)
     rain_72h_mm = Column(Float)
+    api_value = Column(Float)
     temperature_c = Column(Float)
+    temp_change_6h_c = Column(Float)
+    temp_change_24h_c = Column(Float)
     humidity_pct = Column(Float)
     
     # Seismic features
+    quake_count_72h = Column(Integer)
     max_magnitude_72h = Column(Float)
+    weighted_magnitude_72h = Column(Float)
+    minutes_since_m3 = Column(Integer)
     
     # Metadata
     source = Column(String(50))
@@ -48,17 +59,31 @@ class SiteFeature(Base):
     # Relationships
     site = relationship("Site", back_populates="features")
 
+class RockfallEvent(Base):
+    __tablename__ = 'rockfall_events'
+    
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    site_id = Column(GUID, ForeignKey('sites.id'), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    volume_m3 = Column(Float)
+    impact_energy = Column(Float)
+    description = Column(String(500))
+    verification_status = Column(String(20))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class AlertConfig(Base):
     __tablename__ = 'alert_configs'
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    site_id = Column(String(36), ForeignKey('sites.id'), nullable=False, unique=True)
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    site_id = Column(GUID, ForeignKey('sites.id'), nullable=False, unique=True)
     threshold = Column(Float, nullable=False, default=0.7)
     email_enabled = Column(Boolean, default=True)
     email_recipients = Column(String(500))  # Comma-separated email addresses
     sms_enabled = Column(Boolean, default=True)
     phone_numbers = Column(String(200))  # Comma-separated phone numbers
     created_at = Column(DateTime, default=datetime.utcnow)
+    # With the row count, the version of the alert manager's config cache
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     site = relationship("Site", back_populates="alert_config")
@@ -66,8 +91,8 @@ class AlertConfig(Base):
 class AlertHistory(Base):
     __tablename__ = 'alert_history'
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    site_id = Column(String(36), ForeignKey('sites.id'), nullable=False)
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    site_id = Column(GUID, ForeignKey('sites.id'), nullable=False)
     alert_type = Column(String(50), nullable=False)
     probability = Column(Float)
     risk_level = Column(String(20))
@@ -77,5 +102,147 @@ class AlertHistory(Base):
     # Relationships
     site = relationship("Site", back_populates="alert_history")
 
+class Model(Base):
+    __tablename__ = 'models'
+    __table_args__ = (
+        # Latest active model lookup; partial on Postgres
+        Index('idx_models_status_trained_at', 'status', 'trained_at', postgresql_where=text("status = 'active'")),
+    )
+    
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    name = Column(String(100), nullable=False)
+    version = Column(String(50), nullable=False)
+    type = Column(String(50))
+    trained_at = Column(DateTime)
+    metrics = Column(JSON)
+    parameters = Column(JSON)
+    feature_columns = Column(JSON)
+    file_path = Column(String(500))
+    status = Column(String(20), default='active')
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Prediction(Base):
+    # Range-partitioned by month on Postgres (see migration 003); the
+    # database primary key is (id, timestamp) there.
+    __tablename__ = 'predictions'
+    __table_args__ = (
+        # History and latest-prediction reads, newest first with id as the
+        # keyset tie-breaker; covers the common projection on Postgres
+        Index(
+            'idx_predictions_site_id_timestamp', 'site_id', 'timestamp', 'id',
+            postgresql_include=['probability', 'risk_level']
+        ),
+        # Recent predictions across all sites (the gateway's risk map
+        # refresh); BRIN on Postgres, where rows arrive in timestamp order
+        Index('idx_predictions_timestamp', 'timestamp', postgresql_using='brin'),
+    )
+    
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    site_id = Column(GUID, ForeignKey('sites.id'), nullable=False)
+    model_id = Column(GUID, ForeignKey('models.id'))
+    timestamp = Column(DateTime, nullable=False)
+    probability = Column(Float, nullable=False)
+    risk_level = Column(String(20), nullable=False)
+    features_snapshot = Column(JSON)
+    inference_time_ms = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    site = relationship("Site")
+    model = relationship("Model")
+
+class PredictionKey(Base):
+    # Caller-chosen prediction ids (the gateway's Idempotency-Key). Unique on
+    # their own, unlike predictions.id under the partitioned (id, timestamp)
+    # key, so concurrent attempts with one id store a single prediction
+    __tablename__ = 'prediction_keys'
+
+    id = Column(GUID, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Alert(Base):
+    __tablename__ = 'alerts'
+    __table_args__ = (
+        # Alert throttle index warm-up; partial on Postgres, over the
+        # statuses that hold a throttle window (throttle.THROTTLING_STATUSES)
+        Index(
+            'idx_alerts_throttle', 'site_id', 'risk_level', 'status', 'created_at',
+            postgresql_where=text("status IN ('pending', 'sent')")
+        ),
+    )
+    
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # No database-level foreign key on Postgres: predictions is partitioned
+    prediction_id = Column(GUID, ForeignKey('predictions.id'))
+    site_id = Column(GUID, ForeignKey('sites.id'), nullable=False)
+    risk_level = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False, default='pending')
+    channels = Column(JSON)
+    sent_at = Column(DateTime)
+    error_message = Column(String(500))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
     prediction = relationship("Prediction")
     site = relationship("Site")
+
+class AlertOutbox(Base):
+    # One notification to deliver for an alert, written in the alert's
+    # transaction and sent later by the outbox dispatcher
+    __tablename__ = 'alert_outbox'
+    __table_args__ = (
+        # Dispatcher claim: due pending rows and expired claims
+        Index('idx_alert_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    alert_id = Column(GUID, ForeignKey('alerts.id'), nullable=False, index=True)
+    channel = Column(String(20), nullable=False)
+    recipient = Column(String(500), nullable=False)
+    subject = Column(String(200))
+    body = Column(Text, nullable=False)
+    # pending -> sending (claimed) -> sent | failed; back to pending to retry
+    status = Column(String(20), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claimed_until = Column(DateTime)
+    last_error = Column(String(500))
+    sent_at = Column(DateTime)
+    # Held for the digest window and sent together with the recipient's
+    # other pending digest rows
+    digest = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class PredictionRollup(Base):
+    # Per site x hour and per site x day aggregates, maintained incrementally
+    # on the prediction write path (see services.common.rollups)
+    __tablename__ = 'prediction_rollups'
+    __table_args__ = (
+        Index('uq_prediction_rollups_site_granularity_bucket', 'site_id', 'granularity', 'bucket_start', unique=True),
+    )
+    
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    site_id = Column(GUID, ForeignKey('sites.id'), nullable=False)
+    granularity = Column(String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = Column(DateTime, nullable=False)
+    prediction_count = Column(Integer, nullable=False, default=0)
+    probability_sum = Column(Float, nullable=False, default=0.0)
+    probability_max = Column(Float)
+    high_risk_count = Column(Integer, nullable=False, default=0)
+
+class FeatureRollup(Base):
+    # Min/mean/max of key features per site x hour and per site x day
+    __tablename__ = 'feature_rollups'
+    __table_args__ = (
+        Index('uq_feature_rollups_site_granularity_bucket_feature', 'site_id', 'granularity', 'bucket_start', 'feature', unique=True),
+    )
+    
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    site_id = Column(GUID, ForeignKey('sites.id'), nullable=False)
+    granularity = Column(String(10), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    feature = Column(String(50), nullable=False)
+    sample_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0.0)
+    value_min = Column(Float)
+    value_max = Column(Float)
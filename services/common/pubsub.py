@@ -0,0 +1,271 @@
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from services.common.config import get_settings
+from services.common.metrics import registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RISK_ORDER = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+# Returned by Subscription.get once a slow subscriber has been cut off
+OVERFLOW = object()
+
+subscribers_gauge = registry.gauge(
+    "prediction_stream_subscribers",
+    "Open prediction stream subscriptions"
+)
+events_published = registry.counter(
+    "prediction_stream_events_published_total",
+    "Prediction events published to the stream hub"
+)
+subscriber_overflows = registry.counter(
+    "prediction_stream_overflows_total",
+    "Subscriptions cut off because their queue was full"
+)
+relayed_events = registry.counter(
+    "prediction_stream_relayed_events_total",
+    "Prediction events exchanged with other processes over the broker, by direction (sent, received)"
+)
+
+
+class Subscription:
+    """
+    One subscriber's bounded queue and filters. If the consumer falls more
+    than `queue_size` events behind it is cut off (OVERFLOW) instead of
+    buffering without limit; it can reconnect with its last event id.
+    """
+
+    def __init__(
+        self,
+        hub: "PredictionHub",
+        loop: asyncio.AbstractEventLoop,
+        site_ids: Optional[Set[str]],
+        min_risk: Optional[str],
+        queue_size: int
+    ):
+        self.hub = hub
+        self.loop = loop
+        self.site_ids = site_ids
+        self.min_rank = RISK_ORDER.get(min_risk, 0) if min_risk else 0
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.backlog: deque = deque()
+        self.overflowed = False
+        # True when the requested resume point is older than the buffer
+        self.gap = False
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        data = event["data"]
+        if self.site_ids is not None and data.get("site_id") not in self.site_ids:
+            return False
+        return RISK_ORDER.get(data.get("risk_level"), 0) >= self.min_rank
+
+    def offer(self, event: Dict[str, Any]):
+        """Queue an event; runs on the subscriber's event loop"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            subscriber_overflows.inc()
+
+    async def get(self, timeout: float) -> Any:
+        """Next event, OVERFLOW once cut off and drained, or None after `timeout` idle seconds"""
+        if self.backlog:
+            return self.backlog.popleft()
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        if self.overflowed:
+            return OVERFLOW
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class RedisRelay:
+    """
+    Carries hub events between processes over one Redis pub/sub channel, so
+    predictions stored by the prediction service or the collector reach the
+    stream subscribers of every gateway worker. Each process tags what it
+    sends and ignores its own messages, which it has already delivered.
+    The listener thread starts with the first subscription and reconnects
+    after broker errors; events published while it is disconnected are not
+    replayed.
+    """
+
+    def __init__(self, url: str = "", channel: str = "rockfall:predictions", client=None, retry_seconds: float = 1.0):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("redis is required when STREAM_BROKER_URL is set")
+            client = redis.Redis.from_url(url)
+
+        self.client = client
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+        self.origin = uuid.uuid4().hex
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def send(self, data: Dict[str, Any]):
+        try:
+            self.client.publish(self.channel, json.dumps({"origin": self.origin, "data": data}, default=str))
+            relayed_events.inc(labels={"direction": "sent"})
+        except Exception as e:
+            # Local subscribers already have the event; other processes miss it
+            logger.warning(f"Failed to relay prediction event: {e}")
+
+    def start(self, hub: "PredictionHub"):
+        """Deliver other processes' events to `hub`; idempotent"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, args=(hub,), name="prediction-relay", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _listen(self, hub: "PredictionHub"):
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None or message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload["origin"] != self.origin:
+                        relayed_events.inc(labels={"direction": "received"})
+                        hub.deliver(payload["data"])
+            except Exception as e:
+                logger.warning(f"Prediction relay disconnected, retrying: {e}")
+                self._stopped.wait(self.retry_seconds)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+class PredictionHub:
+    """
+    Pub/sub for new predictions. Every event gets an increasing id and is
+    kept in a ring buffer so subscribers can resume after a disconnect.
+    publish() is thread-safe; each subscriber's queue is fed on its own
+    event loop. Without a relay only subscribers in the publishing process
+    see an event; with one, events also reach the hubs of other processes.
+    """
+
+    def __init__(self, buffer_size: int, queue_size: int, relay: Optional[RedisRelay] = None):
+        self.queue_size = queue_size
+        self.relay = relay
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._last_id = 0
+        self._subscriptions: Set[Subscription] = set()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """
+        Call `callback` with every event delivered to this process, local or
+        relayed, on the publishing or relay thread; it should return quickly.
+        """
+        self._listeners.append(callback)
+        if self.relay is not None:
+            self.relay.start(self)
+
+    def publish(self, data: Dict[str, Any]) -> int:
+        """Deliver a new prediction here and, through the relay, to other processes"""
+        if self.relay is not None:
+            self.relay.send(data)
+        return self.deliver(data)
+
+    def deliver(self, data: Dict[str, Any]) -> int:
+        """Hand an event to this process's subscribers only"""
+        with self._lock:
+            self._last_id += 1
+            event = {"id": self._last_id, "data": data}
+            self._buffer.append(event)
+            subscriptions = list(self._subscriptions)
+
+        events_published.inc()
+        for callback in self._listeners:
+            try:
+                callback(data)
+            except Exception as e:
+                logger.warning(f"Prediction event listener failed: {e}")
+        for subscription in subscriptions:
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+        return event["id"]
+
+    def subscribe(
+        self,
+        site_ids: Optional[Iterable[str]] = None,
+        min_risk: Optional[str] = None,
+        last_event_id: Optional[int] = None
+    ) -> Subscription:
+        """Subscribe from the running event loop, replaying buffered events after `last_event_id`"""
+        if self.relay is not None:
+            self.relay.start(self)
+
+        subscription = Subscription(
+            self,
+            asyncio.get_running_loop(),
+            set(site_ids) if site_ids else None,
+            min_risk,
+            self.queue_size
+        )
+
+        with self._lock:
+            if last_event_id is not None:
+                subscription.backlog.extend(
+                    event for event in self._buffer
+                    if event["id"] > last_event_id and subscription.matches(event)
+                )
+                oldest = self._buffer[0]["id"] if self._buffer else self._last_id + 1
+                # Ids restart with the process, so an id from the future
+                # means the client's position is unknown
+                subscription.gap = last_event_id < oldest - 1 or last_event_id > self._last_id
+            self._subscriptions.add(subscription)
+            subscribers_gauge.set(len(self._subscriptions))
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            subscribers_gauge.set(len(self._subscriptions))
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_id
+
+
+prediction_hub = PredictionHub(
+    settings.STREAM_BUFFER_SIZE,
+    settings.STREAM_QUEUE_SIZE,
+    RedisRelay(settings.STREAM_BROKER_URL) if settings.STREAM_BROKER_URL else None
+)
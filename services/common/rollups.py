@@ -0,0 +1,661 @@
+import argparse
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, update, case, func, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from services.common.config import get_settings
+from services.common.database import engine, dialect_name
+from services.common.models import Prediction, SiteFeature, PredictionRollup, FeatureRollup
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+prediction_rollups = PredictionRollup.__table__
+feature_rollups = FeatureRollup.__table__
+predictions = Prediction.__table__
+site_features = SiteFeature.__table__
+
+GRANULARITIES = ("hour", "day")
+
+# Features summarised in feature_rollups
+ROLLUP_FEATURES = [
+    'rain_1h_mm', 'rain_72h_mm', 'temperature_c', 'humidity_pct', 'max_magnitude_72h'
+]
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Start of the hour or day containing `timestamp`"""
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _greater(left, right):
+    return case((right > left, right), (left.is_(None), right), else_=left)
+
+
+def _lesser(left, right):
+    return case((right < left, right), (left.is_(None), right), else_=left)
+
+
+def _increment(conn, table, key_columns: List[str], rows: List[Dict[str, Any]], sums: List[str], maxes: List[str], mins: List[str]):
+    """Add partial aggregates into rollup rows with a single upsert per batch"""
+    if not rows:
+        return
+
+    dialect = dialect_name(conn)
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={
+                **{col: table.c[col] + stmt.excluded[col] for col in sums},
+                **{col: _greater(table.c[col], stmt.excluded[col]) for col in maxes},
+                **{col: _lesser(table.c[col], stmt.excluded[col]) for col in mins}
+            }
+        )
+        conn.execute(stmt, rows)
+        return
+
+    # Select/update fallback for dialects without native upsert
+    for row in rows:
+        condition = and_(*[table.c[col] == row[col] for col in key_columns])
+        existing = conn.execute(select(table).where(condition)).first()
+        if existing is None:
+            conn.execute(table.insert().values(**row))
+            continue
+
+        values = {col: getattr(existing, col) + row[col] for col in sums}
+        for col in maxes:
+            current = getattr(existing, col)
+            values[col] = row[col] if current is None or (row[col] is not None and row[col] > current) else current
+        for col in mins:
+            current = getattr(existing, col)
+            values[col] = row[col] if current is None or (row[col] is not None and row[col] < current) else current
+        conn.execute(update(table).where(condition).values(**values))
+
+
+def _replace(conn, table, key_columns: List[str], rows: List[Dict[str, Any]]):
+    """Write recomputed rollup rows over whatever the buckets held"""
+    if not rows:
+        return
+
+    values = [col for col in rows[0] if col != "id" and col not in key_columns]
+    dialect = dialect_name(conn)
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={col: stmt.excluded[col] for col in values}
+        )
+        conn.execute(stmt, rows)
+        return
+
+    for row in rows:
+        condition = and_(*[table.c[col] == row[col] for col in key_columns])
+        if conn.execute(update(table).where(condition).values(**{col: row[col] for col in values})).rowcount == 0:
+            conn.execute(table.insert().values(**row))
+
+
+def record_predictions(conn, rows: Iterable[Dict[str, Any]]):
+    """
+    Fold new predictions (site_id, timestamp, probability, risk_level) into
+    the hourly and daily rollups. Call on the same connection/session that
+    inserts the predictions so both commit together.
+    """
+    partials: Dict[Tuple[str, str, datetime], Dict[str, Any]] = {}
+    for row in rows:
+        for granularity in GRANULARITIES:
+            key = (row["site_id"], granularity, bucket_start(row["timestamp"], granularity))
+            partial = partials.get(key)
+            if partial is None:
+                partial = {
+                    "id": str(uuid.uuid4()),
+                    "site_id": key[0],
+                    "granularity": granularity,
+                    "bucket_start": key[2],
+                    "prediction_count": 0,
+                    "probability_sum": 0.0,
+                    "probability_max": None,
+                    "high_risk_count": 0
+                }
+                partials[key] = partial
+
+            partial["prediction_count"] += 1
+            partial["probability_sum"] += row["probability"]
+            if partial["probability_max"] is None or row["probability"] > partial["probability_max"]:
+                partial["probability_max"] = row["probability"]
+            if row["risk_level"] == "HIGH":
+                partial["high_risk_count"] += 1
+
+    _increment(
+        conn, prediction_rollups,
+        ["site_id", "granularity", "bucket_start"],
+        list(partials.values()),
+        sums=["prediction_count", "probability_sum", "high_risk_count"],
+        maxes=["probability_max"],
+        mins=[]
+    )
+
+
+def _feature_partials(rows: Iterable[Dict[str, Any]], granularities=GRANULARITIES) -> List[Dict[str, Any]]:
+    """Feature rollup rows (count, sum, min, max) over `rows`, per site, bucket and feature"""
+    partials: Dict[Tuple[str, str, datetime, str], Dict[str, Any]] = {}
+    for row in rows:
+        for feature in ROLLUP_FEATURES:
+            value = row.get(feature)
+            if value is None:
+                continue
+
+            for granularity in granularities:
+                key = (row["site_id"], granularity, bucket_start(row["timestamp"], granularity), feature)
+                partial = partials.get(key)
+                if partial is None:
+                    partial = {
+                        "id": str(uuid.uuid4()),
+                        "site_id": key[0],
+                        "granularity": granularity,
+                        "bucket_start": key[2],
+                        "feature": feature,
+                        "sample_count": 0,
+                        "value_sum": 0.0,
+                        "value_min": value,
+                        "value_max": value
+                    }
+                    partials[key] = partial
+
+                partial["sample_count"] += 1
+                partial["value_sum"] += value
+                partial["value_min"] = min(partial["value_min"], value)
+                partial["value_max"] = max(partial["value_max"], value)
+
+    return list(partials.values())
+
+
+def record_features(conn, rows: Iterable[Dict[str, Any]]):
+    """
+    Fold new feature observations (site_id, timestamp, feature columns) into
+    the rollups. Only for rows that add samples (rebuilds); writes that may
+    replace an existing site_features row use refresh_features.
+    """
+    _increment(
+        conn, feature_rollups,
+        ["site_id", "granularity", "bucket_start", "feature"],
+        _feature_partials(rows),
+        sums=["sample_count", "value_sum"],
+        maxes=["value_max"],
+        mins=["value_min"]
+    )
+
+
+def refresh_features(conn, rows: Iterable[Dict[str, Any]]):
+    """
+    Recompute the feature rollups of the buckets that upserted site_features
+    rows (site_id, timestamp) fall in. An upsert or a backfill replay
+    replaces a row's values rather than adding a sample, so the affected
+    hours are recomputed from raw rows and their days from those hours.
+    Call on the same connection/session, after the upsert.
+    """
+    hours: Dict[Tuple[str, datetime], Set[datetime]] = {}
+    for row in rows:
+        hour = bucket_start(row["timestamp"], "hour")
+        hours.setdefault((row["site_id"], bucket_start(hour, "day")), set()).add(hour)
+
+    key_columns = ["site_id", "granularity", "bucket_start", "feature"]
+    for (site_id, day), day_hours in hours.items():
+        # Buckets a feature no longer has values in must not keep old rows
+        conn.execute(feature_rollups.delete().where(
+            feature_rollups.c.site_id == site_id,
+            or_(
+                and_(feature_rollups.c.granularity == "hour", feature_rollups.c.bucket_start.in_(day_hours)),
+                and_(feature_rollups.c.granularity == "day", feature_rollups.c.bucket_start == day)
+            )
+        ))
+
+        raw = conn.execute(
+            select(
+                site_features.c.site_id, site_features.c.timestamp,
+                *[site_features.c[feature] for feature in ROLLUP_FEATURES]
+            ).where(
+                site_features.c.site_id == site_id,
+                site_features.c.timestamp >= min(day_hours),
+                site_features.c.timestamp < max(day_hours) + timedelta(hours=1)
+            )
+        ).all()
+        _replace(conn, feature_rollups, key_columns, _feature_partials(
+            [row._mapping for row in raw if bucket_start(row.timestamp, "hour") in day_hours],
+            granularities=("hour",)
+        ))
+
+        day_rows = conn.execute(
+            select(
+                feature_rollups.c.feature,
+                func.sum(feature_rollups.c.sample_count),
+                func.sum(feature_rollups.c.value_sum),
+                func.min(feature_rollups.c.value_min),
+                func.max(feature_rollups.c.value_max)
+            ).where(
+                feature_rollups.c.site_id == site_id,
+                feature_rollups.c.granularity == "hour",
+                feature_rollups.c.bucket_start >= day,
+                feature_rollups.c.bucket_start < day + timedelta(days=1)
+            ).group_by(feature_rollups.c.feature)
+        ).all()
+        _replace(conn, feature_rollups, key_columns, [
+            {
+                "id": str(uuid.uuid4()),
+                "site_id": site_id,
+                "granularity": "day",
+                "bucket_start": day,
+                "feature": feature,
+                "sample_count": count,
+                "value_sum": value_sum,
+                "value_min": value_min,
+                "value_max": value_max
+            }
+            for feature, count, value_sum, value_min, value_max in day_rows
+        ])
+
+
+def choose_granularity(start: Optional[datetime], end: datetime) -> str:
+    """Coarsest useful resolution for a history range: raw, hour or day"""
+    if start is None:
+        return "raw"
+
+    span = end - start
+    if span > timedelta(days=settings.ROLLUP_DAILY_AFTER_DAYS):
+        return "day"
+    if span > timedelta(hours=settings.ROLLUP_HOURLY_AFTER_HOURS):
+        return "hour"
+    return "raw"
+
+
+def plan_segments(start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+    """
+    Split [start, end) into the coarsest aligned pieces: whole days from the
+    daily rollup, whole hours from the hourly rollup and the ragged edges
+    from raw rows. Aggregates over the segments equal the raw aggregate.
+    """
+    segments = []
+
+    first_hour = bucket_start(start, "hour")
+    if first_hour < start:
+        first_hour += timedelta(hours=1)
+    last_hour = bucket_start(end, "hour")
+
+    if first_hour >= last_hour:
+        return [("raw", start, end)]
+
+    first_day = bucket_start(first_hour, "day")
+    if first_day < first_hour:
+        first_day += timedelta(days=1)
+    last_day = bucket_start(last_hour, "day")
+
+    if start < first_hour:
+        segments.append(("raw", start, first_hour))
+
+    if first_day < last_day:
+        if first_hour < first_day:
+            segments.append(("hour", first_hour, first_day))
+        segments.append(("day", first_day, last_day))
+        if last_day < last_hour:
+            segments.append(("hour", last_day, last_hour))
+    else:
+        segments.append(("hour", first_hour, last_hour))
+
+    if last_hour < end:
+        segments.append(("raw", last_hour, end))
+
+    return segments
+
+
+def prediction_stats(db, site_id: str, start: datetime, end: datetime) -> Dict[str, Any]:
+    """Count, mean probability and high-risk count over [start, end) using rollups where possible"""
+    total, probability_sum, high_risk = 0, 0.0, 0
+
+    for granularity, seg_start, seg_end in plan_segments(start, end):
+        if granularity == "raw":
+            row = db.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(predictions.c.probability), 0.0),
+                    func.count().filter(predictions.c.risk_level == "HIGH")
+                ).where(
+                    predictions.c.site_id == site_id,
+                    predictions.c.timestamp >= seg_start,
+                    predictions.c.timestamp < seg_end
+                )
+            ).first()
+        else:
+            row = db.execute(
+                select(
+                    func.coalesce(func.sum(prediction_rollups.c.prediction_count), 0),
+                    func.coalesce(func.sum(prediction_rollups.c.probability_sum), 0.0),
+                    func.coalesce(func.sum(prediction_rollups.c.high_risk_count), 0)
+                ).where(
+                    prediction_rollups.c.site_id == site_id,
+                    prediction_rollups.c.granularity == granularity,
+                    prediction_rollups.c.bucket_start >= seg_start,
+                    prediction_rollups.c.bucket_start < seg_end
+                )
+            ).first()
+
+        total += row[0]
+        probability_sum += row[1]
+        high_risk += row[2]
+
+    return {
+        "total_predictions": total,
+        "average_probability": probability_sum / total if total else 0.0,
+        "high_risk_count": high_risk
+    }
+
+
+def daily_prediction_stats(db, site_id: str, days: int, today: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Stats over the last `days` calendar days (today included) as a sum over
+    at most `days` per-site daily counter rows.
+    """
+    window_start = bucket_start(today or datetime.utcnow(), "day") - timedelta(days=days - 1)
+    row = db.execute(
+        select(
+            func.coalesce(func.sum(prediction_rollups.c.prediction_count), 0),
+            func.coalesce(func.sum(prediction_rollups.c.probability_sum), 0.0),
+            func.coalesce(func.sum(prediction_rollups.c.high_risk_count), 0)
+        ).where(
+            prediction_rollups.c.site_id == site_id,
+            prediction_rollups.c.granularity == "day",
+            prediction_rollups.c.bucket_start >= window_start
+        )
+    ).first()
+
+    total, probability_sum, high_risk = row
+    return {
+        "window_start": window_start,
+        "total_predictions": total,
+        "average_probability": probability_sum / total if total else 0.0,
+        "high_risk_count": high_risk
+    }
+
+
+def prediction_history(db, site_id: str, granularity: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Hourly or daily prediction aggregates for a site, newest first"""
+    rows = db.execute(
+        select(prediction_rollups).where(
+            prediction_rollups.c.site_id == site_id,
+            prediction_rollups.c.granularity == granularity,
+            prediction_rollups.c.bucket_start >= bucket_start(start, granularity),
+            prediction_rollups.c.bucket_start <= end
+        ).order_by(prediction_rollups.c.bucket_start.desc())
+    ).all()
+
+    return [
+        {
+            "granularity": granularity,
+            "bucket_start": row.bucket_start,
+            "prediction_count": row.prediction_count,
+            "avg_probability": row.probability_sum / row.prediction_count if row.prediction_count else 0.0,
+            "max_probability": row.probability_max,
+            "high_risk_count": row.high_risk_count
+        }
+        for row in rows
+    ]
+
+
+def feature_history(db, site_id: str, granularity: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Hourly or daily min/mean/max of the key features for a site"""
+    rows = db.execute(
+        select(feature_rollups).where(
+            feature_rollups.c.site_id == site_id,
+            feature_rollups.c.granularity == granularity,
+            feature_rollups.c.bucket_start >= bucket_start(start, granularity),
+            feature_rollups.c.bucket_start <= end
+        ).order_by(feature_rollups.c.bucket_start.desc(), feature_rollups.c.feature)
+    ).all()
+
+    return [
+        {
+            "granularity": granularity,
+            "bucket_start": row.bucket_start,
+            "feature": row.feature,
+            "min": row.value_min,
+            "mean": row.value_sum / row.sample_count if row.sample_count else None,
+            "max": row.value_max
+        }
+        for row in rows
+    ]
+
+
+def raw_history_start(table: str) -> Optional[datetime]:
+    """
+    First full day still held as raw rows in `table` under the retention
+    policy, or None if nothing has been archived. Rollups before it can
+    no longer be recomputed and are left alone by rebuilds and checks.
+    """
+    hot_days = settings.RETENTION_HOT_DAYS.get(table, 0)
+    if hot_days <= 0:
+        return None
+    return bucket_start(datetime.utcnow() - timedelta(days=hot_days), "day") + timedelta(days=1)
+
+
+def rebuild_prediction_rollups(
+    conn,
+    site_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    batch_size: int = 10000
+):
+    """Recompute prediction rollups from raw rows (initial load or repair), from `since` on"""
+    delete = prediction_rollups.delete()
+    query = select(
+        predictions.c.site_id, predictions.c.timestamp,
+        predictions.c.probability, predictions.c.risk_level
+    ).order_by(predictions.c.timestamp)
+    if site_id is not None:
+        delete = delete.where(prediction_rollups.c.site_id == site_id)
+        query = query.where(predictions.c.site_id == site_id)
+    if since is not None:
+        delete = delete.where(prediction_rollups.c.bucket_start >= bucket_start(since, "day"))
+        query = query.where(predictions.c.timestamp >= bucket_start(since, "day"))
+
+    conn.execute(delete)
+
+    result = conn.execute(query.execution_options(yield_per=batch_size))
+    for batch in result.partitions(batch_size):
+        record_predictions(conn, [row._mapping for row in batch])
+
+
+def rebuild_feature_rollups(
+    conn,
+    site_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    batch_size: int = 10000
+):
+    """Recompute feature rollups from raw site_features rows, from `since` on"""
+    delete = feature_rollups.delete()
+    query = select(
+        site_features.c.site_id, site_features.c.timestamp,
+        *[site_features.c[feature] for feature in ROLLUP_FEATURES]
+    ).order_by(site_features.c.timestamp)
+    if site_id is not None:
+        delete = delete.where(feature_rollups.c.site_id == site_id)
+        query = query.where(site_features.c.site_id == site_id)
+    if since is not None:
+        delete = delete.where(feature_rollups.c.bucket_start >= bucket_start(since, "day"))
+        query = query.where(site_features.c.timestamp >= bucket_start(since, "day"))
+
+    conn.execute(delete)
+
+    result = conn.execute(query.execution_options(yield_per=batch_size))
+    for batch in result.partitions(batch_size):
+        record_features(conn, [row._mapping for row in batch])
+
+
+def check_prediction_rollups(
+    conn,
+    site_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    batch_size: int = 10000
+) -> List[Dict[str, Any]]:
+    """
+    Recompute daily prediction counters from raw rows and report every
+    (site, day) whose stored counters drifted. Raw rows are streamed and
+    folded per day, so memory is bounded by the number of site-days.
+    """
+    raw_query = select(
+        predictions.c.site_id, predictions.c.timestamp,
+        predictions.c.probability, predictions.c.risk_level
+    )
+    rollup_query = select(prediction_rollups).where(prediction_rollups.c.granularity == "day")
+    if site_id is not None:
+        raw_query = raw_query.where(predictions.c.site_id == site_id)
+        rollup_query = rollup_query.where(prediction_rollups.c.site_id == site_id)
+    if since is not None:
+        raw_query = raw_query.where(predictions.c.timestamp >= bucket_start(since, "day"))
+        rollup_query = rollup_query.where(prediction_rollups.c.bucket_start >= bucket_start(since, "day"))
+
+    expected: Dict[Tuple[str, datetime], List[float]] = {}
+    result = conn.execute(raw_query.execution_options(yield_per=batch_size))
+    for row in result:
+        counters = expected.setdefault((row.site_id, bucket_start(row.timestamp, "day")), [0, 0.0, 0])
+        counters[0] += 1
+        counters[1] += row.probability
+        counters[2] += 1 if row.risk_level == "HIGH" else 0
+
+    actual = {
+        (row.site_id, row.bucket_start): [row.prediction_count, row.probability_sum, row.high_risk_count]
+        for row in conn.execute(rollup_query)
+    }
+
+    drift = []
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, [0, 0.0, 0])
+        have = actual.get(key, [0, 0.0, 0])
+        if want[0] != have[0] or want[2] != have[2] or abs(want[1] - have[1]) > 1e-6 * max(1.0, abs(want[1])):
+            drift.append({
+                "site_id": key[0],
+                "day": key[1],
+                "expected": {"count": want[0], "probability_sum": want[1], "high_risk_count": want[2]},
+                "actual": {"count": have[0], "probability_sum": have[1], "high_risk_count": have[2]}
+            })
+
+    return drift
+
+
+def check_feature_rollups(
+    conn,
+    site_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    batch_size: int = 10000
+) -> List[Dict[str, Any]]:
+    """
+    Recompute daily feature rollups from raw site_features rows and report
+    every (site, day, feature) whose stored count, sum, min or max drifted.
+    """
+    raw_query = select(
+        site_features.c.site_id, site_features.c.timestamp,
+        *[site_features.c[feature] for feature in ROLLUP_FEATURES]
+    )
+    rollup_query = select(feature_rollups).where(feature_rollups.c.granularity == "day")
+    if site_id is not None:
+        raw_query = raw_query.where(site_features.c.site_id == site_id)
+        rollup_query = rollup_query.where(feature_rollups.c.site_id == site_id)
+    if since is not None:
+        raw_query = raw_query.where(site_features.c.timestamp >= bucket_start(since, "day"))
+        rollup_query = rollup_query.where(feature_rollups.c.bucket_start >= bucket_start(since, "day"))
+
+    expected: Dict[Tuple[str, datetime, str], List[float]] = {}
+    result = conn.execute(raw_query.execution_options(yield_per=batch_size))
+    for row in result:
+        day = bucket_start(row.timestamp, "day")
+        for feature in ROLLUP_FEATURES:
+            value = getattr(row, feature)
+            if value is None:
+                continue
+            counters = expected.setdefault((row.site_id, day, feature), [0, 0.0, value, value])
+            counters[0] += 1
+            counters[1] += value
+            counters[2] = min(counters[2], value)
+            counters[3] = max(counters[3], value)
+
+    actual = {
+        (row.site_id, row.bucket_start, row.feature): [row.sample_count, row.value_sum, row.value_min, row.value_max]
+        for row in conn.execute(rollup_query)
+    }
+
+    def close(want, have):
+        if want is None or have is None:
+            return want is have
+        return abs(want - have) <= 1e-6 * max(1.0, abs(want))
+
+    drift = []
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, [0, 0.0, None, None])
+        have = actual.get(key, [0, 0.0, None, None])
+        if want[0] != have[0] or not all(close(w, h) for w, h in zip(want[1:], have[1:])):
+            drift.append({
+                "site_id": key[0],
+                "day": key[1],
+                "feature": key[2],
+                "expected": {"count": want[0], "value_sum": want[1], "min": want[2], "max": want[3]},
+                "actual": {"count": have[0], "value_sum": have[1], "min": have[2], "max": have[3]}
+            })
+
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify rollups against raw data")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--site-id", default=None)
+    parser.add_argument("--repair", action="store_true", help="Rebuild sites that drifted (check only)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Rollups of archived days are the only copy left in the database
+    predictions_since = raw_history_start("predictions")
+    features_since = raw_history_start("site_features")
+
+    if args.command == "rebuild":
+        with engine.begin() as conn:
+            rebuild_prediction_rollups(conn, args.site_id, predictions_since)
+            rebuild_feature_rollups(conn, args.site_id, features_since)
+        logger.info("Rollups rebuilt from raw data")
+        return
+
+    with engine.begin() as conn:
+        drift = check_prediction_rollups(conn, args.site_id, predictions_since)
+        for entry in drift:
+            logger.warning(
+                f"Drift for site {entry['site_id']} on {entry['day'].date()}: "
+                f"expected {entry['expected']}, stored {entry['actual']}"
+            )
+        feature_drift = check_feature_rollups(conn, args.site_id, features_since)
+        for entry in feature_drift:
+            logger.warning(
+                f"Drift for site {entry['site_id']} {entry['feature']} on {entry['day'].date()}: "
+                f"expected {entry['expected']}, stored {entry['actual']}"
+            )
+        logger.info(
+            f"Consistency check finished: {len(drift)} drifting site-days of predictions, "
+            f"{len(feature_drift)} of features"
+        )
+
+        if args.repair:
+            for drifting_site in sorted({entry["site_id"] for entry in drift}):
+                rebuild_prediction_rollups(conn, drifting_site, predictions_since)
+                logger.info(f"Rebuilt prediction rollups for site {drifting_site}")
+            for drifting_site in sorted({entry["site_id"] for entry in feature_drift}):
+                rebuild_feature_rollups(conn, drifting_site, features_since)
+                logger.info(f"Rebuilt feature rollups for site {drifting_site}")
+
+    if (drift or feature_drift) and not args.repair:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
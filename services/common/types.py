@@ -0,0 +1,38 @@
+import uuid
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+
+class GUID(TypeDecorator):
+    """
+    UUID key stored compactly: native UUID on Postgres and a 16-byte BLOB
+    elsewhere. Accepts str or uuid.UUID on the way in and returns the
+    canonical string form, so application code keeps dealing in strings.
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        if dialect.name == 'postgresql':
+            return value
+        return value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return str(uuid.UUID(bytes=bytes(value)))
+        # Rows not yet converted by migration 005
+        return str(uuid.UUID(value))
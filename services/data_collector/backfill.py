@@ -0,0 +1,333 @@
+import argparse
+import hashlib
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy.dialects import postgresql, sqlite
+from services.common.config import get_settings
+from services.common.database import engine
+from services.common.models import RockfallEvent
+from services.data_collector.feature_store import bulk_upsert_site_features
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+rockfall_events = RockfallEvent.__table__
+
+REQUIRED_COLUMNS = {
+    "weather": ["site_id", "timestamp", "rain_1h_mm", "temperature_c", "humidity_pct"],
+    "seismic": ["site_id", "time", "magnitude", "distance_km"],
+    "events": ["site_id", "timestamp"]
+}
+
+# Valid ranges; rows outside them are dropped during validation
+VALID_RANGES = {
+    "rain_1h_mm": (0.0, 500.0),
+    "temperature_c": (-60.0, 60.0),
+    "humidity_pct": (0.0, 100.0),
+    "magnitude": (-2.0, 10.0),
+    "distance_km": (0.0, 20000.0),
+    "volume_m3": (0.0, None),
+    "impact_energy": (0.0, None)
+}
+
+EVENT_COLUMNS = ["volume_m3", "impact_energy", "description", "verification_status"]
+
+
+def iter_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Stream a CSV or Parquet archive in chunks of at most `chunk_size` rows"""
+    if path.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required to backfill from Parquet archives")
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def validate_chunk(df: pd.DataFrame, kind: str) -> pd.DataFrame:
+    """Check required columns, coerce types and drop invalid rows"""
+    missing = [col for col in REQUIRED_COLUMNS[kind] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Archive is missing required columns for {kind}: {missing}")
+
+    df = df.copy()
+    time_column = "time" if kind == "seismic" else "timestamp"
+    df[time_column] = pd.to_datetime(df[time_column], utc=True, errors="coerce").dt.tz_localize(None)
+    df["site_id"] = df["site_id"].astype(str)
+
+    for col, (low, high) in VALID_RANGES.items():
+        if col not in df.columns:
+            continue
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+        out_of_range = (df[col] < low) if low is not None else False
+        if high is not None:
+            out_of_range = out_of_range | (df[col] > high)
+        df.loc[out_of_range, col] = np.nan
+
+    required_values = [col for col in REQUIRED_COLUMNS[kind] if col != "site_id"]
+    return df.dropna(subset=["site_id"] + required_values)
+
+
+class WeatherDeriver:
+    """
+    Derives the same features WeatherCollector computes from InfluxDB
+    (accumulated rain, antecedent precipitation index, temperature change),
+    carrying the last 72h of readings per site across chunks.
+    """
+
+    def __init__(self):
+        self.tail = pd.DataFrame()
+
+    def derive(self, df: pd.DataFrame) -> pd.DataFrame:
+        new_index = pd.RangeIndex(len(self.tail), len(self.tail) + len(df))
+        df = df[["site_id", "timestamp", "rain_1h_mm", "temperature_c", "humidity_pct"]]
+        frame = pd.concat([self.tail, df.set_index(new_index)])
+        frame = frame.sort_values(["site_id", "timestamp"], kind="stable")
+
+        for hours in (24, 72):
+            window = f"{hours}h"
+            # Comes back indexed by (site_id, timestamp) in frame order, as the
+            # frame is sorted by site; a groupby-apply would return a frame
+            # instead of a series when there is a single site
+            rolled = frame.groupby("site_id", sort=False).rolling(window, on="timestamp")["rain_1h_mm"].sum()
+            frame[f"rain_{hours}h_mm"] = rolled.to_numpy()
+
+        frame["api_value"] = frame["rain_24h_mm"] * 0.5 + frame["rain_72h_mm"] * 0.3
+
+        # Change against the first reading inside the window, as the collector does
+        for hours in (6, 24):
+            lookup = frame[["site_id", "timestamp"]].copy()
+            lookup["window_start"] = lookup["timestamp"] - pd.Timedelta(hours=hours)
+            first = pd.merge_asof(
+                lookup.reset_index().sort_values("window_start"),
+                frame[["site_id", "timestamp", "temperature_c"]].sort_values("timestamp"),
+                left_on="window_start",
+                right_on="timestamp",
+                by="site_id",
+                direction="forward",
+                suffixes=("", "_first")
+            ).set_index("index")
+            frame[f"temp_change_{hours}h_c"] = frame["temperature_c"] - first["temperature_c"]
+
+        cutoff = frame["timestamp"].max() - pd.Timedelta(hours=72)
+        self.tail = frame.loc[frame["timestamp"] > cutoff, df.columns]
+        self.tail = self.tail.reset_index(drop=True)
+
+        return frame.loc[frame.index.isin(new_index)]
+
+
+class SeismicDeriver:
+    """
+    Derives SeismicCollector's 72h features for every bucket that has an
+    event, using the bucket end as the reference time. Keeps the last 72h of
+    events per site across chunks.
+    """
+
+    def __init__(self, bucket_minutes: int):
+        self.bucket = pd.Timedelta(minutes=bucket_minutes)
+        self.tail = pd.DataFrame()
+
+    def derive(self, df: pd.DataFrame) -> pd.DataFrame:
+        df = df[["site_id", "time", "magnitude", "distance_km"]]
+        events = pd.concat([self.tail, df]).sort_values(["site_id", "time"], kind="stable")
+        buckets = df.assign(timestamp=df["time"].dt.floor(self.bucket))[["site_id", "timestamp"]]
+        buckets = buckets.drop_duplicates()
+
+        rows = []
+        for site_id, site_buckets in buckets.groupby("site_id", sort=False):
+            site_events = events[events["site_id"] == site_id]
+            times = site_events["time"].to_numpy()
+            magnitudes = site_events["magnitude"].to_numpy()
+            distances = site_events["distance_km"].to_numpy()
+
+            for bucket_start in site_buckets["timestamp"]:
+                reference = bucket_start + self.bucket
+                lo = np.searchsorted(times, np.datetime64(reference - pd.Timedelta(hours=72)), side="right")
+                hi = np.searchsorted(times, np.datetime64(reference), side="left")
+                window_times = times[lo:hi]
+                window_mags = magnitudes[lo:hi]
+
+                hours_ago = (np.datetime64(reference) - window_times) / np.timedelta64(1, "h")
+                weighted = window_mags / (hours_ago + 1) / (distances[lo:hi] + 1)
+                m3_times = window_times[window_mags >= 3.0]
+                minutes_since_m3 = (
+                    (np.datetime64(reference) - m3_times.max()) / np.timedelta64(1, "m")
+                    if len(m3_times) else None
+                )
+
+                rows.append({
+                    "site_id": site_id,
+                    "timestamp": bucket_start,
+                    "quake_count_72h": int(hi - lo),
+                    "max_magnitude_72h": float(window_mags.max()) if hi > lo else 0.0,
+                    "weighted_magnitude_72h": float(weighted.sum()),
+                    "minutes_since_m3": int(minutes_since_m3) if minutes_since_m3 is not None else None
+                })
+
+        cutoff = events["time"].max() - pd.Timedelta(hours=72)
+        self.tail = events[events["time"] > cutoff].reset_index(drop=True)
+
+        return pd.DataFrame(rows)
+
+
+def to_feature_rows(df: pd.DataFrame, bucket_minutes: int) -> List[Dict[str, Any]]:
+    """Bucket timestamps and keep the last reading per (site_id, bucket)"""
+    df = df.copy()
+    df["timestamp"] = df["timestamp"].dt.floor(f"{bucket_minutes}min")
+    df = df.drop_duplicates(subset=["site_id", "timestamp"], keep="last")
+    df = df.astype(object).where(df.notna(), None)
+    df["timestamp"] = df["timestamp"].map(lambda ts: ts.to_pydatetime())
+    return df.to_dict("records")
+
+
+def load_events(conn, df: pd.DataFrame) -> int:
+    """Insert rockfall events; ids are derived from (site_id, timestamp) so replays are no-ops"""
+    columns = [col for col in EVENT_COLUMNS if col in df.columns]
+    df = df[["site_id", "timestamp"] + columns].drop_duplicates(subset=["site_id", "timestamp"])
+    df = df.astype(object).where(df.notna(), None)
+    rows = [
+        {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{row['site_id']}/{row['timestamp'].isoformat()}")),
+            **row,
+            "timestamp": row["timestamp"].to_pydatetime()
+        }
+        for row in df.to_dict("records")
+    ]
+    if not rows:
+        return 0
+
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    conn.execute(insert(rockfall_events).on_conflict_do_nothing(index_elements=["id"]), rows)
+    return len(rows)
+
+
+class Checkpoint:
+    """
+    Per-archive progress file recording how many chunks have been committed.
+    Keyed on the archive's resolved path, so archives sharing a file name
+    in different directories keep separate positions.
+    """
+
+    def __init__(self, checkpoint_dir: Path, path: Path, kind: str):
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha1(str(path.resolve()).encode()).hexdigest()[:12]
+        self.file = checkpoint_dir / f"{kind}-{path.name}-{digest}.json"
+
+    def load(self) -> Dict[str, Any]:
+        if self.file.exists():
+            return json.loads(self.file.read_text())
+        return {"chunks_done": 0, "rows_loaded": 0, "complete": False}
+
+    def save(self, state: Dict[str, Any]):
+        tmp = self.file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        tmp.replace(self.file)
+
+
+def backfill_file(
+    path: str,
+    kind: str,
+    chunk_size: int,
+    checkpoint_dir: str,
+    bucket_minutes: Optional[int] = None
+) -> Dict[str, Any]:
+    """Backfill one archive (one partition), resuming from its checkpoint"""
+    path = Path(path)
+    bucket_minutes = bucket_minutes or settings.FEATURE_BUCKET_MINUTES
+    checkpoint = Checkpoint(Path(checkpoint_dir), path, kind)
+    state = checkpoint.load()
+
+    if state["complete"]:
+        logger.info(f"{path.name}: already backfilled, skipping")
+        return state
+
+    deriver = None
+    if kind == "weather":
+        deriver = WeatherDeriver()
+    elif kind == "seismic":
+        deriver = SeismicDeriver(bucket_minutes)
+
+    # Fresh pooled connections in each worker process
+    engine.dispose(close=False)
+
+    started = time.monotonic()
+    rows_this_run = 0
+    for index, chunk in enumerate(iter_chunks(path, chunk_size)):
+        chunk = validate_chunk(chunk, kind)
+
+        if deriver is not None:
+            # Replayed chunks still feed the rolling windows, but are not reloaded
+            derived = deriver.derive(chunk)
+        if index < state["chunks_done"]:
+            continue
+
+        chunk_started = time.monotonic()
+        with engine.begin() as conn:
+            if kind == "events":
+                loaded = load_events(conn, chunk)
+            else:
+                source = f"backfill-{kind}"
+                loaded = bulk_upsert_site_features(conn, to_feature_rows(derived, bucket_minutes), source)
+
+        state["chunks_done"] = index + 1
+        state["rows_loaded"] += loaded
+        checkpoint.save(state)
+
+        rows_this_run += loaded
+        elapsed = time.monotonic() - chunk_started
+        logger.info(
+            f"{path.name}: chunk {index} loaded {loaded} rows "
+            f"({loaded / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+
+    state["complete"] = True
+    checkpoint.save(state)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"{path.name}: finished, {rows_this_run} rows in {elapsed:.1f}s "
+        f"({rows_this_run / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical archives into the feature store")
+    parser.add_argument("kind", choices=sorted(REQUIRED_COLUMNS), help="Archive type")
+    parser.add_argument("paths", nargs="+", help="CSV or Parquet files; each file is one partition")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Partitions loaded in parallel")
+    parser.add_argument("--checkpoint-dir", default=".backfill_checkpoints", help="Where progress is recorded")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    started = time.monotonic()
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(backfill_file, path, args.kind, args.chunk_size, args.checkpoint_dir): path
+            for path in args.paths
+        }
+        for future in as_completed(futures):
+            try:
+                total_rows += future.result()["rows_loaded"]
+            except Exception as e:
+                logger.error(f"Backfill of {futures[future]} failed: {str(e)}")
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Backfill finished: {total_rows} rows in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
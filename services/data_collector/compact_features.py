@@ -0,0 +1,95 @@
+import logging
+from typing import Dict, Any, List
+from sqlalchemy import select, update, delete
+from services.common.database import engine
+from services.data_collector.feature_store import (
+    site_features, bucket_timestamp, FEATURE_COLUMNS, MERGED_SOURCE
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _merge_rows(rows: List[Any]) -> Dict[str, Any]:
+    """Merge rows of one bucket, keeping the latest non-null value per column"""
+    merged = {}
+    for row in rows:
+        for col in FEATURE_COLUMNS:
+            value = getattr(row, col)
+            if value is not None:
+                merged[col] = value
+
+    sources = {row.source for row in rows}
+    merged['source'] = sources.pop() if len(sources) == 1 else MERGED_SOURCE
+    return merged
+
+
+def compact_site(conn, site_id: str) -> Dict[str, int]:
+    """Collapse all feature rows of a site into one row per time bucket"""
+    rows = conn.execute(
+        select(site_features)
+        .where(site_features.c.site_id == site_id)
+        .order_by(site_features.c.timestamp, site_features.c.created_at)
+    ).all()
+
+    buckets: Dict[Any, List[Any]] = {}
+    for row in rows:
+        buckets.setdefault(bucket_timestamp(row.timestamp), []).append(row)
+
+    deleted = 0
+    for bucket, bucket_rows in buckets.items():
+        keeper, duplicates = bucket_rows[0], bucket_rows[1:]
+
+        if duplicates:
+            duplicate_ids = [row.id for row in duplicates]
+            conn.execute(delete(site_features).where(site_features.c.id.in_(duplicate_ids)))
+            deleted += len(duplicate_ids)
+
+        if duplicates or keeper.timestamp != bucket:
+            conn.execute(
+                update(site_features)
+                .where(site_features.c.id == keeper.id)
+                .values(timestamp=bucket, **_merge_rows(bucket_rows))
+            )
+
+    return {"rows_before": len(rows), "rows_after": len(buckets), "rows_deleted": deleted}
+
+
+def compact_site_features(conn, commit_each_site: bool = False) -> Dict[str, int]:
+    """
+    One-time compaction of partial weather-only/seismic-only rows written
+    before the feature store merged sources. Works site by site so memory
+    is bounded by one site's history. Must run before the unique
+    (site_id, timestamp) index is created.
+    """
+    site_ids = [
+        row.site_id for row in
+        conn.execute(select(site_features.c.site_id).distinct()).all()
+    ]
+
+    totals = {"rows_before": 0, "rows_after": 0, "rows_deleted": 0}
+    for site_id in site_ids:
+        result = compact_site(conn, site_id)
+        if commit_each_site:
+            conn.commit()
+        for key, value in result.items():
+            totals[key] += value
+
+        logger.info(f"Compacted site {site_id}: {result['rows_before']} -> {result['rows_after']} rows")
+
+    return totals
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    with engine.connect() as conn:
+        totals = compact_site_features(conn, commit_each_site=True)
+
+    logger.info(
+        f"Compaction finished: {totals['rows_before']} -> {totals['rows_after']} rows "
+        f"({totals['rows_deleted']} deleted)"
+    )
+
+
+if __name__ == "__main__":
+    main()
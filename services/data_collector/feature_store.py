@@ -0,0 +1,215 @@
+import csv
+import io
+import math
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional
+import uuid
+from sqlalchemy import select, update, case
+from sqlalchemy.dialects import postgresql, sqlite
+from services.common.config import get_settings
+from services.common.database import dialect_name
+from services.common.models import SiteFeature
+from services.common.rollups import refresh_features
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+site_features = SiteFeature.__table__
+
+# Columns each collector owns; a source only ever writes its own columns
+WEATHER_COLUMNS = [
+    'rain_1h_mm', 'rain_24h_mm', 'rain_72h_mm', 'api_value',
+    'temperature_c', 'temp_change_6h_c', 'temp_change_24h_c', 'humidity_pct'
+]
+SEISMIC_COLUMNS = [
+    'quake_count_72h', 'max_magnitude_72h',
+    'weighted_magnitude_72h', 'minutes_since_m3'
+]
+FEATURE_COLUMNS = WEATHER_COLUMNS + SEISMIC_COLUMNS
+
+MERGED_SOURCE = 'merged'
+
+
+def bucket_timestamp(timestamp: datetime, bucket_minutes: Optional[int] = None) -> datetime:
+    """Truncate a timestamp to the start of its feature bucket (naive UTC)"""
+    bucket_minutes = bucket_minutes or settings.FEATURE_BUCKET_MINUTES
+
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    bucket_seconds = bucket_minutes * 60
+    midnight = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset = int((timestamp - midnight).total_seconds()) // bucket_seconds * bucket_seconds
+    return midnight + timedelta(seconds=offset)
+
+
+def _clean_value(value: Any) -> Any:
+    """Map values the feature columns cannot hold (inf, NaN) to NULL"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def upsert_site_features(
+    conn,
+    site_id: str,
+    timestamp: datetime,
+    values: Dict[str, Any],
+    source: str
+) -> datetime:
+    """
+    Merge one source's readings into the feature row for (site_id, bucket).
+    Only the columns present in `values` are written, so weather and seismic
+    collectors fill in the same row instead of each inserting a partial one.
+    `conn` may be a Session or a Connection; the caller commits.
+    Returns the bucket timestamp the values were written to.
+    """
+    bucket = bucket_timestamp(timestamp)
+    values = {
+        col: _clean_value(value)
+        for col, value in values.items()
+        if col in FEATURE_COLUMNS
+    }
+
+    row = {
+        'id': str(uuid.uuid4()),
+        'site_id': site_id,
+        'timestamp': bucket,
+        'source': source,
+        'created_at': datetime.utcnow(),
+        **values
+    }
+
+    dialect = dialect_name(conn)
+
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(site_features).values(**row)
+        merged_source = case(
+            (site_features.c.source == stmt.excluded.source, site_features.c.source),
+            else_=MERGED_SOURCE
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['site_id', 'timestamp'],
+            set_={
+                **{col: stmt.excluded[col] for col in values},
+                'source': merged_source
+            }
+        )
+        conn.execute(stmt)
+    else:
+        # Emulate ON CONFLICT DO UPDATE for dialects without native upsert
+        existing = conn.execute(
+            select(site_features.c.id, site_features.c.source).where(
+                site_features.c.site_id == site_id,
+                site_features.c.timestamp == bucket
+            )
+        ).first()
+
+        if existing is None:
+            conn.execute(site_features.insert().values(**row))
+        else:
+            conn.execute(
+                update(site_features)
+                .where(site_features.c.id == existing.id)
+                .values(
+                    **values,
+                    source=existing.source if existing.source == source else MERGED_SOURCE
+                )
+            )
+
+    refresh_features(conn, [{'site_id': site_id, 'timestamp': bucket, **values}])
+
+    return bucket
+
+
+def _copy_upsert_postgres(conn, rows: List[Dict[str, Any]], columns: List[str]):
+    """COPY rows into a staging table, then merge them with one INSERT ... ON CONFLICT"""
+    all_columns = ['id', 'site_id', 'timestamp', 'source', 'created_at'] + columns
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            '' if row.get(col) is None else row.get(col)
+            for col in all_columns
+        ])
+    buffer.seek(0)
+
+    column_list = ", ".join(all_columns)
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns)
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS site_features_staging "
+            "(LIKE site_features INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(
+            f"COPY site_features_staging ({column_list}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+        cursor.execute(
+            f"INSERT INTO site_features ({column_list}) "
+            f"SELECT {column_list} FROM site_features_staging "
+            f"ON CONFLICT (site_id, timestamp) DO UPDATE SET {updates}, "
+            f"source = CASE WHEN site_features.source = EXCLUDED.source "
+            f"THEN site_features.source ELSE '{MERGED_SOURCE}' END"
+        )
+    finally:
+        cursor.close()
+
+
+def bulk_upsert_site_features(conn, rows: List[Dict[str, Any]], source: str) -> int:
+    """
+    Merge many feature rows at once (backfill path). Rows carry site_id, a
+    bucketed timestamp and feature columns; all rows must share the same
+    column set and be unique per (site_id, timestamp). Uses COPY into a
+    staging table on Postgres and a batched executemany upsert on SQLite.
+    `conn` is a Connection; the caller commits.
+    """
+    if not rows:
+        return 0
+
+    columns = [col for col in FEATURE_COLUMNS if col in rows[0]]
+    now = datetime.utcnow()
+    rows = [
+        {
+            'id': str(uuid.uuid4()),
+            'site_id': row['site_id'],
+            'timestamp': row['timestamp'],
+            'source': source,
+            'created_at': now,
+            **{col: _clean_value(row.get(col)) for col in columns}
+        }
+        for row in rows
+    ]
+
+    dialect = dialect_name(conn)
+
+    if dialect == 'postgresql':
+        _copy_upsert_postgres(conn, rows, columns)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(site_features)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['site_id', 'timestamp'],
+            set_={
+                **{col: stmt.excluded[col] for col in columns},
+                'source': case(
+                    (site_features.c.source == stmt.excluded.source, site_features.c.source),
+                    else_=MERGED_SOURCE
+                )
+            }
+        )
+        conn.execute(stmt, rows)
+    else:
+        for row in rows:
+            upsert_site_features(
+                conn, row['site_id'], row['timestamp'],
+                {col: row[col] for col in columns}, source
+            )
+        return len(rows)
+
+    refresh_features(conn, rows)
+
+    return len(rows)
@@ -1,13 +1,17 @@
 import requests
-import schedule
-import time
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 import logging
-import os
 import random
+from services.common.config import get_settings
 from services.common.database import get_db
-from services.common.models import Site, SiteFeature
+from services.common.metrics import start_metrics_server
+from services.common.models import Site
+from services.database_service.partition_manager import start_maintenance
+from services.data_collector.feature_store import upsert_site_features
+from services.data_collector.scheduler import RiskAdaptiveScheduler, load_active_sites
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 def collect_weather_data(site_id: str) -> dict:
@@ -32,71 +36,88 @@ def collect_seismic_data(site_id: str) -> dict:
         'max_magnitude_72h': random.uniform(0, 4.0)
     }
 
+def collect_site(site_id: str, site_name: Optional[str] = None) -> dict:
+    """
+    Collect data for one site, then request a prediction and alert check.
+    Returns the observations the scheduler uses to pick the next interval.
+    """
+    site_name = site_name or site_id
+
+    # Collect data
+    weather_data = collect_weather_data(site_id)
+    seismic_data = collect_seismic_data(site_id)
+    observations = {
+        'rain_1h_mm': weather_data['rain_1h_mm'],
+        'max_magnitude_72h': seismic_data['max_magnitude_72h']
+    }
+
+    with get_db() as db:
+        # Merge into the feature row for the current bucket
+        upsert_site_features(
+            db,
+            site_id,
+            datetime.utcnow(),
+            {**weather_data, **seismic_data},
+            source='simulator'
+        )
+        db.commit()
+
+    logger.info(f"Data collected for site {site_name}")
+
+    # Call prediction service
+    try:
+        prediction_url = f"http://localhost:8001/predict/{site_id}"
+        prediction_response = requests.get(prediction_url)
+
+        if prediction_response.status_code == 200:
+            prediction = prediction_response.json()
+            observations['risk_level'] = prediction.get('risk_level')
+
+            # Call alert manager if prediction received
+            alert_url = f"http://localhost:8002/alerts/{site_id}"
+            alert_response = requests.post(alert_url, json=prediction)
+
+            if alert_response.status_code == 200:
+                logger.info(f"Alert processed for site {site_name}")
+            else:
+                logger.error(f"Failed to process alert for site {site_name}")
+
+        else:
+            logger.error(f"Failed to get prediction for site {site_name}")
+
+    except Exception as e:
+        logger.error(f"Failed to process prediction/alert: {str(e)}")
+
+    return observations
+
 def collect_site_data():
     """Collect data for all active sites"""
     logger.info("Starting data collection...")
     
     with get_db() as db:
         # Get all active sites
-        sites = db.query(Site).filter(Site.is_active == True).all()
-        
-        for site in sites:
-            try:
-                # Collect data
-                weather_data = collect_weather_data(site.id)
-                seismic_data = collect_seismic_data(site.id)
-                
-                # Create feature record
-                feature = SiteFeature(
-                    site_id=site.id,
-                    timestamp=datetime.utcnow(),
-                    source='simulator',
-                    **weather_data,
-                    **seismic_data
-                )
-                
-                db.add(feature)
-                db.commit()
-                
-                logger.info(f"Data collected for site {site.name}")
-                
-                # Call prediction service
-                try:
-                    prediction_url = f"http://localhost:8001/predict/{site.id}"
-                    prediction_response = requests.get(prediction_url)
-                    
-                    if prediction_response.status_code == 200:
-                        prediction = prediction_response.json()
-                        
-                        # Call alert manager if prediction received
-                        alert_url = f"http://localhost:8002/alerts/{site.id}"
-                        alert_response = requests.post(alert_url, json=prediction)
-                        
-                        if alert_response.status_code == 200:
-                            logger.info(f"Alert processed for site {site.name}")
-                        else:
-                            logger.error(f"Failed to process alert for site {site.name}")
-                            
-                    else:
-                        logger.error(f"Failed to get prediction for site {site.name}")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to process prediction/alert: {str(e)}")
-                
-            except Exception as e:
-                logger.error(f"Failed to collect data for site {site.name}: {str(e)}")
-                continue
+        sites = [
+            (str(site.id), site.name)
+            for site in db.query(Site).filter(Site.is_active == True).all()
+        ]
+
+    for site_id, site_name in sites:
+        try:
+            collect_site(site_id, site_name)
+        except Exception as e:
+            logger.error(f"Failed to collect data for site {site_name}: {str(e)}")
+            continue
 
 def main():
-    # Schedule data collection every 5 minutes
-    schedule.every(5).minutes.do(collect_site_data)
-    
-    # Do an initial collection
-    collect_site_data()
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    if settings.COLLECTOR_METRICS_PORT:
+        start_metrics_server(settings.COLLECTOR_METRICS_PORT)
+
+    # Upcoming monthly partitions must exist before rows for that month arrive
+    start_maintenance()
+
+    # Each site gets its own cadence based on its latest risk and conditions
+    scheduler = RiskAdaptiveScheduler(collect_site)
+    scheduler.run_forever(load_active_sites)
 
 if __name__ == "__main__":
     main()
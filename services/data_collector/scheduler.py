@@ -0,0 +1,280 @@
+import heapq
+import itertools
+import logging
+import time
+import zlib
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from services.common.config import get_settings
+from services.common.database import get_db
+from services.common.metrics import registry
+from services.common.models import Prediction, Site, SiteFeature
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Ties between predictions with the same latest timestamp go to the riskier
+RISK_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+schedule_lag = registry.histogram(
+    "collector_schedule_lag_seconds",
+    "Delay between a site's due time and the start of its collection"
+)
+collections_total = registry.counter(
+    "collector_collections_total",
+    "Site collections run by the scheduler, by tier"
+)
+collection_failures_total = registry.counter(
+    "collector_collection_failures_total",
+    "Site collections that raised, by tier"
+)
+scheduled_sites = registry.gauge(
+    "collector_scheduled_sites",
+    "Sites currently scheduled, by tier"
+)
+overdue_sites = registry.gauge(
+    "collector_overdue_sites",
+    "Sites past their due time when the scheduler last woke up"
+)
+
+
+class SiteSchedule:
+    def __init__(self, site_id: str, name: str, tier: str, interval: float, due_at: float):
+        self.site_id = site_id
+        self.name = name
+        self.tier = tier
+        self.interval = interval
+        self.due_at = due_at
+
+
+class RiskAdaptiveScheduler:
+    """
+    Priority-queue scheduler giving each site its own collection cadence.
+
+    Sites are kept in a min-heap keyed on their next due time. After every
+    collection the site is re-tiered from its latest risk level, rainfall
+    intensity and seismicity, so at-risk slopes are polled often and quiet
+    ones rarely. Initial due times are phase-shifted by a hash of the site id
+    so a fleet of sites is spread across the interval instead of bursting.
+    """
+
+    def __init__(
+        self,
+        collect_fn: Callable[[str], Optional[Dict[str, Any]]],
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.collect_fn = collect_fn
+        self.clock = clock
+        self.sleep = sleep
+        self.intervals = {
+            "high": settings.COLLECT_INTERVAL_HIGH_SECONDS,
+            "elevated": settings.COLLECT_INTERVAL_ELEVATED_SECONDS,
+            "default": settings.COLLECT_INTERVAL_DEFAULT_SECONDS,
+            "quiet": settings.COLLECT_INTERVAL_QUIET_SECONDS
+        }
+        self.sites: Dict[str, SiteSchedule] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+
+    def classify(
+        self,
+        risk_level: Optional[str] = None,
+        rain_1h_mm: Optional[float] = None,
+        max_magnitude_72h: Optional[float] = None
+    ) -> str:
+        """Pick a collection tier from the latest risk and observations"""
+        risk_level = risk_level.upper() if risk_level else None
+
+        if risk_level == "HIGH":
+            return "high"
+
+        wet = rain_1h_mm is not None and rain_1h_mm >= settings.COLLECT_RAIN_INTENSITY_MM_H
+        shaking = (
+            max_magnitude_72h is not None
+            and max_magnitude_72h >= settings.COLLECT_SEISMIC_MAGNITUDE
+        )
+        if risk_level == "MEDIUM" or wet or shaking:
+            return "elevated"
+
+        if risk_level is None and rain_1h_mm is None and max_magnitude_72h is None:
+            return "default"
+
+        return "quiet"
+
+    def _phase(self, site_id: str, interval: float) -> float:
+        """Stable offset within the interval, spreading sites evenly"""
+        return (zlib.crc32(site_id.encode()) / 2 ** 32) * interval
+
+    def _push(self, schedule: SiteSchedule):
+        heapq.heappush(self._heap, (schedule.due_at, next(self._counter), schedule.site_id))
+
+    def _update_tier_gauge(self):
+        counts = {tier: 0 for tier in self.intervals}
+        for schedule in self.sites.values():
+            counts[schedule.tier] += 1
+        for tier, count in counts.items():
+            scheduled_sites.set(count, {"tier": tier})
+
+    def add_site(self, site_id: str, name: str, observations: Optional[Dict[str, Any]] = None):
+        """Schedule a site, phase-shifted within its first interval"""
+        tier = self.classify(**(observations or {}))
+        interval = self.intervals[tier]
+        schedule = SiteSchedule(
+            site_id, name, tier, interval,
+            self.clock() + self._phase(site_id, interval)
+        )
+        self.sites[site_id] = schedule
+        self._push(schedule)
+
+    def sync_sites(self, sites: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """Add newly active sites and drop deactivated ones"""
+        active = set()
+        for site_id, name, observations in sites:
+            active.add(site_id)
+            if site_id not in self.sites:
+                self.add_site(site_id, name, observations)
+
+        for site_id in list(self.sites):
+            if site_id not in active:
+                # Stale heap entries are skipped when popped
+                del self.sites[site_id]
+
+        self._update_tier_gauge()
+
+    def reschedule(self, site_id: str, observations: Optional[Dict[str, Any]]):
+        """Re-tier a site after a collection and queue its next run"""
+        schedule = self.sites.get(site_id)
+        if schedule is None:
+            return
+
+        if observations:
+            tier = self.classify(**observations)
+            if tier != schedule.tier:
+                logger.info(f"Site {schedule.name} moved from {schedule.tier} to {tier} tier")
+            schedule.tier = tier
+            schedule.interval = self.intervals[tier]
+
+        schedule.due_at = self.clock() + schedule.interval
+        self._push(schedule)
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest live heap entry"""
+        while self._heap:
+            due_at, _, site_id = self._heap[0]
+            schedule = self.sites.get(site_id)
+            if schedule is not None and schedule.due_at == due_at:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def run_pending(self) -> int:
+        """Collect every site that is due; returns the number collected"""
+        now = self.clock()
+        overdue_sites.set(sum(1 for s in self.sites.values() if s.due_at <= now))
+
+        collected = 0
+        while True:
+            due_at = self.next_due()
+            if due_at is None or due_at > self.clock():
+                break
+
+            _, _, site_id = heapq.heappop(self._heap)
+            schedule = self.sites[site_id]
+            schedule_lag.observe(self.clock() - due_at, {"tier": schedule.tier})
+
+            observations = None
+            try:
+                observations = self.collect_fn(site_id)
+                collections_total.inc(labels={"tier": schedule.tier})
+            except Exception as e:
+                collection_failures_total.inc(labels={"tier": schedule.tier})
+                logger.error(f"Failed to collect data for site {schedule.name}: {str(e)}")
+
+            self.reschedule(site_id, observations)
+            collected += 1
+
+        self._update_tier_gauge()
+        return collected
+
+    def run_forever(
+        self,
+        load_sites: Callable[[], Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]],
+        refresh_seconds: Optional[float] = None
+    ):
+        """Main loop: sleep until the next site is due, refreshing the site list periodically"""
+        refresh_seconds = refresh_seconds or settings.COLLECT_SITE_REFRESH_SECONDS
+        next_refresh = self.clock()
+
+        while True:
+            if self.clock() >= next_refresh:
+                self.sync_sites(load_sites())
+                next_refresh = self.clock() + refresh_seconds
+
+            self.run_pending()
+
+            due_at = self.next_due()
+            wake_at = next_refresh if due_at is None else min(due_at, next_refresh)
+            self.sleep(max(0.0, wake_at - self.clock()))
+
+
+def load_active_sites() -> List[Tuple[str, str, Optional[Dict[str, Any]]]]:
+    """
+    Active sites with their latest stored observations and latest predicted
+    risk level, for initial tiering
+    """
+    with get_db() as db:
+        latest = (
+            db.query(
+                SiteFeature.site_id,
+                func.max(SiteFeature.timestamp).label("timestamp")
+            )
+            .group_by(SiteFeature.site_id)
+            .subquery()
+        )
+        latest_prediction = (
+            db.query(
+                Prediction.site_id,
+                func.max(Prediction.timestamp).label("timestamp")
+            )
+            .group_by(Prediction.site_id)
+            .subquery()
+        )
+        rows = (
+            db.query(
+                Site.id, Site.name, SiteFeature.rain_1h_mm, SiteFeature.max_magnitude_72h,
+                Prediction.risk_level
+            )
+            .outerjoin(latest, latest.c.site_id == Site.id)
+            .outerjoin(
+                SiteFeature,
+                (SiteFeature.site_id == latest.c.site_id)
+                & (SiteFeature.timestamp == latest.c.timestamp)
+            )
+            .outerjoin(latest_prediction, latest_prediction.c.site_id == Site.id)
+            .outerjoin(
+                Prediction,
+                (Prediction.site_id == latest_prediction.c.site_id)
+                & (Prediction.timestamp == latest_prediction.c.timestamp)
+            )
+            .filter(Site.is_active == True)
+            .all()
+        )
+
+    sites = {}
+    for row in rows:
+        observations = {
+            "risk_level": row.risk_level,
+            "rain_1h_mm": row.rain_1h_mm,
+            "max_magnitude_72h": row.max_magnitude_72h
+        }
+        # Predictions sharing the latest timestamp give one row each
+        current = sites.get(str(row.id))
+        if current is not None and RISK_RANK.get(current[2]["risk_level"], -1) >= RISK_RANK.get(row.risk_level, -1):
+            continue
+        sites[str(row.id)] = (str(row.id), row.name, observations)
+
+    return [
+        (site_id, name, observations if any(value is not None for value in observations.values()) else None)
+        for site_id, name, observations in sites.values()
+    ]
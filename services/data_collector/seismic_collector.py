@@ -5,7 +5,8 @@ import pandas as pd
 import numpy as np
 from services.common.config import get_settings
 from services.common.database import get_db
-from services.common.models import Site, SiteFeature
+from services.common.models import Site
+from services.data_collector.feature_store import upsert_site_features
 from obspy.clients.fdsn import Client
 from obspy import UTCDateTime
 
@@ -112,13 +113,13 @@ class SeismicCollector:
     def update_site_features(self, site_id: str, seismic_features: Dict[str, float]):
         """Update site features with seismic data"""
         with get_db() as db:
-            feature = SiteFeature(
-                site_id=site_id,
-                timestamp=datetime.now(timezone.utc),
-                **seismic_features
+            upsert_site_features(
+                db,
+                site_id,
+                datetime.now(timezone.utc),
+                seismic_features,
+                source="iris"
             )
-            
-            db.add(feature)
             db.commit()
 
     def collect_all_sites(self):
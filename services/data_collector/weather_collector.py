@@ -5,7 +5,8 @@ from typing import Dict, Any, List
 import pandas as pd
 from services.common.config import get_settings
 from services.common.database import get_db
-from services.common.models import Site, SiteFeature
+from services.common.models import Site
+from services.data_collector.feature_store import upsert_site_features
 from influxdb_client import InfluxDBClient, Point
 from influxdb_client.client.write_api import SYNCHRONOUS
 
@@ -114,21 +115,23 @@ class WeatherCollector:
             # Create antecedent precipitation index (API)
             api_value = rain_24h * 0.5 + rain_72h * 0.3  # Simple weighted sum
             
-            # Create feature record
-            feature = SiteFeature(
-                site_id=site_id,
-                timestamp=datetime.now(timezone.utc),
-                rain_1h_mm=weather_data["rain_1h_mm"],
-                rain_24h_mm=rain_24h,
-                rain_72h_mm=rain_72h,
-                api_value=api_value,
-                temperature_c=weather_data["temperature_c"],
-                temp_change_6h_c=temp_change_6h,
-                temp_change_24h_c=temp_change_24h,
-                humidity_pct=weather_data["humidity_pct"]
+            # Merge into the feature row for the current bucket
+            upsert_site_features(
+                db,
+                site_id,
+                datetime.now(timezone.utc),
+                {
+                    "rain_1h_mm": weather_data["rain_1h_mm"],
+                    "rain_24h_mm": rain_24h,
+                    "rain_72h_mm": rain_72h,
+                    "api_value": api_value,
+                    "temperature_c": weather_data["temperature_c"],
+                    "temp_change_6h_c": temp_change_6h,
+                    "temp_change_24h_c": temp_change_24h,
+                    "humidity_pct": weather_data["humidity_pct"]
+                },
+                source="openweathermap"
             )
-            
-            db.add(feature)
             db.commit()
 
     def collect_all_sites(self):
@@ -0,0 +1,118 @@
+import argparse
+import logging
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, List
+from sqlalchemy import select, func
+from services.common.database import engine
+from services.common.models import Site, SiteFeature
+from services.database_service.partition_manager import ensure_partitions, month_start, add_months
+
+logger = logging.getLogger(__name__)
+
+sites = Site.__table__
+site_features = SiteFeature.__table__
+
+
+def seed_month(conn, site_ids: List[str], month_start_at: datetime, interval_minutes: int):
+    """Insert one month of synthetic feature rows for every site"""
+    month_end = datetime.combine(add_months(month_start_at.date(), 1), datetime.min.time())
+    timestamps = []
+    ts = month_start_at
+    while ts < month_end:
+        timestamps.append(ts)
+        ts += timedelta(minutes=interval_minutes)
+
+    for site_id in site_ids:
+        conn.execute(site_features.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "site_id": site_id,
+                "timestamp": ts,
+                "rain_1h_mm": 1.0,
+                "humidity_pct": 60.0,
+                "source": "benchmark"
+            }
+            for ts in timestamps
+        ])
+
+
+def time_query(conn, query: Callable[[], object], repeats: int) -> float:
+    """Median latency of a query in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        conn.execute(query()).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure 'latest' and 'last 72h' feature queries as history grows"
+    )
+    parser.add_argument("--sites", type=int, default=20)
+    parser.add_argument("--months", type=int, default=12, help="Months of history to grow to")
+    parser.add_argument("--interval-minutes", type=int, default=15)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    now = datetime.utcnow()
+    site_ids = [str(uuid.uuid4()) for _ in range(args.sites)]
+    probe_site = site_ids[0]
+
+    with engine.begin() as conn:
+        conn.execute(sites.insert(), [
+            {"id": site_id, "name": f"bench-{i}", "location": "benchmark", "latitude": 0.0, "longitude": 0.0}
+            for i, site_id in enumerate(site_ids)
+        ])
+
+    def latest():
+        return (
+            select(site_features)
+            .where(site_features.c.site_id == probe_site)
+            .order_by(site_features.c.timestamp.desc())
+            .limit(1)
+        )
+
+    def last_72h():
+        return (
+            select(func.count(), func.avg(site_features.c.rain_1h_mm))
+            .where(
+                site_features.c.site_id == probe_site,
+                site_features.c.timestamp >= now - timedelta(hours=72)
+            )
+        )
+
+    print(f"{'months':>6} {'rows':>10} {'latest_ms':>10} {'last72h_ms':>11}")
+
+    # Grow history backwards from the current month, measuring after each month
+    for months_back in range(args.months):
+        month = add_months(month_start(now), -months_back)
+        with engine.begin() as conn:
+            ensure_partitions(conn, "site_features", month, month)
+            seed_month(
+                conn, site_ids,
+                datetime.combine(month, datetime.min.time()),
+                args.interval_minutes
+            )
+
+        with engine.connect() as conn:
+            rows = conn.execute(select(func.count()).select_from(site_features)).scalar()
+            print(
+                f"{months_back + 1:>6} {rows:>10} "
+                f"{time_query(conn, latest, args.repeats):>10.3f} "
+                f"{time_query(conn, last_72h, args.repeats):>11.3f}"
+            )
+
+    with engine.begin() as conn:
+        conn.execute(site_features.delete().where(site_features.c.site_id.in_(site_ids)))
+        conn.execute(sites.delete().where(sites.c.id.in_(site_ids)))
+
+
+if __name__ == "__main__":
+    main()
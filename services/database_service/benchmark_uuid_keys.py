@@ -0,0 +1,131 @@
+import argparse
+import logging
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict
+from sqlalchemy import MetaData, Table, Column, String, DateTime, Float, Index, select, text
+from services.common.database import engine
+from services.common.types import GUID
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+
+def key_table(name: str, key_type) -> Table:
+    return Table(
+        name, metadata,
+        Column("id", key_type, primary_key=True),
+        Column("site_id", key_type, nullable=False),
+        Column("timestamp", DateTime, nullable=False),
+        Column("probability", Float),
+        Index(f"idx_{name}_site_id_timestamp", "site_id", "timestamp")
+    )
+
+
+# Same rows, text keys (before migration 005) vs compact keys (after)
+tables = {
+    "text": key_table("bench_keys_text", String(36)),
+    "uuid": key_table("bench_keys_uuid", GUID)
+}
+
+
+def index_sizes(conn, table: Table) -> Dict[str, int]:
+    """On-disk size in bytes of the primary key and the site_id index"""
+    if conn.dialect.name == "postgresql":
+        return {
+            "pkey": conn.execute(text(f"SELECT pg_relation_size('{table.name}_pkey')")).scalar(),
+            "site_index": conn.execute(
+                text(f"SELECT pg_relation_size('idx_{table.name}_site_id_timestamp')")
+            ).scalar()
+        }
+
+    # SQLite: the dbstat table is not always compiled in, so rebuild each
+    # index and count the pages it adds
+    page_size = conn.execute(text("PRAGMA page_size")).scalar()
+    sizes = {}
+    for label, ddl in (
+        ("pkey", f"CREATE UNIQUE INDEX bench_pkey_copy ON {table.name} (id)"),
+        ("site_index", f"CREATE INDEX bench_site_copy ON {table.name} (site_id, timestamp)")
+    ):
+        before = conn.execute(text("PRAGMA page_count")).scalar()
+        conn.execute(text(ddl))
+        sizes[label] = (conn.execute(text("PRAGMA page_count")).scalar() - before) * page_size
+    conn.execute(text("DROP INDEX bench_pkey_copy"))
+    conn.execute(text("DROP INDEX bench_site_copy"))
+    return sizes
+
+
+def time_query(conn, query, repeats: int) -> float:
+    """Median latency of a query in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        conn.execute(query()).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare index size and lookup latency of text vs native UUID keys"
+    )
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--sites", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    now = datetime.utcnow()
+    site_ids = [str(uuid.uuid4()) for _ in range(args.sites)]
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "site_id": random.choice(site_ids),
+            "timestamp": now - timedelta(minutes=i),
+            "probability": random.random()
+        }
+        for i in range(args.rows)
+    ]
+    probe_ids = [row["id"] for row in random.sample(rows, min(args.repeats, len(rows)))]
+    probe_site = site_ids[0]
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        print(f"{'keys':>5} {'pkey_bytes':>12} {'site_idx_bytes':>15} {'by_id_ms':>9} {'by_site_ms':>11}")
+        for label, table in tables.items():
+            with engine.begin() as conn:
+                for offset in range(0, len(rows), 10000):
+                    conn.execute(table.insert(), rows[offset:offset + 10000])
+
+            with engine.begin() as conn:
+                sizes = index_sizes(conn, table)
+
+            probes = iter(probe_ids * 2)
+            with engine.connect() as conn:
+                by_id = time_query(
+                    conn, lambda: select(table).where(table.c.id == next(probes)), args.repeats
+                )
+                by_site = time_query(
+                    conn,
+                    lambda: (
+                        select(table.c.timestamp, table.c.probability)
+                        .where(
+                            table.c.site_id == probe_site,
+                            table.c.timestamp >= now - timedelta(hours=72)
+                        )
+                    ),
+                    args.repeats
+                )
+            print(f"{label:>5} {sizes['pkey']:>12} {sizes['site_index']:>15} {by_id:>9.3f} {by_site:>11.3f}")
+    finally:
+        metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import logging
+import re
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from services.common.config import get_settings
+from services.common.database import engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Tables range-partitioned by month on Postgres, and their partition key
+PARTITIONED_TABLES = {
+    'site_features': 'timestamp',
+    'predictions': 'timestamp'
+}
+
+# Serializes maintenance runs from several processes (pg_advisory_xact_lock key)
+MAINTENANCE_LOCK_ID = 7301
+
+PARTITION_NAME = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def is_postgres(conn) -> bool:
+    return conn.dialect.name == 'postgresql'
+
+
+def list_partitions(conn, table: str) -> List[str]:
+    """Names of the partitions currently attached to a table"""
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = :table"
+    ), {"table": table}).all()
+    return sorted(row.relname for row in rows)
+
+
+def ensure_default_partition(conn, table: str) -> bool:
+    """
+    Create the table's DEFAULT partition if it is missing. It catches rows
+    no monthly partition covers, e.g. late-arriving history or writes after
+    maintenance stopped running, instead of failing the insert.
+    """
+    if not is_postgres(conn):
+        return False
+
+    name = default_partition_name(table)
+    if name in list_partitions(conn, table):
+        return False
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} DEFAULT"))
+    return True
+
+
+def _create_partition(conn, table: str, name: str, month: date, has_default: bool):
+    bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    key = PARTITIONED_TABLES.get(table, 'timestamp')
+    default = default_partition_name(table)
+    in_range = f"{key} >= '{month.isoformat()}' AND {key} < '{add_months(month, 1).isoformat()}'"
+
+    if not has_default or conn.execute(text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1")).first() is None:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} {bounds}"))
+        return
+
+    # Postgres refuses a new partition while the default one holds rows in
+    # its range: build it standalone, move those rows over, then attach it
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    conn.execute(text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}"))
+    conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"))
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds}"))
+    logger.info(f"Moved {table} rows for {month:%Y-%m} out of {default} into {name}")
+
+
+def ensure_partitions(conn, table: str, first_month: date, last_month: date) -> List[str]:
+    """Create any missing monthly partitions in [first_month, last_month]"""
+    if not is_postgres(conn):
+        return []
+
+    created = []
+    existing = set(list_partitions(conn, table))
+    has_default = default_partition_name(table) in existing
+    month = first_month
+    while month <= last_month:
+        name = partition_name(table, month)
+        if name not in existing:
+            _create_partition(conn, table, name, month, has_default)
+            created.append(name)
+        month = add_months(month, 1)
+
+    return created
+
+
+def detach_expired_partitions(
+    conn,
+    table: str,
+    retain_months: int,
+    archive_schema: str,
+    today: Optional[date] = None
+) -> List[str]:
+    """
+    Detach partitions older than the retention window and move them into
+    the archive schema, where they stay queryable until exported or dropped.
+    """
+    if not is_postgres(conn):
+        return []
+
+    cutoff = add_months(month_start(today or datetime.utcnow().date()), -retain_months)
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+
+    detached = []
+    for name in list_partitions(conn, table):
+        match = PARTITION_NAME.match(name)
+        if not match or match.group("table") != table:
+            continue
+
+        month = date(int(match.group("year")), int(match.group("month")), 1)
+        if month < cutoff:
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+            detached.append(name)
+
+    return detached
+
+
+def maintain_partitions(
+    conn,
+    months_ahead: Optional[int] = None,
+    retain_months: Optional[int] = None
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Create upcoming partitions and archive expired ones for every partitioned
+    table. On SQLite (local development) the tables are plain and this is a
+    no-op; "latest" queries rely on the (site_id, timestamp) index instead.
+    """
+    if not is_postgres(conn):
+        logger.info(f"Partition maintenance skipped on {conn.dialect.name}")
+        return {}
+
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    retain_months = settings.PARTITION_RETAIN_MONTHS if retain_months is None else retain_months
+    this_month = month_start(datetime.utcnow())
+
+    results = {}
+    for table in PARTITIONED_TABLES:
+        ensure_default_partition(conn, table)
+        created = ensure_partitions(conn, table, this_month, add_months(this_month, months_ahead))
+        detached = []
+        if retain_months > 0:
+            detached = detach_expired_partitions(
+                conn, table, retain_months, settings.PARTITION_ARCHIVE_SCHEMA
+            )
+
+        results[table] = {"created": created, "detached": detached}
+        logger.info(f"{table}: created {created or 'no'} partitions, detached {detached or 'none'}")
+
+    return results
+
+
+def run_maintenance(interval_seconds: float, stop: threading.Event):
+    """Run maintain_partitions now and then every `interval_seconds` until `stop` is set"""
+    while not stop.is_set():
+        try:
+            with engine.begin() as conn:
+                maintain_partitions(conn)
+        except Exception as e:
+            # Partitions are created months ahead, so a failed run can wait for the next
+            logger.error(f"Partition maintenance failed: {e}")
+        stop.wait(interval_seconds)
+
+
+def start_maintenance(interval_seconds: Optional[float] = None) -> Optional[threading.Event]:
+    """
+    Run partition maintenance on a daemon thread; returns the event that
+    stops it, or None when PARTITION_MAINTENANCE_INTERVAL_SECONDS is 0.
+    """
+    interval_seconds = settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+    if interval_seconds <= 0:
+        return None
+
+    stop = threading.Event()
+    threading.Thread(
+        target=run_maintenance, args=(interval_seconds, stop), name="partition-maintenance", daemon=True
+    ).start()
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create future partitions and archive expired ones")
+    parser.add_argument("--months-ahead", type=int, default=None)
+    parser.add_argument("--retain-months", type=int, default=None, help="0 keeps every partition attached")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with engine.begin() as conn:
+        maintain_partitions(conn, args.months_ahead, args.retain_months)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from sqlalchemy import JSON, select, exists, or_, and_
+from services.common.config import get_settings
+from services.common.database import engine
+from services.common.metrics import registry
+from services.common.models import Base
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Tables under retention, in the order they are processed: the column that
+# ages a row, rows that must be kept whatever their age, and tables whose
+# rows hold a foreign key to it (a row is kept while any still refer to it)
+RETENTION_TABLES = {
+    "site_features": {"timestamp": "timestamp"},
+    "predictions": {"timestamp": "timestamp"},
+    # Idempotency keys only matter while a request can still be retried
+    "prediction_keys": {"timestamp": "created_at"},
+    "alert_history": {"timestamp": "timestamp"},
+    # Ahead of alerts, which it references; unsent notifications stay
+    "alert_outbox": {"timestamp": "created_at", "keep_statuses": ["pending", "sending"]},
+    # Pending alerts are still owed a delivery attempt
+    "alerts": {"timestamp": "created_at", "keep_statuses": ["pending"], "referenced_by": {"alert_outbox": "alert_id"}}
+}
+
+PARQUET_COMPRESSION = "zstd"
+
+rows_exported = registry.counter(
+    "retention_rows_exported_total",
+    "Rows written to the Parquet archive, by table"
+)
+rows_deleted = registry.counter(
+    "retention_rows_deleted_total",
+    "Rows deleted from hot tables after export, by table"
+)
+export_rate = registry.gauge(
+    "retention_rows_per_second",
+    "Export rate of the last retention run, by table"
+)
+
+
+class RetentionCheckpoint:
+    """Per-table progress file: the current run's cutoff and last archived key, and totals"""
+
+    def __init__(self, checkpoint_dir: Path, table: str):
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.file = checkpoint_dir / f"{table}.json"
+
+    def load(self) -> Dict[str, Any]:
+        if self.file.exists():
+            return json.loads(self.file.read_text())
+        return {"cutoff": None, "last_timestamp": None, "last_id": None, "rows_archived": 0, "complete": True}
+
+    def save(self, state: Dict[str, Any]):
+        tmp = self.file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        tmp.replace(self.file)
+
+
+def archive_path(archive_dir: Path, table: str, month: datetime) -> Path:
+    """Hive-style month directory, so readers can prune by year and month"""
+    return archive_dir / table / f"year={month.year:04d}" / f"month={month.month:02d}"
+
+
+def write_parquet(archive_dir: Path, table: str, df: pd.DataFrame, timestamp_column: str) -> List[Path]:
+    """
+    Write one batch as one file per month. File names derive from the
+    batch's first key, so a batch retried after a crash overwrites its own
+    files instead of duplicating rows.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("pyarrow is required to write the Parquet archive")
+
+    written = []
+    months = df[timestamp_column].dt.to_period("M")
+    for month, part in df.groupby(months):
+        first = part.iloc[0]
+        directory = archive_path(archive_dir, table, month.to_timestamp())
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"part-{first[timestamp_column]:%Y%m%dT%H%M%S%f}-{str(first['id'])[:8]}.parquet"
+
+        # Dot-prefixed while being written, so dataset readers skip it
+        tmp = path.with_name(f".{path.name}")
+        part.to_parquet(tmp, compression=PARQUET_COMPRESSION, index=False)
+        tmp.replace(path)
+        written.append(path)
+
+    return written
+
+
+def archive_table(
+    table_name: str,
+    hot_days: int,
+    archive_dir: Path,
+    checkpoint_dir: Path,
+    batch_size: int,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Export rows older than the hot window to Parquet and delete them, one
+    bounded batch per transaction, oldest first. Each batch is exported
+    before it is deleted and the checkpoint advances after the delete
+    commits, so an interrupted run resumes with its original cutoff from
+    the last archived key.
+    """
+    table = Base.metadata.tables[table_name]
+    policy = RETENTION_TABLES[table_name]
+    ts_column = table.c[policy["timestamp"]]
+
+    checkpoint = RetentionCheckpoint(checkpoint_dir, table_name)
+    state = checkpoint.load()
+    if state["complete"]:
+        cutoff = (now or datetime.utcnow()) - timedelta(days=hot_days)
+        state.update({"cutoff": cutoff.isoformat(), "last_timestamp": None, "last_id": None, "complete": False})
+    else:
+        cutoff = datetime.fromisoformat(state["cutoff"])
+        logger.info(f"{table_name}: resuming interrupted run after {state['last_timestamp']}")
+
+    # JSON columns are archived as JSON text; their shapes vary row to row
+    json_columns = [column.name for column in table.columns if isinstance(column.type, JSON)]
+
+    filters = [ts_column < cutoff]
+    if policy.get("keep_statuses"):
+        filters.append(table.c.status.notin_(policy["keep_statuses"]))
+    for referencing_name, column in policy.get("referenced_by", {}).items():
+        referencing = Base.metadata.tables[referencing_name]
+        filters.append(~exists().where(referencing.c[column] == table.c.id))
+
+    started = time.monotonic()
+    archived = 0
+
+    while True:
+        batch_filters = list(filters)
+        if state["last_timestamp"] is not None:
+            # Start after the last archived key rather than walking the
+            # dead index entries the previous deletes left behind
+            last_ts = datetime.fromisoformat(state["last_timestamp"])
+            batch_filters.append(or_(
+                ts_column > last_ts,
+                and_(ts_column == last_ts, table.c.id > state["last_id"])
+            ))
+
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(table)
+                .where(*batch_filters)
+                .order_by(ts_column, table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            df = pd.DataFrame([row._mapping for row in rows])
+            for column in json_columns:
+                df[column] = df[column].map(lambda value: None if value is None else json.dumps(value))
+            write_parquet(archive_dir, table_name, df, policy["timestamp"])
+            conn.execute(table.delete().where(table.c.id.in_([row.id for row in rows])))
+
+        last = rows[-1]
+        state.update({
+            "last_timestamp": getattr(last, policy["timestamp"]).isoformat(),
+            "last_id": last.id,
+            "rows_archived": state["rows_archived"] + len(rows)
+        })
+        checkpoint.save(state)
+
+        archived += len(rows)
+        rows_exported.inc(len(rows), labels={"table": table_name})
+        rows_deleted.inc(len(rows), labels={"table": table_name})
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"{table_name}: archived {archived} rows up to {state['last_timestamp']} "
+            f"({archived / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+
+    state.update({"last_timestamp": None, "last_id": None, "complete": True})
+    checkpoint.save(state)
+
+    elapsed = time.monotonic() - started
+    rate = archived / elapsed if elapsed and archived else 0.0
+    export_rate.set(rate, labels={"table": table_name})
+
+    return {
+        "table": table_name,
+        "cutoff": cutoff.isoformat(),
+        "rows_archived": archived,
+        "rows_per_second": rate,
+        "total_archived": state["rows_archived"]
+    }
+
+
+def run_retention(
+    tables: Optional[List[str]] = None,
+    batch_size: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+    checkpoint_dir: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Apply the retention policy to every configured table"""
+    archive_dir = Path(archive_dir or settings.RETENTION_ARCHIVE_DIR)
+    checkpoint_dir = Path(checkpoint_dir or settings.RETENTION_CHECKPOINT_DIR)
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+
+    results = []
+    for table_name in tables or list(RETENTION_TABLES):
+        hot_days = settings.RETENTION_HOT_DAYS.get(table_name, 0)
+        if hot_days <= 0:
+            logger.info(f"{table_name}: retention disabled")
+            continue
+
+        result = archive_table(table_name, hot_days, archive_dir, checkpoint_dir, batch_size)
+        logger.info(
+            f"{table_name}: archived {result['rows_archived']} rows older than {result['cutoff']} "
+            f"at {result['rows_per_second']:.0f} rows/s"
+        )
+        results.append(result)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Archive rows older than each table's hot window to Parquet and delete them"
+    )
+    parser.add_argument("--table", action="append", choices=list(RETENTION_TABLES), default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--archive-dir", default=None)
+    parser.add_argument("--checkpoint-dir", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    run_retention(args.table, args.batch_size, args.archive_dir, args.checkpoint_dir)
+
+
+if __name__ == "__main__":
+    main()
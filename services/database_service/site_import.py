@@ -0,0 +1,562 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import math
+import shutil
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from services.common.config import get_settings
+from services.common.database import engine
+from services.common.models import Site, AlertConfig
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+sites = Site.__table__
+alert_configs = AlertConfig.__table__
+
+FORMATS = ("csv", "geojson", "geojsonseq", "gpkg")
+EXTENSIONS = {
+    ".csv": "csv",
+    ".geojson": "geojson",
+    ".json": "geojson",
+    ".geojsonl": "geojsonseq",
+    ".geojsons": "geojsonseq",
+    ".ndjson": "geojsonseq",
+    ".gpkg": "gpkg"
+}
+
+# CSV header aliases for the point columns
+LATITUDE_COLUMNS = ("latitude", "lat", "y")
+LONGITUDE_COLUMNS = ("longitude", "lon", "lng", "long", "x")
+GEOMETRY_COLUMNS = ("wkt", "geometry", "geom")
+
+METERS_PER_DEGREE = 111_320.0
+EARTH_RADIUS_M = 6_371_000.0
+
+# A feature's geometry: a shapely geometry, None when missing, or the
+# reason it could not be parsed
+Geometry = Any
+SourceRow = Tuple[int, Dict[str, Any], Geometry]
+
+
+def detect_format(filename: Optional[str]) -> str:
+    suffix = Path(filename or "").suffix.lower()
+    if suffix not in EXTENSIONS:
+        raise ValueError(f"Cannot tell the format of {filename!r}; pass one of {', '.join(FORMATS)}")
+    return EXTENSIONS[suffix]
+
+
+def _shape(geometry: Optional[Dict[str, Any]]) -> Geometry:
+    from shapely.geometry import shape
+
+    if geometry is None:
+        return None
+    try:
+        return shape(geometry)
+    except Exception as e:
+        return f"unreadable geometry: {e}"
+
+
+class _JSONStream:
+    """Decodes one JSON value at a time from a text stream with a bounded buffer"""
+
+    def __init__(self, stream, chunk_size: int = 1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self.stream.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it; "" at the end"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Malformed GeoJSON: expected {char!r} near offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Incomplete value; read more, unless there is no more
+                if not self._fill():
+                    raise ValueError("Malformed GeoJSON: truncated or invalid value")
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and isinstance(value, (int, float)) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def read_geojson(stream) -> Iterator[SourceRow]:
+    """
+    Features of a GeoJSON FeatureCollection, one at a time. Only the
+    current feature is held in memory, whatever the size of the file.
+    """
+    parser = _JSONStream(stream)
+    parser.expect("{")
+    row_number = 0
+    while True:
+        char = parser.peek()
+        if char == "}" or char == "":
+            return
+        if char == ",":
+            parser.pos += 1
+            continue
+
+        key = parser.value()
+        parser.expect(":")
+        if key != "features":
+            # type, crs, bbox, ...
+            parser.value()
+            continue
+
+        parser.expect("[")
+        while True:
+            char = parser.peek()
+            if char == "]":
+                parser.pos += 1
+                break
+            if char == ",":
+                parser.pos += 1
+                continue
+            feature = parser.value()
+            row_number += 1
+            if not isinstance(feature, dict):
+                yield row_number, {}, "feature is not an object"
+                continue
+            yield row_number, feature.get("properties") or {}, _shape(feature.get("geometry"))
+
+
+def read_geojsonseq(stream) -> Iterator[SourceRow]:
+    """Newline-delimited GeoJSON features (GeoJSONSeq / RFC 8142 text sequences)"""
+    for row_number, line in enumerate(stream, start=1):
+        line = line.strip().lstrip("\x1e")
+        if not line:
+            continue
+        try:
+            feature = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, {}, f"invalid JSON: {e}"
+            continue
+        yield row_number, feature.get("properties") or {}, _shape(feature.get("geometry"))
+
+
+def read_csv(stream) -> Iterator[SourceRow]:
+    """CSV rows with either latitude/longitude columns or a WKT geometry column"""
+    from shapely import wkt
+    from shapely.geometry import Point
+
+    reader = csv.DictReader(stream)
+    # Data rows start on line 2
+    for row_number, row in enumerate(reader, start=2):
+        properties = {
+            key.strip().lower(): value.strip() if isinstance(value, str) else value
+            for key, value in row.items() if key
+        }
+        geometry: Geometry = None
+        try:
+            text = next((properties[c] for c in GEOMETRY_COLUMNS if properties.get(c)), None)
+            if text:
+                geometry = wkt.loads(text)
+            else:
+                lat = next((properties[c] for c in LATITUDE_COLUMNS if properties.get(c)), None)
+                lon = next((properties[c] for c in LONGITUDE_COLUMNS if properties.get(c)), None)
+                if lat is not None and lon is not None:
+                    geometry = Point(float(lon), float(lat))
+        except Exception as e:
+            geometry = f"unreadable geometry: {e}"
+        yield row_number, properties, geometry
+
+
+def read_gpkg(path: str, chunk_size: int) -> Iterator[SourceRow]:
+    """GeoPackage features in chunks of `chunk_size`, reprojected to WGS84"""
+    try:
+        import geopandas
+    except ImportError:
+        raise ImportError("geopandas is required to import GeoPackage files")
+
+    offset = 0
+    while True:
+        frame = geopandas.read_file(path, rows=slice(offset, offset + chunk_size))
+        if frame.empty:
+            return
+        if frame.crs is not None and frame.crs.to_epsg() != 4326:
+            frame = frame.to_crs(4326)
+
+        geometry_column = frame.geometry.name
+        for position, row in enumerate(frame.to_dict("records"), start=offset + 1):
+            geometry = row.pop(geometry_column)
+            yield position, {key.lower(): value for key, value in row.items()}, geometry
+        offset += len(frame)
+
+
+@dataclass
+class SiteRecord:
+    row: int
+    name: str
+    location: str
+    latitude: float
+    longitude: float
+    elevation: Optional[float] = None
+    description: Optional[str] = None
+    threshold: Optional[float] = None
+    email_recipients: Optional[str] = None
+    phone_numbers: Optional[str] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+
+def _text(properties: Dict[str, Any], key: str, max_length: int) -> Optional[str]:
+    value = properties.get(key)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    value = str(value).strip()
+    if len(value) > max_length:
+        raise ValueError(f"{key} is longer than {max_length} characters")
+    return value or None
+
+
+def _number(properties: Dict[str, Any], key: str) -> Optional[float]:
+    value = properties.get(key)
+    if value is None or value == "":
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} is not a number: {value!r}")
+    return None if math.isnan(value) else value
+
+
+def to_site_record(row: int, properties: Dict[str, Any], geometry: Geometry) -> SiteRecord:
+    """Validate one source row; raises ValueError with the reason it was rejected"""
+    from shapely.validation import explain_validity
+
+    if isinstance(geometry, str):
+        raise ValueError(geometry)
+    if geometry is None or geometry.is_empty:
+        raise ValueError("missing geometry")
+
+    if geometry.geom_type == "Point":
+        point = geometry
+    elif geometry.geom_type in ("Polygon", "MultiPolygon"):
+        if not geometry.is_valid:
+            raise ValueError(f"invalid geometry: {explain_validity(geometry)}")
+        # Inside the slope outline even when the outline is concave
+        point = geometry.representative_point()
+    else:
+        raise ValueError(f"unsupported geometry type {geometry.geom_type}")
+
+    longitude, latitude = point.x, point.y
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError(f"coordinates out of range (lon {longitude}, lat {latitude}); expected WGS84 degrees")
+
+    name = _text(properties, "name", 100)
+    if not name:
+        raise ValueError("missing name")
+
+    threshold = _number(properties, "threshold")
+    if threshold is not None and not 0 <= threshold <= 1:
+        raise ValueError(f"threshold must be between 0 and 1, got {threshold}")
+
+    elevation = _number(properties, "elevation")
+    if elevation is None and geometry.geom_type == "Point" and geometry.has_z:
+        elevation = geometry.z
+
+    return SiteRecord(
+        row=row,
+        name=name,
+        location=_text(properties, "location", 100) or "",
+        latitude=latitude,
+        longitude=longitude,
+        elevation=elevation,
+        description=_text(properties, "description", 500),
+        threshold=threshold,
+        email_recipients=_text(properties, "email_recipients", 500),
+        phone_numbers=_text(properties, "phone_numbers", 200)
+    )
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+class ProximityIndex:
+    """Grid of points for "is anything within `radius_m`" lookups"""
+
+    def __init__(self, radius_m: float):
+        self.radius_m = radius_m
+        # Cells are radius_m tall; longitude cells are searched more widely
+        # away from the equator, where a degree of longitude is shorter
+        self.cell = max(radius_m, 1.0) / METERS_PER_DEGREE
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, str]]] = {}
+
+    def _key(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def add(self, lat: float, lon: float, ref: str):
+        self._cells.setdefault(self._key(lat, lon), []).append((lat, lon, ref))
+
+    def find(self, lat: float, lon: float) -> Optional[str]:
+        if self.radius_m <= 0:
+            return None
+        row, col = self._key(lat, lon)
+        lon_span = math.ceil(1 / max(math.cos(math.radians(lat)), 0.01))
+        for r in (row - 1, row, row + 1):
+            for c in range(col - lon_span, col + lon_span + 1):
+                for other_lat, other_lon, ref in self._cells.get((r, c), ()):
+                    if distance_m(lat, lon, other_lat, other_lon) <= self.radius_m:
+                        return ref
+        return None
+
+
+@dataclass
+class ImportSummary:
+    max_reported: int
+    dry_run: bool = False
+    rows_read: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    chunks: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    duplicate_rows: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    # Why reading stopped early; the chunks written before it stay imported
+    error: Optional[str] = None
+
+    def reject(self, row: int, error: str):
+        self.invalid += 1
+        if len(self.errors) < self.max_reported:
+            self.errors.append({"row": row, "error": error})
+
+    def duplicate(self, record: SiteRecord, duplicate_of: str):
+        self.duplicates += 1
+        if len(self.duplicate_rows) < self.max_reported:
+            self.duplicate_rows.append({"row": record.row, "name": record.name, "duplicate_of": duplicate_of})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows_read": self.rows_read,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "chunks": self.chunks,
+            "dry_run": self.dry_run,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "errors": self.errors,
+            "duplicate_rows": self.duplicate_rows,
+            "error": self.error
+        }
+
+
+def _existing_sites(conn, chunk: List[SiteRecord], radius_m: float) -> ProximityIndex:
+    """Existing sites around a chunk's bounding box"""
+    margin = radius_m / METERS_PER_DEGREE
+    max_abs_lat = max(abs(record.latitude) for record in chunk)
+    lon_margin = margin / max(math.cos(math.radians(min(max_abs_lat + margin, 89.9))), 0.01)
+
+    index = ProximityIndex(radius_m)
+    rows = conn.execute(
+        select(sites.c.id, sites.c.latitude, sites.c.longitude).where(
+            sites.c.latitude.between(
+                min(record.latitude for record in chunk) - margin,
+                max(record.latitude for record in chunk) + margin
+            ),
+            sites.c.longitude.between(
+                min(record.longitude for record in chunk) - lon_margin,
+                max(record.longitude for record in chunk) + lon_margin
+            )
+        )
+    )
+    for site_id, latitude, longitude in rows:
+        index.add(latitude, longitude, str(site_id))
+    return index
+
+
+def _write_chunk(chunk: List[SiteRecord], imported: ProximityIndex, summary: ImportSummary, radius_m: float):
+    with engine.begin() as conn:
+        existing = _existing_sites(conn, chunk, radius_m) if radius_m > 0 else ProximityIndex(0)
+
+        new_sites = []
+        for record in chunk:
+            match = existing.find(record.latitude, record.longitude) or imported.find(record.latitude, record.longitude)
+            if match:
+                summary.duplicate(record, match)
+                continue
+            imported.add(record.latitude, record.longitude, f"row {record.row}")
+            new_sites.append(record)
+
+        if new_sites and not summary.dry_run:
+            conn.execute(sites.insert(), [
+                {
+                    "id": record.id,
+                    "name": record.name,
+                    "location": record.location,
+                    "latitude": record.latitude,
+                    "longitude": record.longitude,
+                    "elevation": record.elevation,
+                    "description": record.description,
+                    "is_active": True
+                }
+                for record in new_sites
+            ])
+            conn.execute(alert_configs.insert(), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "site_id": record.id,
+                    "threshold": record.threshold if record.threshold is not None else 0.7,
+                    "email_enabled": bool(record.email_recipients),
+                    "email_recipients": record.email_recipients,
+                    "sms_enabled": bool(record.phone_numbers),
+                    "phone_numbers": record.phone_numbers
+                }
+                for record in new_sites
+            ])
+
+    summary.created += len(new_sites)
+    summary.chunks += 1
+
+
+def import_sites(
+    rows: Iterator[SourceRow],
+    chunk_size: Optional[int] = None,
+    dedupe_meters: Optional[float] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Validate source rows and insert new sites, with their alert configs,
+    one bulk insert per chunk in its own transaction. A row within
+    `dedupe_meters` of an existing site, or of a site created earlier in
+    the same import, is skipped as a duplicate. Memory holds one chunk plus
+    the coordinates of the sites created so far.
+
+    If the source turns out to be structurally unreadable (ValueError from
+    the reader) before the first chunk is written, the error propagates and
+    nothing is imported. Later, the rows read up to that point are still
+    written and the summary reports the error instead.
+    """
+    chunk_size = chunk_size or settings.SITE_IMPORT_CHUNK_SIZE
+    radius_m = settings.SITE_IMPORT_DEDUPE_METERS if dedupe_meters is None else dedupe_meters
+    summary = ImportSummary(max_reported=settings.SITE_IMPORT_MAX_REPORTED_ERRORS, dry_run=dry_run)
+    imported = ProximityIndex(radius_m)
+    started = time.monotonic()
+
+    chunk: List[SiteRecord] = []
+    rows = iter(rows)
+    while True:
+        try:
+            row, properties, geometry = next(rows)
+        except StopIteration:
+            break
+        except ValueError as e:
+            if not summary.chunks:
+                raise
+            # Rows read so far are complete and stay in the import
+            summary.error = f"Stopped after row {summary.rows_read}: {e}"
+            logger.warning(f"Site import: {summary.error}")
+            break
+
+        summary.rows_read += 1
+        try:
+            chunk.append(to_site_record(row, properties, geometry))
+        except ValueError as e:
+            summary.reject(row, str(e))
+            continue
+
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, imported, summary, radius_m)
+            chunk = []
+            logger.info(f"Site import: {summary.rows_read} rows read, {summary.created} sites created")
+
+    if chunk:
+        _write_chunk(chunk, imported, summary, radius_m)
+
+    summary.elapsed_seconds = time.monotonic() - started
+    return summary.as_dict()
+
+
+def read_rows(stream: BinaryIO, fmt: str, chunk_size: int) -> Iterator[SourceRow]:
+    """Source rows from a binary stream in any supported format"""
+    if fmt == "gpkg":
+        # GDAL reads GeoPackages from a file path
+        with tempfile.NamedTemporaryFile(suffix=".gpkg") as tmp:
+            shutil.copyfileobj(stream, tmp)
+            tmp.flush()
+            yield from read_gpkg(tmp.name, chunk_size)
+        return
+
+    readers = {"csv": read_csv, "geojson": read_geojson, "geojsonseq": read_geojsonseq}
+    if fmt not in readers:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        yield from readers[fmt](text)
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+def import_file(
+    stream: BinaryIO,
+    fmt: str,
+    chunk_size: Optional[int] = None,
+    dedupe_meters: Optional[float] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    chunk_size = chunk_size or settings.SITE_IMPORT_CHUNK_SIZE
+    return import_sites(read_rows(stream, fmt, chunk_size), chunk_size, dedupe_meters, dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk-create sites and their alert configs from a GeoJSON, GeoPackage or CSV file"
+    )
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--dedupe-meters", type=float, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="Validate and deduplicate without inserting")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    fmt = args.format or detect_format(args.path)
+    with open(args.path, "rb") as stream:
+        summary = import_file(stream, fmt, args.chunk_size, args.dedupe_meters, args.dry_run)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
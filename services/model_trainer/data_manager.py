@@ -1,18 +1,23 @@
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional
+from datetime import datetime
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-import torch
-from torch.utils.data import Dataset, DataLoader
 import logging
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-class RockfallDataset(Dataset):
-    """Dataset class for Hugging Face models"""
+class RockfallDataset:
+    """
+    Map-style dataset for Hugging Face models. DataLoader only needs
+    __len__ and __getitem__, so this does not subclass torch's Dataset and
+    torch is imported only when a text dataset is built.
+    """
     def __init__(self, texts: List[str], labels: List[int]):
+        import torch
+
         self.texts = texts
         self.labels = torch.tensor(labels, dtype=torch.long)
 
@@ -29,6 +34,7 @@ class DataManager:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.data_dir = Path(config.get('data_dir', 'data'))
+        self.archive_dir = Path(config.get('archive_dir', 'archive'))
         self.feature_columns = config.get('feature_columns', [])
         self.target_column = config.get('target_column', 'incident_48h')
         self.text_column = config.get('text_column', None)
@@ -36,9 +42,16 @@ class DataManager:
 
     def load_data(self) -> Tuple[pd.DataFrame, pd.Series]:
         """Load and preprocess the dataset"""
-        # Load data from CSV or other sources
-        data_path = self.data_dir / self.config['data_file']
-        df = pd.read_csv(data_path)
+        # Load data from CSV, or from the retention job's Parquet archive
+        if 'archive_table' in self.config:
+            df = self.load_archive(
+                self.config['archive_table'],
+                start=self.config.get('archive_start'),
+                end=self.config.get('archive_end')
+            )
+        else:
+            data_path = self.data_dir / self.config['data_file']
+            df = pd.read_csv(data_path)
         
         # Handle missing values
         df = self._handle_missing_values(df)
@@ -49,6 +62,33 @@ class DataManager:
         
         return X, y
 
+    def load_archive(
+        self,
+        table: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[List[str]] = None,
+        timestamp_column: str = 'timestamp'
+    ) -> pd.DataFrame:
+        """Load rows archived by services.database_service.retention, optionally within [start, end)"""
+        path = self.archive_dir / table
+        if not path.exists():
+            return pd.DataFrame(columns=columns or [])
+
+        # year= directories prune whole years; the timestamp filter uses
+        # Parquet row-group statistics within the remaining files
+        filters = []
+        if start is not None:
+            start = pd.Timestamp(start)
+            filters += [('year', '>=', start.year), (timestamp_column, '>=', start)]
+        if end is not None:
+            end = pd.Timestamp(end)
+            filters += [('year', '<=', end.year), (timestamp_column, '<', end)]
+
+        df = pd.read_parquet(path, columns=columns, filters=filters or None)
+        df = df.drop(columns=[col for col in ('year', 'month') if col in df.columns])
+        return df.sort_values(timestamp_column).reset_index(drop=True) if timestamp_column in df.columns else df
+
     def prepare_data(self, model_type: str = 'custom') -> Dict[str, Any]:
         """Prepare data for training"""
         X, y = self.load_data()
@@ -80,6 +120,8 @@ class DataManager:
             train_texts = self._create_text_features(X_train)
             test_texts = self._create_text_features(X_test)
             
+            from torch.utils.data import DataLoader
+
             # Create dataloaders
             train_dataset = RockfallDataset(train_texts, y_train.tolist())
             test_dataset = RockfallDataset(test_texts, y_test.tolist())
@@ -1,9 +1,4 @@
 from typing import Dict, Any, Optional, Union
-import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-from sklearn.ensemble import RandomForestClassifier
-import pytorch_lightning as pl
-import wandb
 from pathlib import Path
 import joblib
 import uuid
@@ -54,6 +49,8 @@ class CustomRockfallModel(BaseModel):
         self.model_path = path
 
     def train(self, train_data: Any, valid_data: Any):
+        from sklearn.ensemble import RandomForestClassifier
+
         self.model = RandomForestClassifier(**self.config.get('model_params', {}))
         self.model.fit(train_data[0], train_data[1])
 
@@ -62,6 +59,9 @@ class CustomRockfallModel(BaseModel):
         return {'probability': float(proba[1])}
 
 class HuggingFaceModel(BaseModel):
+    # torch, transformers, pytorch_lightning and wandb take seconds to import,
+    # so they are imported by the methods that use them rather than at module
+    # level, where every service that touches the factory would pay for them
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.model_name = config['model_name']
@@ -74,11 +74,17 @@ class HuggingFaceModel(BaseModel):
         self.model_path = path
 
     def load(self, path: str):
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
         self.model = AutoModelForSequenceClassification.from_pretrained(path)
         self.tokenizer = AutoTokenizer.from_pretrained(path)
         self.model_path = path
 
     def train(self, train_data: Any, valid_data: Any):
+        import torch
+        import pytorch_lightning as pl
+        import wandb
+
         # Initialize wandb for experiment tracking
         wandb.init(project="rockfall-prediction", config=self.config)
         
@@ -92,6 +98,8 @@ class HuggingFaceModel(BaseModel):
         wandb.finish()
 
     def predict(self, features: Any) -> Dict[str, float]:
+        import torch
+
         inputs = self.tokenizer(features, return_tensors="pt", padding=True, truncation=True)
         with torch.no_grad():
             outputs = self.model(**inputs)
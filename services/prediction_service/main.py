@@ -1,11 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import uvicorn
 from datetime import datetime
+from typing import Optional
+from uuid import UUID
 import logging
 
-from services.common.database import get_db
+from services.common.database import get_read_session
 from services.common.models import Site, SiteFeature
+from services.prediction_service.predictor import get_prediction_service
 
 app = FastAPI(
     title="Rockfall Prediction Service",
@@ -55,7 +59,7 @@ async def root():
     return {"message": "Rockfall Prediction Service"}
 
 @app.get("/predict/{site_id}")
-async def predict(site_id: str, db: Session = Depends(get_db)):
+async def predict(site_id: str, db: Session = Depends(get_read_session)):
     """Make prediction for a site"""
     # Get site
     site = db.query(Site).filter(Site.id == site_id).first()
@@ -88,6 +92,23 @@ async def predict(site_id: str, db: Session = Depends(get_db)):
         }
     }
 
+@app.post("/sites/{site_id}/predict")
+async def create_prediction(site_id: UUID, idempotency_key: Optional[UUID] = Header(None)):
+    """
+    Score a site with the active model and store the prediction. Retries
+    and hedged requests from the gateway repeat the Idempotency-Key, which
+    becomes the prediction id, so they return the stored prediction.
+    """
+    try:
+        return await run_in_threadpool(
+            get_prediction_service().predict,
+            str(site_id),
+            str(idempotency_key) if idempotency_key else None
+        )
+    except ValueError as e:
+        # No active model or no features for the site
+        raise HTTPException(status_code=422, detail=str(e))
+
 def main():
     uvicorn.run(app, host="0.0.0.0", port=8001)
 
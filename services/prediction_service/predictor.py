@@ -1,8 +1,16 @@
-from datetime import datetime, timedelta
-from typing import Dict, Any
-import numpy as np
-from services.common.database import get_db
-from services.common.models import SiteFeature
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+import threading
+import uuid
+from sqlalchemy import desc
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from services.common.config import get_settings
+from services.common.database import get_db, dialect_name
+from services.common.logging import setup_logging
+from services.common.models import SiteFeature, Site, Model, Prediction, PredictionKey
+from services.common.rollups import record_predictions
+from services.common.pubsub import prediction_hub
 import logging
 
 logger = logging.getLogger(__name__)
@@ -98,6 +106,7 @@ class PredictionService:
     def __init__(self):
         self.model = None
         self.model_version = None
+        self.model_id = None
         self.feature_columns = None
         self._load_latest_model()
     
@@ -112,11 +121,15 @@ class PredictionService:
                 raise ValueError("No active model found")
             
             if (self.model_version != model_record.version):
+                # joblib (and the sklearn classes it unpickles) load with the first model
+                import joblib
+
                 logger.info(f"Loading model version: {model_record.version}")
                 model_artifacts = joblib.load(model_record.file_path)
                 self.model = model_artifacts["pipeline"]
                 self.feature_columns = model_artifacts["feature_columns"]
                 self.model_version = model_record.version
+                self.model_id = model_record.id
     
     def get_latest_features(self, site_id: str, db) -> Optional[Dict[str, Any]]:
         """Get the latest feature vector for a site"""
@@ -136,13 +149,64 @@ class PredictionService:
         
         return features
     
-    def predict(self, site_id: str) -> Dict[str, Any]:
-        """Generate prediction for a site"""
+    def _existing_prediction(self, db, prediction_id: str) -> Optional[Dict[str, Any]]:
+        row = db.query(Prediction, Model.version).outerjoin(
+            Model, Model.id == Prediction.model_id
+        ).filter(Prediction.id == prediction_id).first()
+        if row is None:
+            return None
+        prediction, model_version = row
+        return {
+            "id": str(prediction.id),
+            "timestamp": prediction.timestamp,
+            "probability": prediction.probability,
+            "risk_level": prediction.risk_level,
+            "model_version": model_version
+        }
+    
+    def _claim_prediction_id(self, db, prediction_id: str) -> bool:
+        """
+        Insert the id into prediction_keys in the caller's transaction; False
+        if it is already there. A concurrent claim of the same id waits for
+        the first transaction and then loses to it if that one commits.
+        """
+        dialect = dialect_name(db)
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            result = db.execute(
+                insert(PredictionKey.__table__).values(id=prediction_id, created_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=["id"])
+            )
+            return result.rowcount == 1
+
+        try:
+            with db.begin_nested():
+                db.add(PredictionKey(id=prediction_id))
+        except IntegrityError:
+            return False
+        return True
+    
+    def predict(self, site_id: str, prediction_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate prediction for a site. A caller-chosen `prediction_id` makes
+        the call idempotent: the id is claimed in prediction_keys first, and
+        a repeated or concurrent id returns the stored prediction without
+        touching the rollups or publishing again.
+        """
         try:
             # Ensure latest model is loaded
             self._load_latest_model()
             
             with get_db() as db:
+                if prediction_id:
+                    existing = self._existing_prediction(db, prediction_id)
+                    if existing:
+                        return existing
+                    if not self._claim_prediction_id(db, prediction_id):
+                        # Another attempt with this id committed first
+                        db.rollback()
+                        return self._existing_prediction(db, prediction_id)
+                
                 # Get features
                 features = self.get_latest_features(site_id, db)
                 if not features:
@@ -163,9 +227,9 @@ class PredictionService:
                 
                 # Record prediction
                 prediction = Prediction(
-                    id=uuid.uuid4(),
+                    id=prediction_id or str(uuid.uuid4()),
                     site_id=site_id,
-                    model_id=uuid.UUID(self.model_version),
+                    model_id=self.model_id,
                     timestamp=datetime.now(timezone.utc),
                     probability=probability,
                     risk_level=risk_level,
@@ -174,8 +238,23 @@ class PredictionService:
                 )
                 
                 db.add(prediction)
+                record_predictions(db, [{
+                    "site_id": site_id,
+                    "timestamp": prediction.timestamp,
+                    "probability": probability,
+                    "risk_level": risk_level
+                }])
                 db.commit()
                 
+                prediction_hub.publish({
+                    "prediction_id": prediction.id,
+                    "site_id": str(site_id),
+                    "timestamp": prediction.timestamp.isoformat(),
+                    "probability": probability,
+                    "risk_level": risk_level,
+                    "model_version": self.model_version
+                })
+                
                 return {
                     "id": str(prediction.id),
                     "timestamp": prediction.timestamp,
@@ -209,6 +288,18 @@ class PredictionService:
                     logger.error(f"Failed to generate prediction for site {site.name}", 
                                extra={"site_id": site.id, "error": str(e)})
 
+_service: Optional[PredictionService] = None
+_service_lock = threading.Lock()
+
+def get_prediction_service() -> PredictionService:
+    """Process-wide PredictionService, created (and the model loaded) on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PredictionService()
+    return _service
+
 def main():
     # Example usage
     service = PredictionService()
@@ -0,0 +1,109 @@
+# Rate limiting, bounded queueing and load shedding for on-demand predictions
+import asyncio
+
+import pytest
+
+from services.api_gateway.admission import ConcurrencyLimiter, LocalBucketStore, Rejected
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    clock = FakeClock()
+    store = LocalBucketStore(clock=clock)
+    assert [store.take("a", 1.0, 3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("a", 1.0, 3) == pytest.approx(1.0)
+    # Buckets are per client
+    assert store.take("b", 1.0, 3) == 0.0
+
+    clock.now = 1.5
+    assert store.take("a", 1.0, 3) == 0.0
+    assert store.take("a", 1.0, 3) == pytest.approx(0.5)
+
+
+def test_least_recent_clients_are_evicted():
+    store = LocalBucketStore(max_clients=2)
+    for client in ("a", "b", "c"):
+        store.take(client, 1.0, 1)
+    assert list(store._buckets) == ["b", "c"]
+
+
+def make_limiter(**overrides):
+    options = dict(limit=1, max_queue=1, queue_timeout=1.0, target_delay=0.05, interval=0.1)
+    options.update(overrides)
+    return ConcurrencyLimiter(**options)
+
+
+def test_slot_is_handed_to_the_queued_request():
+    async def scenario():
+        limiter = make_limiter()
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+
+        limiter.release()
+        await waiter
+        assert limiter.in_flight == 1 and limiter.queue_depth == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_and_queue_timeout_are_rejected():
+    async def scenario():
+        limiter = make_limiter(queue_timeout=0.05)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(Rejected) as full:
+            await limiter.acquire()
+        assert full.value.decision == "queue_full"
+
+        with pytest.raises(Rejected) as timeout:
+            await waiter
+        assert timeout.value.decision == "queue_timeout"
+        assert limiter.queue_depth == 0 and limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_standing_queue_sheds_new_requests_until_it_drains():
+    async def scenario():
+        clock = FakeClock()
+        limiter = make_limiter(max_queue=10, clock=clock)
+        await limiter.acquire()
+
+        # One slow wait in a window that also saw an immediate admission is a burst
+        async def queue_behind(release_at):
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            clock.now = release_at
+            limiter.release()
+            await waiter
+
+        await queue_behind(0.2)
+        assert not limiter.overloaded
+
+        # A whole window in which every admission waited too long is a standing queue
+        await queue_behind(0.35)
+        assert limiter.overloaded
+
+        with pytest.raises(Rejected) as shed:
+            await limiter.acquire()
+        assert shed.value.decision == "shed"
+
+        # Capacity frees up: the next request is admitted without waiting
+        limiter.release()
+        await limiter.acquire()
+        assert not limiter.overloaded
+
+    asyncio.run(scenario())
@@ -0,0 +1,130 @@
+# Bulk alert evaluation against the cached AlertConfig table
+import asyncio
+import uuid
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from services.common.models import Base, Alert, AlertConfig, AlertHistory, AlertOutbox, Site
+from services.alert_manager import evaluator
+from services.alert_manager.evaluator import AlertConfigCache, AlertEvaluator, build_table, evaluate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'evaluator.db'}")
+    Base.metadata.create_all(engine, tables=[
+        Site.__table__, AlertConfig.__table__, Alert.__table__, AlertOutbox.__table__, AlertHistory.__table__
+    ])
+    yield engine
+    engine.dispose()
+
+
+def add_site(engine, name, threshold, emails="ops@example.org", phones=""):
+    with Session(engine) as db:
+        site = Site(id=str(uuid.uuid4()), name=name, location="", latitude=46.0, longitude=7.0)
+        db.add_all([site, AlertConfig(site_id=site.id, threshold=threshold, email_recipients=emails, phone_numbers=phones)])
+        db.commit()
+        return site.id
+
+
+def test_one_comparison_decides_the_whole_batch():
+    table = build_table([
+        ("a", 0.5, True, "ops@example.org", False, ""),
+        ("b", 0.8, True, "ops@example.org", True, "+4100000001"),
+        ("c", 0.3, False, "ops@example.org", True, " , ")
+    ], version=(3, None))
+
+    result = evaluate(table, ["a", "b", "b", "c", "unknown"], [0.5, 0.79, 0.95, 0.9, 1.0])
+    assert result.alert.tolist() == [True, False, True, False, False]
+    assert result.counts() == {"alert": 2, "below_threshold": 1, "no_channels": 1, "no_config": 1}
+    assert evaluate(build_table([], (0, None)), ["a"], [1.0]).counts()["no_config"] == 1
+
+
+def test_the_cached_table_reloads_only_when_its_version_changes(engine):
+    site_id = add_site(engine, "North", 0.7)
+    clock = FakeClock()
+    cache = AlertConfigCache(session_factory=lambda: Session(engine), check_interval=5, clock=clock)
+    table = cache.table()
+    assert table.threshold.tolist() == [0.7]
+
+    with Session(engine) as db:
+        db.execute(select(AlertConfig).where(AlertConfig.site_id == site_id)).scalar_one().threshold = 0.4
+        db.commit()
+
+    # Not checked again until the interval has passed, unless invalidated
+    assert cache.table() is table
+    cache.invalidate()
+    assert cache.table().threshold.tolist() == [0.4]
+
+    # An unchanged version keeps the table; a new config replaces it
+    table = cache.table()
+    clock.now += 5
+    assert cache.table() is table
+    add_site(engine, "South", 0.9)
+    clock.now += 5
+    assert len(cache.table()) == 2
+
+
+def test_bulk_endpoint_queues_only_the_positive_cases(engine, monkeypatch):
+    from services.alert_manager.main import BulkPrediction, process_alerts_bulk
+
+    north = add_site(engine, "North", 0.5)
+    south = add_site(engine, "South", 0.5, emails="", phones="")
+    cache = AlertConfigCache(session_factory=lambda: Session(engine))
+    monkeypatch.setattr(evaluator, "alert_evaluator", AlertEvaluator(cache))
+
+    predictions = [
+        {"site_id": north, "probability": 0.9, "risk_level": "HIGH", "timestamp": "2026-10-19T12:00:00"},
+        {"site_id": north, "probability": 0.2, "risk_level": "LOW", "timestamp": "2026-10-19T12:00:00"},
+        {"site_id": south, "probability": 0.9, "risk_level": "HIGH", "timestamp": "2026-10-19T12:00:00"},
+        {"site_id": str(uuid.uuid4()), "probability": 0.9, "risk_level": "HIGH", "timestamp": "2026-10-19T12:00:00"}
+    ]
+    with Session(engine) as db:
+        result = asyncio.run(process_alerts_bulk([BulkPrediction(**item) for item in predictions], db=db))
+
+    assert result == {"evaluated": 4, "queued": 1, "alert": 1, "below_threshold": 1, "no_channels": 1, "no_config": 1}
+    with Session(engine) as db:
+        assert db.execute(select(Alert.site_id, Alert.status)).all() == [(north, "pending")]
+        assert db.execute(select(AlertOutbox.recipient)).scalars().all() == ["ops@example.org"]
+        assert len(db.execute(select(AlertHistory)).all()) == 1
+
+
+def test_bulk_endpoint_rejects_incomplete_items_before_queueing(engine):
+    from fastapi.testclient import TestClient
+    from services.alert_manager.main import app
+    from services.common.database import get_session
+
+    def session():
+        with Session(engine) as db:
+            yield db
+
+    north = add_site(engine, "North", 0.5)
+    app.dependency_overrides[get_session] = session
+    try:
+        client = TestClient(app)
+        complete = {"site_id": north, "probability": 0.9, "risk_level": "HIGH", "timestamp": "2026-10-19T12:00:00Z"}
+        for item in (
+            {key: value for key, value in complete.items() if key != "timestamp"},
+            dict(complete, risk_level="SEVERE"),
+            dict(complete, site_id="not-a-uuid"),
+            dict(complete, probability=1.5)
+        ):
+            assert client.post("/alerts/bulk", json=[complete, item]).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
+
+    with Session(engine) as db:
+        assert db.execute(select(Alert)).all() == []
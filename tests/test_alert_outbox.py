@@ -0,0 +1,220 @@
+# Alert notification outbox and dispatcher, with fake channels
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from services.common.models import Base, Alert, AlertConfig, AlertOutbox, Site
+from services.alert_manager.outbox import (
+    ChannelPolicy, OutboxDispatcher, PermanentDeliveryError, digest_sends_saved, enqueue_notifications
+)
+
+MESSAGES = {"email_subject": "Rockfall alert", "email_body": "HIGH risk", "sms_body": "ALERT: HIGH risk"}
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self):
+        return self.now
+
+
+class FakeChannel:
+    """Records deliveries; `failures` are raised, in order, before it starts succeeding"""
+
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.sent = []
+        self.messages = []
+        self.active = 0
+        self.max_active = 0
+
+    async def send(self, recipient, subject, body):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                raise self.failures.pop(0)
+            self.sent.append(recipient)
+            self.messages.append((recipient, subject, body))
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(engine, tables=[
+        Site.__table__, AlertConfig.__table__, Alert.__table__, AlertOutbox.__table__
+    ])
+    yield engine
+    engine.dispose()
+
+
+def queue_alert(engine, emails="a@example.org, b@example.org", phones="+4100000001,+4100000002", risk_level="HIGH", window=0.0, name="Test Site"):
+    with Session(engine) as db:
+        site = Site(id=str(uuid.uuid4()), name=name, location="", latitude=46.0, longitude=7.0)
+        config = AlertConfig(site_id=site.id, email_recipients=emails, phone_numbers=phones)
+        alert = Alert(site_id=site.id, risk_level=risk_level, status="pending", created_at=NOW)
+        db.add_all([site, config, alert])
+        db.flush()
+        messages = dict(MESSAGES, email_subject=f"{risk_level} risk at {name}", summary=f"{risk_level} at {name}")
+        alert.channels = enqueue_notifications(db, alert, config, messages, window=window)
+        db.commit()
+        return alert.id
+
+
+def make_dispatcher(engine, clock, email=None, sms=None, max_attempts=3, concurrency=4):
+    return OutboxDispatcher(
+        channels={"email": email or FakeChannel(), "sms": sms or FakeChannel()},
+        policies={
+            name: ChannelPolicy(concurrency=concurrency, max_attempts=max_attempts, backoff=10, max_backoff=60, timeout=5)
+            for name in ("email", "sms")
+        },
+        session_factory=lambda: Session(engine),
+        batch_size=10,
+        lease=60,
+        clock=clock
+    )
+
+
+def alert_status(engine, alert_id):
+    with Session(engine) as db:
+        alert = db.get(Alert, alert_id)
+        return alert.status, alert.error_message
+
+
+def outbox_rows(engine):
+    with Session(engine) as db:
+        return db.execute(select(AlertOutbox.channel, AlertOutbox.status, AlertOutbox.attempts)).all()
+
+
+def test_one_email_and_one_sms_per_number_are_delivered(engine):
+    alert_id = queue_alert(engine)
+    email, sms = FakeChannel(), FakeChannel()
+    dispatcher = make_dispatcher(engine, FakeClock(), email, sms)
+
+    assert asyncio.run(dispatcher.dispatch_once()) == 3
+    assert email.sent == ["a@example.org, b@example.org"]
+    assert sorted(sms.sent) == ["+4100000001", "+4100000002"]
+    assert alert_status(engine, alert_id) == ("sent", None)
+    assert asyncio.run(dispatcher.dispatch_once()) == 0
+
+
+def test_transient_failures_back_off_and_retry(engine):
+    alert_id = queue_alert(engine, phones="")
+    clock = FakeClock()
+    email = FakeChannel(failures=[ConnectionError("smtp down")])
+    dispatcher = make_dispatcher(engine, clock, email)
+
+    asyncio.run(dispatcher.dispatch_once())
+    assert outbox_rows(engine) == [("email", "pending", 1)]
+    assert alert_status(engine, alert_id)[0] == "pending"
+
+    # Not due until the backoff (5 to 10 s for the first retry) has passed
+    assert asyncio.run(dispatcher.dispatch_once()) == 0
+    clock.now += timedelta(seconds=10)
+    assert asyncio.run(dispatcher.dispatch_once()) == 1
+    assert outbox_rows(engine) == [("email", "sent", 2)]
+    assert alert_status(engine, alert_id) == ("sent", None)
+
+
+def test_permanent_and_exhausted_failures_mark_the_alert_as_error(engine):
+    alert_id = queue_alert(engine)
+    clock = FakeClock()
+    email = FakeChannel(failures=[PermanentDeliveryError("mailbox unknown")])
+    sms = FakeChannel(failures=[TimeoutError()] * 2)
+    dispatcher = make_dispatcher(engine, clock, email, sms, max_attempts=1)
+
+    asyncio.run(dispatcher.dispatch_once())
+    assert sorted(outbox_rows(engine)) == [("email", "failed", 1), ("sms", "failed", 1), ("sms", "failed", 1)]
+    assert alert_status(engine, alert_id) == ("error", "3 of 3 notifications failed")
+
+
+def test_expired_claims_are_redelivered_once(engine):
+    queue_alert(engine, phones="")
+    clock = FakeClock()
+    dispatcher = make_dispatcher(engine, clock)
+
+    # A dispatcher claims the row and dies before recording the outcome
+    [claimed] = dispatcher.claim()
+    assert dispatcher.claim() == []
+
+    clock.now += timedelta(seconds=61)
+    [reclaimed] = dispatcher.claim()
+    assert reclaimed["attempts"] == 2
+
+    # The first dispatcher's late outcome no longer applies
+    dispatcher.record([{"id": claimed["id"], "alert_id": claimed["alert_id"], "attempts": 1, "status": "failed"}])
+    assert outbox_rows(engine) == [("email", "sending", 2)]
+
+
+def test_channel_concurrency_is_bounded(engine):
+    queue_alert(engine, emails="", phones=",".join(f"+41000000{i:02d}" for i in range(8)))
+    sms = FakeChannel(delay=0.02)
+    dispatcher = make_dispatcher(engine, FakeClock(), sms=sms, concurrency=2)
+
+    assert asyncio.run(dispatcher.dispatch_once()) == 8
+    assert len(sms.sent) == 8
+    assert sms.max_active == 2
+
+
+def test_alerts_below_high_are_sent_as_one_digest_per_recipient(engine):
+    alert_ids = [queue_alert(engine, risk_level="MEDIUM", window=120, name=f"Site {i}") for i in range(3)]
+    clock = FakeClock()
+    email, sms = FakeChannel(), FakeChannel()
+    dispatcher = make_dispatcher(engine, clock, email, sms)
+    saved = digest_sends_saved._values.get((("channel", "sms"),), 0)
+
+    assert asyncio.run(dispatcher.dispatch_once()) == 0
+    clock.now += timedelta(seconds=120)
+    assert asyncio.run(dispatcher.dispatch_once()) == 12
+
+    # Both addresses have the same three alerts, so they share one message
+    [(recipient, subject, body)] = email.messages
+    assert recipient == "a@example.org, b@example.org"
+    assert subject == "⚠️ Rockfall Alert digest: 3 alerts"
+    assert all(f"- MEDIUM risk at Site {i}" in body for i in range(3))
+    assert sorted(sms.sent) == ["+4100000001", "+4100000002"]
+    assert "MEDIUM at Site 0; MEDIUM at Site 1; MEDIUM at Site 2" in sms.messages[0][2]
+    assert digest_sends_saved._values[(("channel", "sms"),)] - saved == 4
+    assert all(alert_status(engine, alert_id) == ("sent", None) for alert_id in alert_ids)
+
+
+def test_high_risk_skips_the_digest_window(engine):
+    queue_alert(engine, phones="", risk_level="MEDIUM", window=120)
+    queue_alert(engine, phones="", risk_level="HIGH")
+    email = FakeChannel()
+    dispatcher = make_dispatcher(engine, FakeClock(), email)
+
+    assert asyncio.run(dispatcher.dispatch_once()) == 1
+    assert email.messages == [("a@example.org, b@example.org", "HIGH risk at Test Site", "HIGH risk")]
+
+
+def test_digests_follow_each_recipients_own_alerts(engine):
+    queue_alert(engine, emails="a@example.org, b@example.org", phones="", risk_level="MEDIUM", window=60, name="North")
+    queue_alert(engine, emails="a@example.org", phones="", risk_level="MEDIUM", window=60, name="South")
+    clock = FakeClock()
+    email = FakeChannel(failures=[ConnectionError("smtp down")] * 2)
+    dispatcher = make_dispatcher(engine, clock, email)
+
+    clock.now += timedelta(seconds=60)
+    assert asyncio.run(dispatcher.dispatch_once()) == 3
+    assert email.sent == []
+    assert sorted(outbox_rows(engine)) == [("email", "pending", 1)] * 3
+
+    # Retried rows are coalesced again
+    clock.now += timedelta(seconds=10)
+    assert asyncio.run(dispatcher.dispatch_once()) == 3
+    by_recipient = {recipient: subject for recipient, subject, body in email.messages}
+    assert by_recipient == {
+        "a@example.org": "⚠️ Rockfall Alert digest: 2 alerts",
+        "b@example.org": "MEDIUM risk at North"
+    }
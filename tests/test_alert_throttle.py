@@ -0,0 +1,114 @@
+# In-memory alert throttle index
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from services.common.models import Base, Alert, AlertConfig, AlertOutbox, Site
+from services.alert_manager.outbox import ChannelPolicy, OutboxDispatcher, PermanentDeliveryError, enqueue_notifications
+from services.alert_manager.throttle import LocalThrottleStore, ThrottleIndex, epoch
+
+NOW = datetime(2026, 10, 19, 12, 0)
+WINDOWS = {"HIGH": 30 * 60, "MEDIUM": 120 * 60}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = epoch(NOW)
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'throttle.db'}")
+    Base.metadata.create_all(engine, tables=[
+        Site.__table__, AlertConfig.__table__, Alert.__table__, AlertOutbox.__table__
+    ])
+    yield engine
+    engine.dispose()
+
+
+def make_index(engine, clock):
+    return ThrottleIndex(LocalThrottleStore(clock), WINDOWS, session_factory=lambda: Session(engine), clock=clock)
+
+
+def add_alert(engine, site_id, risk_level, status, minutes_ago):
+    with Session(engine) as db:
+        db.add(Alert(site_id=site_id, risk_level=risk_level, status=status, created_at=NOW - timedelta(minutes=minutes_ago)))
+        db.commit()
+
+
+def test_window_is_reserved_once_and_expires():
+    clock = FakeClock()
+    index = ThrottleIndex(LocalThrottleStore(clock), WINDOWS, session_factory=None, clock=clock)
+    index._warm = True
+
+    assert index.acquire("site", "HIGH", NOW)
+    assert not index.acquire("site", "HIGH", NOW + timedelta(minutes=1))
+    assert index.acquire("site", "MEDIUM", NOW)
+    assert not index.acquire("site", "LOW", NOW) and not index.allows("site", "LOW")
+
+    clock.now += 30 * 60
+    assert index.allows("site", "HIGH") and not index.allows("site", "MEDIUM")
+    assert index.acquire("site", "HIGH", NOW + timedelta(minutes=30))
+
+
+def test_release_only_frees_its_own_reservation():
+    clock = FakeClock()
+    index = ThrottleIndex(LocalThrottleStore(clock), WINDOWS, session_factory=None, clock=clock)
+    index._warm = True
+
+    index.acquire("site", "HIGH", NOW)
+    index.release("site", "HIGH", NOW - timedelta(minutes=5))
+    assert not index.allows("site", "HIGH")
+    index.release("site", "HIGH", NOW)
+    assert index.allows("site", "HIGH")
+
+
+def test_restart_warms_from_pending_and_sent_alerts(engine):
+    a, b, c = (str(uuid.uuid4()) for _ in range(3))
+    add_alert(engine, a, "HIGH", "sent", minutes_ago=10)
+    add_alert(engine, b, "HIGH", "error", minutes_ago=10)
+    add_alert(engine, c, "HIGH", "sent", minutes_ago=45)
+    add_alert(engine, c, "MEDIUM", "pending", minutes_ago=60)
+
+    index = make_index(engine, FakeClock())
+    assert not index.allows(a, "HIGH")
+    assert index.allows(b, "HIGH")
+    assert index.allows(c, "HIGH")
+    assert not index.acquire(c, "MEDIUM", NOW)
+
+
+def test_failed_delivery_gives_the_window_back(engine):
+    clock = FakeClock()
+    index = make_index(engine, clock)
+    site_id = str(uuid.uuid4())
+    assert index.acquire(site_id, "HIGH", NOW)
+
+    with Session(engine) as db:
+        site = Site(id=site_id, name="Test Site", location="", latitude=46.0, longitude=7.0)
+        config = AlertConfig(site_id=site_id, email_recipients="a@example.org", sms_enabled=False)
+        alert = Alert(site_id=site_id, risk_level="HIGH", status="pending", created_at=NOW)
+        db.add_all([site, config, alert])
+        db.flush()
+        enqueue_notifications(db, alert, config, {"email_subject": "s", "email_body": "b", "sms_body": "b"})
+        db.commit()
+
+    class Rejecting:
+        async def send(self, recipient, subject, body):
+            raise PermanentDeliveryError("mailbox unknown")
+
+    dispatcher = OutboxDispatcher(
+        channels={"email": Rejecting()},
+        policies={"email": ChannelPolicy(concurrency=1)},
+        session_factory=lambda: Session(engine),
+        clock=lambda: NOW,
+        throttle=index
+    )
+    asyncio.run(dispatcher.dispatch_once())
+    assert index.allows(site_id, "HIGH")
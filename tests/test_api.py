@@ -1 +1,57 @@
 # Unit tests for API
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from services.api_gateway.main import app
+from services.common.database import get_read_session
+from services.common.models import Base, Alert, Site
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Site.__table__, Alert.__table__])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    def read_session():
+        with Session(engine) as db:
+            yield db
+
+    app.dependency_overrides[get_read_session] = read_session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_site_alerts_are_listed_newest_first(client, engine):
+    site_id = str(uuid.uuid4())
+    now = datetime(2026, 10, 19, 12, 0)
+    with Session(engine) as db:
+        db.add(Site(id=site_id, name="North", location="", latitude=46.0, longitude=7.0))
+        db.add_all([
+            Alert(site_id=site_id, risk_level="HIGH", status=status, channels=["email"], created_at=now - timedelta(minutes=i))
+            for i, status in enumerate(["sent", "error", "sent"])
+        ])
+        db.commit()
+
+    alerts = client.get(f"/api/alerts/sites/{site_id}").json()
+    assert [alert["status"] for alert in alerts] == ["sent", "error", "sent"]
+    assert alerts[0]["channels"] == ["email"] and alerts[0]["site_id"] == site_id
+
+    sent = client.get(f"/api/alerts/sites/{site_id}", params={"status": "sent", "limit": 1}).json()
+    assert len(sent) == 1 and sent[0]["created_at"] == now.isoformat()
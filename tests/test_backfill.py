@@ -0,0 +1,94 @@
+# Historical backfill: chunked loads that resume from their checkpoint
+from datetime import datetime, timedelta
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from sqlalchemy import create_engine, select
+
+from services.common.models import Base, FeatureRollup, Site, SiteFeature
+from services.data_collector import backfill
+
+SITE = "2f1c4a8e-0000-4000-8000-000000000001"
+
+
+def write_archive(path, hours=30):
+    start = datetime(2026, 10, 1)
+    pd.DataFrame({
+        "site_id": [SITE] * hours,
+        "timestamp": [(start + timedelta(hours=hour)).isoformat() for hour in range(hours)],
+        "rain_1h_mm": [float(hour % 4) for hour in range(hours)],
+        "temperature_c": [10.0 + hour / 2 for hour in range(hours)],
+        "humidity_pct": [80.0] * hours
+    }).to_csv(path, index=False)
+    return path
+
+
+def make_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Site.__table__, SiteFeature.__table__, FeatureRollup.__table__])
+    with engine.begin() as conn:
+        conn.execute(Site.__table__.insert().values(id=SITE, name="North", location="", latitude=46.0, longitude=7.0))
+    return engine
+
+
+def stored_features(engine):
+    table = SiteFeature.__table__
+    columns = [table.c.timestamp, table.c.rain_1h_mm, table.c.rain_24h_mm, table.c.rain_72h_mm, table.c.temp_change_6h_c]
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(select(*columns).order_by(table.c.timestamp))]
+
+
+def test_an_interrupted_backfill_resumes_where_it_stopped(tmp_path, monkeypatch):
+    archive = write_archive(tmp_path / "weather.csv")
+
+    # Reference: one uninterrupted run
+    monkeypatch.setattr(backfill, "engine", make_engine(tmp_path / "reference.db"))
+    reference = backfill.backfill_file(str(archive), "weather", 8, str(tmp_path / "reference-checkpoints"), 60)
+    expected = stored_features(backfill.engine)
+
+    engine = make_engine(tmp_path / "resumed.db")
+    monkeypatch.setattr(backfill, "engine", engine)
+    upsert = backfill.bulk_upsert_site_features
+    calls = []
+
+    def failing_upsert(conn, rows, source):
+        calls.append(len(rows))
+        if len(calls) == 3:
+            raise ConnectionError("database went away")
+        return upsert(conn, rows, source)
+
+    monkeypatch.setattr(backfill, "bulk_upsert_site_features", failing_upsert)
+    with pytest.raises(ConnectionError):
+        backfill.backfill_file(str(archive), "weather", 8, str(tmp_path / "checkpoints"), 60)
+
+    checkpoint = backfill.Checkpoint(tmp_path / "checkpoints", archive, "weather")
+    assert checkpoint.load() == {"chunks_done": 2, "rows_loaded": 16, "complete": False}
+
+    # The failed chunk rolled back; the rerun loads only chunks 2 and 3
+    monkeypatch.setattr(backfill, "bulk_upsert_site_features", upsert)
+    state = backfill.backfill_file(str(archive), "weather", 8, str(tmp_path / "checkpoints"), 60)
+    assert state == reference == {"chunks_done": 4, "rows_loaded": 30, "complete": True}
+    # Replayed chunks fed the rolling windows, so derived features match
+    assert stored_features(engine) == expected
+    last = expected[-1]
+    assert last[2] == sum(float(hour % 4) for hour in range(6, 30))
+    assert last[3] == sum(float(hour % 4) for hour in range(30))
+
+    # A completed archive is skipped
+    assert backfill.backfill_file(str(archive), "weather", 8, str(tmp_path / "checkpoints"), 60) == state
+
+
+def test_archives_with_the_same_name_keep_separate_checkpoints(tmp_path):
+    (tmp_path / "2025").mkdir()
+    (tmp_path / "2026").mkdir()
+    first = backfill.Checkpoint(tmp_path / "checkpoints", tmp_path / "2025" / "weather.csv", "weather")
+    second = backfill.Checkpoint(tmp_path / "checkpoints", tmp_path / "2026" / "weather.csv", "weather")
+
+    first.save({"chunks_done": 3, "rows_loaded": 24, "complete": False})
+    assert first.file != second.file
+    assert second.load() == {"chunks_done": 0, "rows_loaded": 0, "complete": False}
+    # The same archive reached through another relative path shares its checkpoint
+    same = backfill.Checkpoint(tmp_path / "checkpoints", tmp_path / "2026" / ".." / "2025" / "weather.csv", "weather")
+    assert same.load()["chunks_done"] == 3
@@ -0,0 +1,102 @@
+# Read/write session routing with two local SQLite files
+import pytest
+from sqlalchemy import create_engine, text
+
+from services.common.database import ReplicaSet, SessionRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_file_engine(path, marker):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE marker (name TEXT)"))
+        conn.execute(text("INSERT INTO marker VALUES (:name)"), {"name": marker})
+    return engine
+
+
+def read_marker(db):
+    return db.execute(text("SELECT name FROM marker")).scalar()
+
+
+@pytest.fixture
+def engines(tmp_path):
+    primary = make_file_engine(tmp_path / "primary.db", "primary")
+    replica = make_file_engine(tmp_path / "replica.db", "replica")
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+def test_read_only_sessions_go_to_the_replica(engines):
+    primary, replica = engines
+    router = SessionRouter(primary, ReplicaSet([replica]))
+
+    with router.session(read_only=True) as db:
+        assert read_marker(db) == "replica"
+    with router.session() as db:
+        assert read_marker(db) == "primary"
+
+
+def test_without_replicas_reads_use_the_primary(engines):
+    primary, _ = engines
+    router = SessionRouter(primary)
+
+    with router.session(read_only=True) as db:
+        assert read_marker(db) == "primary"
+
+
+def test_round_robin_over_replicas(engines, tmp_path):
+    primary, replica = engines
+    second = make_file_engine(tmp_path / "replica2.db", "replica2")
+    router = SessionRouter(primary, ReplicaSet([replica, second]))
+
+    seen = []
+    for _ in range(4):
+        with router.session(read_only=True) as db:
+            seen.append(read_marker(db))
+    assert seen == ["replica", "replica2", "replica", "replica2"]
+    second.dispose()
+
+
+def test_unhealthy_replica_falls_back_to_primary_until_rechecked(engines, tmp_path):
+    primary, _ = engines
+    # The directory does not exist yet, so connecting fails
+    broken_path = tmp_path / "later" / "replica.db"
+    broken = create_engine(f"sqlite:///{broken_path}")
+    clock = FakeClock()
+    router = SessionRouter(primary, ReplicaSet([broken], health_interval=30, clock=clock))
+
+    with router.session(read_only=True) as db:
+        assert read_marker(db) == "primary"
+
+    broken_path.parent.mkdir()
+    make_file_engine(broken_path, "recovered").dispose()
+
+    # Still inside the health-check interval: the cached failure stands
+    clock.now = 10
+    with router.session(read_only=True) as db:
+        assert read_marker(db) == "primary"
+
+    clock.now = 31
+    with router.session(read_only=True) as db:
+        assert read_marker(db) == "recovered"
+    broken.dispose()
+
+
+def test_read_only_sessions_refuse_to_flush(engines):
+    from services.common.models import Site
+
+    primary, replica = engines
+    router = SessionRouter(primary, ReplicaSet([replica]))
+
+    with router.session(read_only=True) as db:
+        db.add(Site(name="x", location="y", latitude=0.0, longitude=0.0))
+        with pytest.raises(RuntimeError):
+            db.flush()
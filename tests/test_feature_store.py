@@ -0,0 +1,83 @@
+# Feature store: bucketing and merging weather and seismic readings per bucket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from services.common.models import Base, FeatureRollup, Site, SiteFeature
+from services.data_collector.feature_store import (
+    MERGED_SOURCE, bucket_timestamp, bulk_upsert_site_features, upsert_site_features
+)
+
+site_features = SiteFeature.__table__
+feature_rollups = FeatureRollup.__table__
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Site.__table__, SiteFeature.__table__, FeatureRollup.__table__])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def site_id(engine):
+    site_id = str(uuid.uuid4())
+    with engine.begin() as conn:
+        conn.execute(Site.__table__.insert().values(id=site_id, name="North", location="", latitude=46.0, longitude=7.0))
+    return site_id
+
+
+def feature_rows(conn, site_id):
+    return conn.execute(
+        select(site_features).where(site_features.c.site_id == site_id).order_by(site_features.c.timestamp)
+    ).all()
+
+
+def test_buckets_are_naive_utc():
+    assert bucket_timestamp(datetime(2026, 10, 19, 12, 7, 59), 5) == datetime(2026, 10, 19, 12, 5)
+    aware = datetime(2026, 10, 19, 14, 7, tzinfo=timezone(timedelta(hours=2)))
+    assert bucket_timestamp(aware, 15) == datetime(2026, 10, 19, 12, 0)
+
+
+def test_sources_merge_into_one_row_per_bucket(engine, site_id):
+    with engine.begin() as conn:
+        upsert_site_features(conn, site_id, datetime(2026, 10, 19, 12, 1), {"rain_1h_mm": 2.0}, source="weather")
+        upsert_site_features(conn, site_id, datetime(2026, 10, 19, 12, 3), {"max_magnitude_72h": 3.5}, source="seismic")
+        upsert_site_features(conn, site_id, datetime(2026, 10, 19, 12, 4), {"rain_1h_mm": 4.0}, source="weather")
+        upsert_site_features(conn, site_id, datetime(2026, 10, 19, 12, 6), {"rain_1h_mm": float("nan")}, source="weather")
+        rows = feature_rows(conn, site_id)
+
+    assert len(rows) == 2
+    merged, later = rows
+    assert merged.timestamp == datetime(2026, 10, 19, 12, 0)
+    # The seismic write kept the rain value and the later weather write replaced it
+    assert (merged.rain_1h_mm, merged.max_magnitude_72h, merged.source) == (4.0, 3.5, MERGED_SOURCE)
+    assert (later.rain_1h_mm, later.source) == (None, "weather")
+
+
+def test_bulk_upsert_merges_into_existing_buckets_and_refreshes_rollups(engine, site_id):
+    hour = datetime(2026, 10, 19, 12, 0)
+    with engine.begin() as conn:
+        upsert_site_features(conn, site_id, hour, {"max_magnitude_72h": 2.0}, source="seismic")
+        count = bulk_upsert_site_features(conn, [
+            {"site_id": site_id, "timestamp": hour, "rain_1h_mm": 1.0},
+            {"site_id": site_id, "timestamp": hour + timedelta(minutes=5), "rain_1h_mm": 3.0}
+        ], source="backfill")
+        # Replaying the same backfill replaces values instead of adding samples
+        bulk_upsert_site_features(conn, [
+            {"site_id": site_id, "timestamp": hour, "rain_1h_mm": 1.0},
+            {"site_id": site_id, "timestamp": hour + timedelta(minutes=5), "rain_1h_mm": 3.0}
+        ], source="backfill")
+        rows = feature_rows(conn, site_id)
+        rain_rollup = conn.execute(select(feature_rollups).where(
+            feature_rollups.c.granularity == "hour", feature_rollups.c.feature == "rain_1h_mm"
+        )).one()
+
+    assert count == 2
+    assert [(row.rain_1h_mm, row.max_magnitude_72h, row.source) for row in rows] == [
+        (1.0, 2.0, MERGED_SOURCE), (3.0, None, "backfill")
+    ]
+    assert (rain_rollup.sample_count, rain_rollup.value_sum, rain_rollup.value_max) == (2, 4.0, 3.0)
@@ -0,0 +1,145 @@
+# Prediction read endpoints: granularity choice, keyset paging, downsampling, response shapes
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from services.api_gateway import cache, history
+from services.api_gateway.cache import LRUBackend, response_cache
+from services.api_gateway.main import app
+from services.api_gateway.schemas import DownsampledPoint, PredictionDetail, PredictionRollup as RollupSchema, PredictionStats
+from services.common import rollups
+from services.common.database import get_read_session
+from services.common.models import Base, Prediction, PredictionRollup, Site
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Site.__table__, Prediction.__table__, PredictionRollup.__table__])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    @contextmanager
+    def get_db(read_only=False):
+        with Session(engine) as db:
+            yield db
+
+    def read_session():
+        with Session(engine) as db:
+            yield db
+
+    monkeypatch.setattr(history, "get_db", get_db)
+    monkeypatch.setattr(cache, "get_db", get_db)
+    monkeypatch.setattr(response_cache, "backend", LRUBackend(100))
+    app.dependency_overrides[get_read_session] = read_session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def site_id(engine):
+    """A site with one prediction an hour over the last 40 days"""
+    site_id = str(uuid.uuid4())
+    rows = [
+        {
+            "id": str(uuid.uuid4()), "site_id": site_id, "timestamp": NOW - timedelta(hours=hours),
+            "probability": (hours % 10) / 10, "risk_level": "HIGH" if hours % 10 >= 7 else "LOW"
+        }
+        for hours in range(40 * 24)
+    ]
+    with engine.begin() as conn:
+        conn.execute(Site.__table__.insert().values(id=site_id, name="North", location="", latitude=46.0, longitude=7.0))
+        conn.execute(Prediction.__table__.insert(), rows)
+        rollups.record_predictions(conn, rows)
+    return site_id
+
+
+def test_aware_bounds_pick_a_granularity_like_naive_ones(client, site_id):
+    start = NOW - timedelta(days=35)
+    naive = client.get(f"/api/predictions/{site_id}/history", params={"start_date": start.isoformat()})
+    aware = client.get(f"/api/predictions/{site_id}/history", params={"start_date": start.isoformat() + "Z"})
+    offset = client.get(
+        f"/api/predictions/{site_id}/history",
+        params={"start_date": (start + timedelta(hours=2)).isoformat() + "+02:00"}
+    )
+
+    assert naive.status_code == aware.status_code == offset.status_code == 200
+    assert {point["granularity"] for point in naive.json()} == {"hour"}
+    assert aware.json() == naive.json() == offset.json()
+
+
+def test_keyset_pages_cover_the_range_once_newest_first(client, engine, site_id):
+    # Predictions sharing a timestamp are ordered by id
+    tied = NOW - timedelta(hours=5, minutes=30)
+    with engine.begin() as conn:
+        conn.execute(Prediction.__table__.insert(), [
+            {"id": str(uuid.uuid4()), "site_id": site_id, "timestamp": tied, "probability": 0.5, "risk_level": "LOW"}
+            for _ in range(3)
+        ])
+
+    start = (NOW - timedelta(hours=12)).isoformat() + "+00:00"
+    seen, cursor = [], None
+    while True:
+        params = {"start_date": start, "granularity": "raw", "limit": 4, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/api/predictions/{site_id}/history", params=params).json()
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    keys = [(item["timestamp"], item["id"]) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert len(set(keys)) == len(keys) == 13 + 3
+    assert set(seen[0]) == set(history.DEFAULT_FIELDS)
+
+
+def test_downsampling_accepts_aware_bounds(client, site_id):
+    start, end = NOW - timedelta(days=2), NOW
+    params = {"start_date": start.isoformat() + "Z", "end_date": end.isoformat() + "Z", "points": 4}
+    response = client.get(f"/api/predictions/{site_id}/history", params=params)
+
+    assert response.status_code == 200
+    points = response.json()
+    assert len(points) == 4
+    assert sum(point["count"] for point in points) == 49
+    assert points[0]["bucket_start"] == start.isoformat()
+
+
+def test_cursors_with_an_offset_are_compared_in_utc():
+    cursor = history.encode_cursor(datetime.fromisoformat("2026-10-19T14:00:00+02:00"), "abc")
+    assert history.decode_cursor(cursor) == (datetime(2026, 10, 19, 12, 0), "abc")
+
+
+def test_cached_read_endpoints_return_their_response_models(client, engine, site_id):
+    with engine.begin() as conn:
+        conn.execute(Prediction.__table__.update().values(features_snapshot={"rain_24h_mm": 3.5}))
+
+    latest = client.get(f"/api/predictions/{site_id}/latest").json()
+    assert set(latest) == set(PredictionDetail.model_fields)
+    assert latest["features_snapshot"] == {"rain_24h_mm": 3.5}
+    PredictionDetail.model_validate(latest)
+
+    stats = client.get(f"/api/predictions/sites/{site_id}/stats", params={"days": 3}).json()
+    assert set(stats) == set(PredictionStats.model_fields)
+    assert stats["period_days"] == 3 and stats["total_predictions"] > 0
+
+    start = (NOW - timedelta(days=10)).isoformat()
+    for granularity in ("hour", "day"):
+        rollup = client.get(
+            f"/api/predictions/{site_id}/history", params={"start_date": start, "granularity": granularity}
+        ).json()
+        assert rollup and all(set(point) == set(RollupSchema.model_fields) for point in rollup)
+
+    points = client.get(f"/api/predictions/{site_id}/history", params={"start_date": start, "points": 3}).json()
+    assert points and all(set(point) == set(DownsampledPoint.model_fields) for point in points)
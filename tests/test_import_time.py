@@ -0,0 +1,56 @@
+# Cold-start budgets: each service entry point, imported in a fresh
+# interpreter with -X importtime, must stay within its budget on top of the
+# shared frameworks and must not pull in heavy ML libraries. Set
+# IMPORT_BUDGET_SCALE to loosen the budgets on slow or shared CI hosts.
+import os
+
+import pytest
+
+from services.common.importtime import (
+    ENTRY_POINTS, FRAMEWORK_MODULES, HEAVY_MODULES, LAZY_IMPORT_MODULES, measure
+)
+
+REPEAT = 3
+BUDGET_SCALE = float(os.getenv("IMPORT_BUDGET_SCALE", "1"))
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return min((measure(*FRAMEWORK_MODULES) for _ in range(REPEAT)), key=lambda profile: profile.total)
+
+
+@pytest.fixture(scope="module", params=sorted(ENTRY_POINTS))
+def entry_point(request, baseline):
+    module, budget = ENTRY_POINTS[request.param]
+    profile = min((measure(*FRAMEWORK_MODULES, module) for _ in range(REPEAT)), key=lambda profile: profile.added(baseline))
+    # A service that fails to import has no cold start to measure; never exempt it
+    if profile.error:
+        pytest.fail(f"{module} cannot be imported: {profile.error}")
+    return module, budget, profile
+
+
+def test_entry_point_does_not_import_heavy_ml_libraries(entry_point):
+    module, _, profile = entry_point
+    heavy = sorted(name for name in profile.loaded if name.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"{module} imports {', '.join(heavy)} at startup"
+
+
+@pytest.mark.parametrize("module", LAZY_IMPORT_MODULES)
+def test_module_defers_heavy_ml_imports(module):
+    profile = measure(module)
+    if profile.error:
+        pytest.skip(f"{module} cannot be imported here: {profile.error}")
+    heavy = sorted(name for name in profile.loaded if name.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"importing {module} loads {', '.join(heavy)}"
+
+
+def test_entry_point_import_time_is_within_budget(entry_point, baseline):
+    module, budget, profile = entry_point
+    overhead = profile.added(baseline)
+    slowest = ", ".join(
+        f"{name} {seconds * 1000:.0f} ms" for name, seconds in profile.slowest(5, exclude=baseline.loaded)
+    )
+    assert overhead <= budget * BUDGET_SCALE, (
+        f"{module} adds {overhead * 1000:.0f} ms of imports "
+        f"(budget {budget * BUDGET_SCALE * 1000:.0f} ms); slowest: {slowest}"
+    )
@@ -1 +1,58 @@
 # Unit tests for models
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from services.common.models import AlertConfig, Base, Site
+from services.common.types import GUID
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Site.__table__, AlertConfig.__table__])
+    yield engine
+    engine.dispose()
+
+
+def test_guid_keys_round_trip_as_strings_on_sqlite(engine):
+    site_id = uuid.uuid4()
+    with Session(engine) as db:
+        # Upper case, uuid.UUID and canonical strings are all accepted
+        db.add(Site(id=str(site_id).upper(), name="North", location="", latitude=46.0, longitude=7.0))
+        db.flush()
+        db.add(AlertConfig(id=uuid.uuid4(), site_id=site_id, threshold=0.7))
+        db.commit()
+
+    with engine.connect() as conn:
+        stored = conn.execute(text("SELECT id, typeof(id), length(id) FROM sites")).one()
+    assert stored[1:] == ("blob", 16) and stored[0] == site_id.bytes
+
+    with Session(engine) as db:
+        site = db.get(Site, str(site_id))
+        config = db.execute(select(AlertConfig).where(AlertConfig.site_id == str(site_id))).scalar_one()
+    assert site.id == str(site_id)
+    assert config.site_id == site.id and isinstance(config.id, str)
+
+
+def test_guid_reads_rows_not_yet_converted(engine):
+    site_id = str(uuid.uuid4())
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO sites (id, name, location, latitude, longitude) VALUES (:id, 'Old', '', 46, 7)"
+        ), {"id": site_id})
+    with Session(engine) as db:
+        assert db.execute(select(Site.id)).scalar_one() == site_id
+
+
+def test_guid_binds_native_uuids_on_postgres():
+    guid = GUID()
+    value = uuid.uuid4()
+    assert guid.process_bind_param(str(value), postgresql.dialect()) == value
+    assert guid.process_result_value(value, postgresql.dialect()) == str(value)
+    assert guid.process_bind_param(None, postgresql.dialect()) is None
+    with pytest.raises(ValueError):
+        guid.process_bind_param("not-a-uuid", postgresql.dialect())
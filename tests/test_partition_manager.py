@@ -0,0 +1,34 @@
+# Partition maintenance: month arithmetic and the periodic job
+import threading
+from datetime import date
+
+from sqlalchemy import create_engine
+
+from services.database_service import partition_manager
+from services.database_service.partition_manager import add_months, partition_name
+
+
+def test_month_arithmetic_and_names():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name("predictions", date(2027, 2, 1)) == "predictions_p202702"
+
+
+def test_maintenance_keeps_running_after_a_failed_run(monkeypatch):
+    monkeypatch.setattr(partition_manager, "engine", create_engine("sqlite://"))
+    stop = threading.Event()
+    runs = []
+
+    def maintain(conn):
+        runs.append(conn.dialect.name)
+        if len(runs) == 1:
+            raise RuntimeError("lock timeout")
+        stop.set()
+
+    monkeypatch.setattr(partition_manager, "maintain_partitions", maintain)
+    partition_manager.run_maintenance(0.01, stop)
+    assert runs == ["sqlite", "sqlite"]
+
+
+def test_maintenance_can_be_disabled():
+    assert partition_manager.start_maintenance(0) is None
@@ -0,0 +1,119 @@
+# Gateway client for the prediction service: circuit breaker and hedging
+import threading
+import time
+
+import pytest
+import requests
+
+from services.api_gateway.scoring import (
+    CircuitBreaker, RemotePredictor, PredictionUnavailable, PredictionRequestError
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.text = str(body)
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    """Answers each POST with the next scripted behaviour"""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.calls.append(headers["Idempotency-Key"])
+            behaviour = self.behaviours.pop(0)
+        return behaviour(headers["Idempotency-Key"])
+
+
+def ok(delay=0.0):
+    def respond(prediction_id):
+        time.sleep(delay)
+        return FakeResponse(200, {
+            "id": prediction_id, "timestamp": "2024-01-01T00:00:00",
+            "probability": 0.9, "risk_level": "HIGH", "model_version": "v1"
+        })
+    return respond
+
+
+def status(code):
+    return lambda prediction_id: FakeResponse(code, {"detail": "nope"})
+
+
+def refuse(prediction_id):
+    raise requests.ConnectionError("refused")
+
+
+def make_client(session, breaker=None, hedge_delay=0.05, max_attempts=2):
+    return RemotePredictor(
+        "http://prediction", 1, 1, hedge_delay, max_attempts, 4,
+        breaker or CircuitBreaker(5, 30), session=session
+    )
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(2, 10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 11
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_slow_attempt_is_hedged_with_the_same_prediction_id():
+    session = FakeSession(ok(delay=0.5), ok())
+    prediction = make_client(session).predict("site")
+    assert len(session.calls) == 2
+    assert session.calls[0] == session.calls[1] == prediction["id"]
+
+
+def test_failed_attempt_is_retried():
+    session = FakeSession(refuse, ok())
+    assert make_client(session).predict("site")["risk_level"] == "HIGH"
+
+
+def test_client_errors_are_not_retried():
+    session = FakeSession(status(422), ok())
+    with pytest.raises(PredictionRequestError) as error:
+        make_client(session).predict("site")
+    assert error.value.status_code == 422
+    assert len(session.calls) == 1
+
+
+def test_open_circuit_fails_fast():
+    breaker = CircuitBreaker(2, 30)
+    client = make_client(FakeSession(status(503), status(503)), breaker=breaker)
+    with pytest.raises(PredictionUnavailable):
+        client.predict("site")
+    assert breaker.state == "open"
+    with pytest.raises(PredictionUnavailable):
+        client.predict("site")
+    assert len(client.session.calls) == 2
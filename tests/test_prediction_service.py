@@ -0,0 +1,141 @@
+# Prediction service writes: idempotent prediction ids, rollups and hub events
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from services.common.models import Base, Model, Prediction, PredictionKey, PredictionRollup, Site, SiteFeature
+from services.prediction_service import predictor
+from services.prediction_service.predictor import PredictionService
+
+
+class FakeModel:
+    def predict_proba(self, rows):
+        return np.array([[0.1, 0.9] for _ in rows])
+
+
+class RecordingHub:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, data):
+        self.events.append(data)
+        return len(self.events)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'predictions.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine, tables=[
+        Site.__table__, SiteFeature.__table__, Model.__table__, Prediction.__table__,
+        PredictionKey.__table__, PredictionRollup.__table__
+    ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def service(engine, monkeypatch):
+    @contextmanager
+    def get_db(read_only=False):
+        db = Session(engine)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    with Session(engine) as db:
+        site = Site(id=str(uuid.uuid4()), name="North", location="", latitude=46.0, longitude=7.0)
+        db.add(site)
+        db.flush()
+        db.add(SiteFeature(site_id=site.id, timestamp=datetime(2026, 10, 19, 11), rain_24h_mm=30.0))
+        db.commit()
+        site_id = site.id
+
+    hub = RecordingHub()
+    monkeypatch.setattr(predictor, "get_db", get_db)
+    monkeypatch.setattr(predictor, "prediction_hub", hub)
+    monkeypatch.setattr(PredictionService, "_load_latest_model", lambda self: None)
+
+    service = PredictionService()
+    service.model = FakeModel()
+    service.model_version = "v1"
+    service.feature_columns = ["rain_24h_mm"]
+    service.site_id = site_id
+    service.hub = hub
+    return service
+
+
+def stored(engine):
+    with Session(engine) as db:
+        return (
+            db.execute(select(func.count()).select_from(Prediction)).scalar_one(),
+            db.execute(
+                select(func.sum(PredictionRollup.prediction_count)).where(PredictionRollup.granularity == "day")
+            ).scalar_one()
+        )
+
+
+def test_a_repeated_prediction_id_returns_the_stored_prediction(engine, service):
+    prediction_id = str(uuid.uuid4())
+    first = service.predict(service.site_id, prediction_id)
+    again = service.predict(service.site_id, prediction_id)
+
+    assert again["id"] == first["id"] == prediction_id
+    assert again["probability"] == first["probability"] == 0.9
+    assert stored(engine) == (1, 1)
+    assert len(service.hub.events) == 1
+
+
+def test_a_claimed_id_skips_the_rollups_and_the_publish(engine, service, monkeypatch):
+    prediction_id = str(uuid.uuid4())
+    first = service.predict(service.site_id, prediction_id)
+
+    # An attempt that looked before the first one committed still loses the claim
+    lookup = service._existing_prediction
+    lookups = []
+
+    def existing_prediction(db, key):
+        lookups.append(key)
+        return None if len(lookups) == 1 else lookup(db, key)
+
+    monkeypatch.setattr(service, "_existing_prediction", existing_prediction)
+    assert service.predict(service.site_id, prediction_id)["id"] == first["id"]
+    assert len(lookups) == 2
+    assert stored(engine) == (1, 1)
+    assert len(service.hub.events) == 1
+
+
+def test_concurrent_attempts_with_one_id_store_one_prediction(engine, service):
+    prediction_id = str(uuid.uuid4())
+    barrier = threading.Barrier(4)
+    results = []
+
+    def attempt():
+        barrier.wait()
+        results.append(service.predict(service.site_id, prediction_id))
+
+    threads = [threading.Thread(target=attempt) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {result["id"] for result in results} == {prediction_id}
+    assert stored(engine) == (1, 1)
+    assert len(service.hub.events) == 1
+
+
+def test_predictions_without_an_id_are_all_stored(engine, service):
+    service.predict(service.site_id)
+    service.predict(service.site_id)
+
+    assert stored(engine) == (2, 2)
+    assert len(service.hub.events) == 2
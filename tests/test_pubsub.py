@@ -0,0 +1,149 @@
+# Prediction stream hub: filters, resume, overflow and the cross-process relay
+import asyncio
+import json
+import queue
+import threading
+from collections import defaultdict
+
+from services.common.pubsub import OVERFLOW, PredictionHub, RedisRelay
+
+
+def event(site_id="a", risk_level="HIGH", **extra):
+    return {"site_id": site_id, "risk_level": risk_level, **extra}
+
+
+class FakeBroker:
+    """Redis pub/sub in memory: every subscribed connection gets every message"""
+
+    def __init__(self):
+        self.channels = defaultdict(list)
+        self.lock = threading.Lock()
+        self.fail_next_subscribe = False
+
+    def client(self):
+        return FakeRedis(self)
+
+
+class FakeRedis:
+    def __init__(self, broker):
+        self.broker = broker
+
+    def publish(self, channel, message):
+        with self.broker.lock:
+            for inbox in self.broker.channels[channel]:
+                inbox.put({"type": "message", "channel": channel, "data": message.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self.broker)
+
+
+class FakePubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.inbox = queue.Queue()
+        self.channel = None
+
+    def subscribe(self, channel):
+        if self.broker.fail_next_subscribe:
+            self.broker.fail_next_subscribe = False
+            raise ConnectionError("broker restarting")
+        with self.broker.lock:
+            self.channel = channel
+            self.broker.channels[channel].append(self.inbox)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.inbox.get(timeout=min(timeout, 0.05))
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self.broker.lock:
+            if self.channel is not None:
+                self.broker.channels[self.channel].remove(self.inbox)
+
+
+async def receive(subscription, count, timeout=2.0):
+    received = []
+    for _ in range(count):
+        item = await subscription.get(timeout)
+        if item is None:
+            break
+        received.append(item if item is OVERFLOW else item["data"])
+    return received
+
+
+def test_subscribers_get_matching_events_and_resume_from_the_buffer():
+    hub = PredictionHub(buffer_size=3, queue_size=10)
+
+    async def scenario():
+        high_a = hub.subscribe(["a"], "HIGH")
+        everything = hub.subscribe()
+        for data in (event("a", "HIGH"), event("a", "LOW"), event("b", "HIGH")):
+            hub.publish(data)
+        live = (await receive(high_a, 1), await receive(everything, 3))
+
+        hub.publish(event("c"))
+        # Events 2-4 are buffered: resuming after 1 misses nothing, after 0 it does
+        resumed = hub.subscribe(last_event_id=1)
+        stale = hub.subscribe(last_event_id=0)
+        return live, await receive(resumed, 3), resumed.gap, stale.gap
+
+    (high_a, everything), resumed, resumed_gap, stale_gap = asyncio.run(scenario())
+    assert high_a == [event("a", "HIGH")]
+    assert len(everything) == 3
+    assert [data["site_id"] for data in resumed] == ["a", "b", "c"]
+    assert not resumed_gap
+    assert stale_gap
+
+
+def test_a_slow_subscriber_is_cut_off_instead_of_buffering():
+    hub = PredictionHub(buffer_size=10, queue_size=2)
+
+    async def scenario():
+        subscription = hub.subscribe()
+        for _ in range(4):
+            hub.publish(event())
+        await asyncio.sleep(0)
+        return await receive(subscription, 3)
+
+    assert asyncio.run(scenario())[-1] is OVERFLOW
+
+
+def test_the_relay_fans_events_out_to_other_processes_once():
+    broker = FakeBroker()
+    # The prediction service publishes but has no stream subscribers
+    service = PredictionHub(10, 10, RedisRelay(client=broker.client()))
+    gateways = [PredictionHub(10, 10, RedisRelay(client=broker.client(), retry_seconds=0.01)) for _ in range(2)]
+    broker.fail_next_subscribe = True
+
+    async def scenario():
+        subscriptions = [gateway.subscribe() for gateway in gateways]
+        # Wait until both listeners (one after a failed connect) are subscribed
+        while sum(len(inboxes) for inboxes in broker.channels.values()) < 2:
+            await asyncio.sleep(0.01)
+
+        service.publish(event("a", prediction_id="from-service"))
+        gateways[0].publish(event("b", prediction_id="from-gateway"))
+        return [await receive(subscription, 3, timeout=0.5) for subscription in subscriptions]
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        for hub in gateways:
+            hub.relay.stop()
+
+    # The publishing gateway delivers its own event locally, not a second time from the broker
+    assert sorted(data["prediction_id"] for data in first) == ["from-gateway", "from-service"]
+    assert sorted(data["prediction_id"] for data in second) == ["from-gateway", "from-service"]
+
+
+def test_relayed_events_are_json():
+    broker = FakeBroker()
+    inbox = queue.Queue()
+    broker.channels["rockfall:predictions"].append(inbox)
+    relay = RedisRelay(client=broker.client())
+
+    relay.send(event(probability=0.5))
+    message = json.loads(inbox.get_nowait()["data"])
+    assert message == {"origin": relay.origin, "data": event(probability=0.5)}
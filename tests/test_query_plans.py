@@ -0,0 +1,150 @@
+# Query-plan regression tests for the hot read paths
+#
+# Seeds a synthetic dataset and asserts through EXPLAIN that each hot query
+# is answered from an index. Runs against a temporary SQLite file by
+# default; set TEST_DATABASE_URL to check a scratch Postgres database too.
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, select, text
+
+from services.alert_manager.throttle import warm_query
+from services.api_gateway.history import DEFAULT_FIELDS, history_page_query
+from services.common.models import Base, Site, Prediction, Alert, Model
+
+SITES = 50
+PREDICTIONS = 60000
+ALERTS = 20000
+MODELS = 2000
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    url = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    site_ids = [str(uuid.uuid4()) for _ in range(SITES)]
+
+    with engine.begin() as conn:
+        conn.execute(Site.__table__.insert(), [
+            {"id": site_id, "name": f"site-{i}", "location": "test", "latitude": 0.0, "longitude": 0.0}
+            for i, site_id in enumerate(site_ids)
+        ])
+        conn.execute(Prediction.__table__.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "site_id": rng.choice(site_ids),
+                "timestamp": now - timedelta(minutes=i),
+                "probability": rng.random(),
+                "risk_level": rng.choice(["LOW", "MEDIUM", "HIGH"])
+            }
+            for i in range(PREDICTIONS)
+        ])
+        conn.execute(Alert.__table__.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "site_id": rng.choice(site_ids),
+                "risk_level": rng.choice(["MEDIUM", "HIGH"]),
+                "status": rng.choice(["sent", "sent", "failed", "pending"]),
+                "created_at": now - timedelta(minutes=i)
+            }
+            for i in range(ALERTS)
+        ])
+        conn.execute(Model.__table__.insert(), [
+            {
+                "id": str(uuid.uuid4()),
+                "name": "rockfall",
+                "version": f"v{i}",
+                "trained_at": now - timedelta(hours=i),
+                # Most models are retired, as in production
+                "status": "active" if i % 200 == 0 else "archived"
+            }
+            for i in range(MODELS)
+        ])
+        conn.execute(text("ANALYZE"))
+
+    engine.site_id = site_ids[0]
+    engine.now = now
+    yield engine
+
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def explain(engine, statement) -> str:
+    """Plan text for a SQLAlchemy statement, with its parameters bound as the app would"""
+    sqlite = engine.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+
+    with engine.connect() as conn:
+        def add_prefix(conn, cursor, statement, parameters, context, executemany):
+            return prefix + statement, parameters
+
+        event.listen(conn, "before_cursor_execute", add_prefix, retval=True)
+        rows = conn.execute(statement).cursor.fetchall()
+
+    if sqlite:
+        return "\n".join(row[3] for row in rows)
+    return "\n".join(row[0] for row in rows)
+
+
+def assert_index_scan(engine, plan: str, table: str, index: str):
+    if engine.dialect.name == "sqlite":
+        assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, plan
+        assert f"SCAN {table}" not in plan, plan
+    else:
+        assert "Index" in plan, plan
+        assert "Seq Scan" not in plan, plan
+
+
+def test_latest_predictions_use_site_timestamp_index(engine):
+    statement = (
+        select(Prediction)
+        .where(Prediction.site_id == engine.site_id)
+        .order_by(Prediction.timestamp.desc())
+        .limit(100)
+    )
+    plan = explain(engine, statement)
+    assert_index_scan(engine, plan, "predictions", "idx_predictions_site_id_timestamp")
+    if engine.dialect.name == "sqlite":
+        assert "USE TEMP B-TREE FOR ORDER BY" not in plan, plan
+
+
+def test_history_keyset_page_uses_site_timestamp_index(engine):
+    statement = history_page_query(
+        engine.site_id,
+        engine.now - timedelta(days=30),
+        engine.now,
+        DEFAULT_FIELDS,
+        500,
+        after=(engine.now - timedelta(days=1), str(uuid.uuid4()))
+    )
+    plan = explain(engine, statement)
+    assert_index_scan(engine, plan, "predictions", "idx_predictions_site_id_timestamp")
+
+
+def test_alert_throttle_warm_up_uses_throttle_index(engine):
+    plan = explain(engine, warm_query(engine.now - timedelta(minutes=120)))
+    # Reads every site's latest alert, so an index scan is expected rather than a search
+    assert "idx_alerts_throttle" in plan, plan
+    if engine.dialect.name != "sqlite":
+        assert "Seq Scan" not in plan, plan
+
+
+def test_active_model_lookup_uses_status_index(engine):
+    # Same query as PredictionService._load_latest_model
+    statement = (
+        select(Model)
+        .where(Model.status == "active")
+        .order_by(Model.trained_at.desc())
+        .limit(1)
+    )
+    plan = explain(engine, statement)
+    assert_index_scan(engine, plan, "models", "idx_models_status_trained_at")
@@ -0,0 +1,105 @@
+# Response cache: validators, 304s, body reuse and invalidation
+from typing import List
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from services.api_gateway.cache import LRUBackend, ResponseCache
+from services.api_gateway.schemas import DownsampledPoint
+from services.common.pubsub import PredictionHub
+
+SITE = "2f1c4a8e-0000-4000-8000-000000000001"
+
+
+class Markers:
+    """Latest prediction per site, as the marker loader sees it"""
+
+    def __init__(self):
+        self.latest = {SITE: {"id": "p1", "timestamp": "2026-10-19T12:00:00"}}
+        self.loads = 0
+
+    def __call__(self, site_id):
+        self.loads += 1
+        return self.latest.get(site_id)
+
+
+def make_client(cache, computed):
+    app = FastAPI()
+
+    @app.get("/sites/{site_id}/latest")
+    def latest(request: Request, site_id: str, fields: str = "", day: str = ""):
+        def compute():
+            computed.append(fields)
+            return {"fields": fields, "marker": cache.marker_loader(site_id)["id"]}
+        return cache.respond(request, site_id, compute, vary=day)
+
+    return TestClient(app)
+
+
+def setup():
+    markers = Markers()
+    cache = ResponseCache(LRUBackend(100), ttl=300, marker_ttl=10, marker_loader=markers)
+    computed = []
+    return markers, cache, computed, make_client(cache, computed)
+
+
+def test_a_current_etag_gets_304_and_bodies_are_reused():
+    markers, cache, computed, client = setup()
+    first = client.get(f"/sites/{SITE}/latest")
+    assert first.status_code == 200 and first.headers["Last-Modified"] == "Mon, 19 Oct 2026 12:00:00 GMT"
+
+    etag = first.headers["ETag"]
+    assert client.get(f"/sites/{SITE}/latest", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/sites/{SITE}/latest").json() == first.json()
+    assert computed == [""]
+
+
+def test_validators_differ_by_query_and_vary():
+    markers, cache, computed, client = setup()
+    plain = client.get(f"/sites/{SITE}/latest")
+    projected = client.get(f"/sites/{SITE}/latest", params={"fields": "probability"})
+    tomorrow = client.get(f"/sites/{SITE}/latest", params={"day": "2026-10-20"})
+    assert len({plain.headers["ETag"], projected.headers["ETag"], tomorrow.headers["ETag"]}) == 3
+
+    # Same marker, so the same Last-Modified: it must not validate another response
+    since = plain.headers["Last-Modified"]
+    for params in ({"fields": "probability"}, {"day": "2026-10-21"}, {}):
+        response = client.get(f"/sites/{SITE}/latest", params=params, headers={"If-Modified-Since": since})
+        assert response.status_code == 200
+    assert client.get(
+        f"/sites/{SITE}/latest", params={"fields": "probability"}, headers={"If-None-Match": plain.headers["ETag"]}
+    ).status_code == 200
+
+
+def test_events_from_the_hub_invalidate_the_site():
+    markers, cache, computed, client = setup()
+    hub = PredictionHub(10, 10)
+    cache.follow(hub)
+
+    etag = client.get(f"/sites/{SITE}/latest").headers["ETag"]
+    markers.latest[SITE] = {"id": "p2", "timestamp": "2026-10-19T12:05:00"}
+    # Until told, the cached marker stands
+    assert client.get(f"/sites/{SITE}/latest", headers={"If-None-Match": etag}).status_code == 304
+
+    # A prediction stored by another process arrives as a (relayed) event
+    hub.deliver({"site_id": SITE, "risk_level": "LOW"})
+    response = client.get(f"/sites/{SITE}/latest", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["marker"] == "p2" and response.headers["ETag"] != etag
+
+
+def test_bodies_are_shaped_by_the_response_schema():
+    markers = Markers()
+    cache = ResponseCache(LRUBackend(100), ttl=300, marker_ttl=10, marker_loader=markers)
+    app = FastAPI()
+
+    @app.get("/sites/{site_id}/points")
+    def points(request: Request, site_id: str):
+        return cache.respond(request, site_id, lambda: [
+            {"bucket_start": "2026-10-19T12:00:00", "count": "3", "avg_probability": 0.5, "max_probability": 0.9,
+             "internal": "not part of the schema"}
+        ], schema=List[DownsampledPoint])
+
+    assert TestClient(app).get(f"/sites/{SITE}/points").json() == [
+        {"bucket_start": "2026-10-19T12:00:00", "count": 3, "avg_probability": 0.5, "max_probability": 0.9}
+    ]
@@ -0,0 +1,151 @@
+# Retention: Parquet export, delete and checkpointed resume on SQLite
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import pandas as pd
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+from services.common.models import Base, Alert, AlertOutbox, Model, Prediction, Site
+from services.database_service import retention
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+
+    # Enforce foreign keys as Postgres does
+    @event.listens_for(engine, "connect")
+    def enable_foreign_keys(connection, record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine, tables=[
+        Site.__table__, Model.__table__, Prediction.__table__, Alert.__table__, AlertOutbox.__table__
+    ])
+    monkeypatch.setattr(retention, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def add_site(db):
+    site = Site(id=str(uuid.uuid4()), name="North", location="", latitude=46.0, longitude=7.0)
+    db.add(site)
+    db.flush()
+    return site.id
+
+
+def add_alert(db, site_id, status, age_days, outbox_status=None):
+    alert = Alert(id=str(uuid.uuid4()), site_id=site_id, risk_level="HIGH", status=status,
+        channels=["email"], created_at=NOW - timedelta(days=age_days))
+    db.add(alert)
+    db.flush()
+    if outbox_status:
+        db.add(AlertOutbox(alert_id=alert.id, channel="email", recipient="ops@example.org", body="HIGH risk",
+            status=outbox_status, created_at=alert.created_at))
+    return alert.id
+
+
+def archive(table, tmp_path, hot_days=30, batch_size=2):
+    return retention.archive_table(table, hot_days, tmp_path / "archive", tmp_path / "checkpoints", batch_size, now=NOW)
+
+
+def test_alerts_are_archived_after_their_outbox_rows(engine, tmp_path):
+    with Session(engine) as db:
+        site_id = add_site(db)
+        delivered = add_alert(db, site_id, "sent", 90, outbox_status="sent")
+        retrying = add_alert(db, site_id, "sent", 90, outbox_status="pending")
+        recent = add_alert(db, site_id, "sent", 1, outbox_status="sent")
+        db.commit()
+
+    tables = list(retention.RETENTION_TABLES)
+    assert tables.index("alert_outbox") < tables.index("alerts")
+
+    assert archive("alert_outbox", tmp_path)["rows_archived"] == 1
+    assert archive("alerts", tmp_path)["rows_archived"] == 1
+
+    with Session(engine) as db:
+        assert set(db.execute(select(Alert.id)).scalars()) == {retrying, recent}
+        assert db.execute(select(AlertOutbox.status).where(AlertOutbox.alert_id == retrying)).scalar_one() == "pending"
+
+    archived = pd.read_parquet(tmp_path / "archive" / "alerts")
+    assert archived["id"].tolist() == [delivered]
+
+
+def add_predictions(db, site_id, ages_days):
+    ids = []
+    for age in ages_days:
+        prediction = Prediction(id=str(uuid.uuid4()), site_id=site_id, timestamp=NOW - timedelta(days=age),
+            probability=0.25, risk_level="LOW", features_snapshot={"rain_1h_mm": age})
+        db.add(prediction)
+        ids.append(prediction.id)
+    db.commit()
+    return ids
+
+
+def remaining_predictions(engine):
+    with Session(engine) as db:
+        return set(db.execute(select(Prediction.id)).scalars())
+
+
+def test_old_rows_are_exported_by_month_then_deleted(engine, tmp_path):
+    with Session(engine) as db:
+        site_id = add_site(db)
+        old = add_predictions(db, site_id, [31, 45, 75, 80])
+        recent = add_predictions(db, site_id, [1, 29])
+
+    result = archive("predictions", tmp_path)
+    assert result["rows_archived"] == result["total_archived"] == 4
+    assert remaining_predictions(engine) == set(recent)
+
+    months = sorted(path.relative_to(tmp_path / "archive" / "predictions").parts[:2]
+        for path in (tmp_path / "archive" / "predictions").rglob("*.parquet"))
+    assert sorted(set(months)) == [("year=2026", "month=07"), ("year=2026", "month=08"), ("year=2026", "month=09")]
+
+    archived = pd.read_parquet(tmp_path / "archive" / "predictions")
+    assert sorted(archived["id"]) == sorted(old)
+    assert sorted(archived["features_snapshot"]) == sorted(f'{{"rain_1h_mm": {age}}}' for age in [31, 45, 75, 80])
+
+    # Nothing left to archive
+    assert archive("predictions", tmp_path)["rows_archived"] == 0
+
+
+def test_an_interrupted_run_resumes_with_its_cutoff_and_no_duplicates(engine, tmp_path, monkeypatch):
+    with Session(engine) as db:
+        site_id = add_site(db)
+        old = add_predictions(db, site_id, [40, 39, 38, 37, 36])
+        # Ages past the cutoff before the resumed run, but was hot when the run started
+        borderline = add_predictions(db, site_id, [29.5])
+
+    write = retention.write_parquet
+    calls = []
+
+    def failing_write(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise OSError("archive volume full")
+        return write(*args)
+
+    monkeypatch.setattr(retention, "write_parquet", failing_write)
+    with pytest.raises(OSError):
+        archive("predictions", tmp_path)
+
+    # The first batch is archived and gone; the failed one rolled back
+    assert remaining_predictions(engine) == set(old[2:] + borderline)
+    state = retention.RetentionCheckpoint(tmp_path / "checkpoints", "predictions").load()
+    assert (state["complete"], state["rows_archived"], state["last_id"]) == (False, 2, old[1])
+
+    monkeypatch.setattr(retention, "write_parquet", write)
+    result = retention.archive_table("predictions", 30, tmp_path / "archive", tmp_path / "checkpoints", 2,
+        now=NOW + timedelta(days=1))
+    assert result["cutoff"] == (NOW - timedelta(days=30)).isoformat()
+    assert (result["rows_archived"], result["total_archived"]) == (3, 5)
+    assert remaining_predictions(engine) == set(borderline)
+
+    archived = pd.read_parquet(tmp_path / "archive" / "predictions")
+    assert sorted(archived["id"]) == sorted(old)
@@ -0,0 +1,153 @@
+# Incremental rollups against rebuilds from raw rows, the drift check and daily stats
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import case, create_engine, func, select, update
+from sqlalchemy.orm import Session
+
+from services.common.models import Base, FeatureRollup, Prediction, PredictionRollup, Site, SiteFeature
+from services.common import rollups
+from services.data_collector.feature_store import bulk_upsert_site_features, upsert_site_features
+
+START = datetime(2026, 10, 18, 22, 0)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    Base.metadata.create_all(engine, tables=[
+        Site.__table__, SiteFeature.__table__, Prediction.__table__,
+        PredictionRollup.__table__, FeatureRollup.__table__
+    ])
+    with engine.begin() as conn:
+        conn.execute(Site.__table__.insert().values(
+            id=str(uuid.uuid4()), name="North", location="", latitude=46.0, longitude=7.0
+        ))
+    yield engine
+    engine.dispose()
+
+
+def site_id(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(Site.__table__.c.id)).scalar_one()
+
+
+def snapshot(engine, table):
+    with engine.connect() as conn:
+        rows = conn.execute(select(table)).all()
+    return sorted(
+        tuple(round(value, 9) if isinstance(value, float) else value for key, value in row._mapping.items() if key != "id")
+        for row in rows
+    )
+
+
+def assert_matches_rebuild(engine, table, rebuild):
+    incremental = snapshot(engine, table)
+    with engine.begin() as conn:
+        rebuild(conn)
+    assert incremental == snapshot(engine, table)
+    assert incremental
+
+
+def test_upserts_and_replays_replace_samples_instead_of_adding_them(engine):
+    site = site_id(engine)
+    with engine.begin() as conn:
+        for minutes in range(0, 180, 15):
+            timestamp = START + timedelta(minutes=minutes)
+            upsert_site_features(conn, site, timestamp, {"rain_1h_mm": 1.0, "temperature_c": 4.0}, "weather")
+            upsert_site_features(conn, site, timestamp, {"max_magnitude_72h": 2.5}, "seismic")
+        # The weather collector re-reads one bucket and corrects it
+        upsert_site_features(conn, site, START, {"rain_1h_mm": 9.0, "temperature_c": -1.0}, "weather")
+
+    with engine.begin() as conn:
+        rows = [
+            {"site_id": site, "timestamp": START + timedelta(minutes=minutes), "rain_1h_mm": 2.0, "humidity_pct": 80.0}
+            for minutes in range(60, 240, 15)
+        ]
+        # A backfill chunk replayed after a crash
+        bulk_upsert_site_features(conn, rows, "backfill")
+        bulk_upsert_site_features(conn, rows, "backfill")
+
+    with engine.connect() as conn:
+        assert rollups.check_feature_rollups(conn) == []
+        day = conn.execute(select(FeatureRollup.__table__).where(
+            FeatureRollup.granularity == "day", FeatureRollup.feature == "rain_1h_mm",
+            FeatureRollup.bucket_start == START.replace(hour=0)
+        )).one()
+    # 22:00 corrected to 9.0, 22:15-22:45 at 1.0, 23:00-23:45 replaced by the backfill's 2.0
+    assert (day.sample_count, day.value_sum, day.value_min, day.value_max) == (8, 9.0 + 3 + 8.0, 1.0, 9.0)
+
+    assert_matches_rebuild(engine, FeatureRollup.__table__, rollups.rebuild_feature_rollups)
+
+
+def test_prediction_increments_match_a_rebuild(engine):
+    site = site_id(engine)
+    rows = [
+        {
+            "id": str(uuid.uuid4()), "site_id": site, "timestamp": START + timedelta(minutes=20 * i),
+            "probability": i / 10, "risk_level": "HIGH" if i >= 7 else "LOW"
+        }
+        for i in range(10)
+    ]
+    with engine.begin() as conn:
+        for row in rows:
+            conn.execute(Prediction.__table__.insert().values(**row))
+            rollups.record_predictions(conn, [row])
+
+    with engine.connect() as conn:
+        assert rollups.check_prediction_rollups(conn) == []
+    assert_matches_rebuild(engine, PredictionRollup.__table__, rollups.rebuild_prediction_rollups)
+
+
+def test_drift_is_reported_per_site_and_day(engine):
+    site = site_id(engine)
+    with engine.begin() as conn:
+        upsert_site_features(conn, site, START, {"rain_1h_mm": 1.0}, "weather")
+        conn.execute(
+            update(FeatureRollup.__table__)
+            .where(FeatureRollup.granularity == "day")
+            .values(sample_count=FeatureRollup.sample_count + 1)
+        )
+
+    with engine.connect() as conn:
+        drift = rollups.check_feature_rollups(conn)
+    assert [(entry["day"], entry["feature"], entry["actual"]["count"]) for entry in drift] == [
+        (START.replace(hour=0), "rain_1h_mm", 2)
+    ]
+
+
+@pytest.mark.parametrize("days", [1, 2, 5, 30])
+def test_daily_stats_match_the_raw_query(engine, days):
+    site = site_id(engine)
+    today = datetime(2026, 10, 19, 9, 30)
+    rows = [
+        {
+            "id": str(uuid.uuid4()), "site_id": site, "timestamp": today - timedelta(hours=7 * i),
+            "probability": (i % 10) / 10, "risk_level": "HIGH" if i % 10 >= 7 else "LOW"
+        }
+        for i in range(80)
+    ]
+    with engine.begin() as conn:
+        conn.execute(Prediction.__table__.insert(), rows)
+        rollups.record_predictions(conn, rows)
+
+    with Session(engine) as db:
+        stats = rollups.daily_prediction_stats(db, site, days, today=today)
+        predictions = Prediction.__table__
+        raw = db.execute(
+            select(
+                func.count(),
+                func.avg(predictions.c.probability),
+                func.sum(case((predictions.c.risk_level == "HIGH", 1), else_=0))
+            ).where(
+                predictions.c.site_id == site,
+                # Calendar days: from midnight `days - 1` days ago
+                predictions.c.timestamp >= datetime(2026, 10, 19) - timedelta(days=days - 1)
+            )
+        ).one()
+
+    assert stats["window_start"] == datetime(2026, 10, 19) - timedelta(days=days - 1)
+    assert stats["total_predictions"] == raw[0] > 0
+    assert stats["average_probability"] == pytest.approx(raw[1])
+    assert stats["high_risk_count"] == raw[2]
@@ -0,0 +1,142 @@
+# Risk-adaptive collection scheduler: tiering, phase spread, re-tiering and initial tiers
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from services.common.config import get_settings
+from services.common.models import Base, Prediction, Site, SiteFeature
+from services.data_collector import scheduler as scheduler_module
+from services.data_collector.scheduler import RiskAdaptiveScheduler, load_active_sites
+
+settings = get_settings()
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_scheduler(collect_fn=lambda site_id: None):
+    clock = FakeClock()
+    return RiskAdaptiveScheduler(collect_fn, clock=clock, sleep=clock.sleep), clock
+
+
+def test_tiers_follow_risk_first_then_conditions():
+    scheduler, _ = make_scheduler()
+    assert scheduler.classify(risk_level="high", rain_1h_mm=0) == "high"
+    assert scheduler.classify(risk_level="MEDIUM") == "elevated"
+    assert scheduler.classify(risk_level="LOW", rain_1h_mm=settings.COLLECT_RAIN_INTENSITY_MM_H) == "elevated"
+    assert scheduler.classify(max_magnitude_72h=settings.COLLECT_SEISMIC_MAGNITUDE) == "elevated"
+    assert scheduler.classify(risk_level="LOW", rain_1h_mm=0.1) == "quiet"
+    assert scheduler.classify() == "default"
+
+
+def test_each_tier_polls_faster_than_the_next():
+    scheduler, _ = make_scheduler()
+    intervals = scheduler.intervals
+    assert intervals["high"] < intervals["elevated"] < intervals["default"] < intervals["quiet"]
+
+
+def test_sites_are_spread_over_their_first_interval():
+    scheduler, _ = make_scheduler()
+    scheduler.sync_sites([(str(uuid.uuid4()), f"site {i}", None) for i in range(200)])
+
+    interval = scheduler.intervals["default"]
+    due = sorted(schedule.due_at for schedule in scheduler.sites.values())
+    assert 0 <= due[0] and due[-1] < interval
+    # No tenth of the interval holds more than a fair share plus slack
+    slots = [0] * 10
+    for due_at in due:
+        slots[int(due_at / interval * 10)] += 1
+    assert max(slots) < 40
+
+
+def test_collections_re_tier_sites_and_drop_deactivated_ones():
+    observations = {"a": {"risk_level": "HIGH"}, "b": {"risk_level": "LOW", "rain_1h_mm": 0.0}}
+    collected = []
+
+    def collect(site_id):
+        collected.append(site_id)
+        return observations[site_id]
+
+    scheduler, clock = make_scheduler(collect)
+    scheduler.sync_sites([("a", "A", None), ("b", "B", None)])
+    clock.sleep(scheduler.intervals["default"])
+    assert scheduler.run_pending() == 2
+    assert scheduler.sites["a"].tier == "high" and scheduler.sites["b"].tier == "quiet"
+
+    scheduler.sync_sites([("a", "A", None)])
+    clock.sleep(scheduler.intervals["quiet"])
+    collected.clear()
+    scheduler.run_pending()
+    # Only "a" remains; the stale heap entry of "b" is skipped
+    assert collected == ["a"]
+
+
+def test_a_failed_collection_keeps_the_site_scheduled():
+    def collect(site_id):
+        raise RuntimeError("weather API down")
+
+    scheduler, clock = make_scheduler(collect)
+    scheduler.sync_sites([("a", "A", {"risk_level": "HIGH"})])
+    clock.sleep(scheduler.intervals["high"])
+    scheduler.run_pending()
+    assert scheduler.sites["a"].tier == "high"
+    assert scheduler.next_due() == pytest.approx(clock.now + scheduler.intervals["high"])
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Site.__table__, SiteFeature.__table__, Prediction.__table__])
+
+    @contextmanager
+    def get_db(read_only=False):
+        with Session(engine) as db:
+            yield db
+
+    monkeypatch.setattr(scheduler_module, "get_db", get_db)
+    yield engine
+    engine.dispose()
+
+
+def add_site(conn, name, predictions=(), rain_1h_mm=None):
+    site_id = str(uuid.uuid4())
+    conn.execute(Site.__table__.insert().values(id=site_id, name=name, location="", latitude=46.0, longitude=7.0))
+    for age_hours, risk_level in predictions:
+        conn.execute(Prediction.__table__.insert().values(
+            id=str(uuid.uuid4()), site_id=site_id, timestamp=NOW - timedelta(hours=age_hours),
+            probability=0.5, risk_level=risk_level
+        ))
+    if rain_1h_mm is not None:
+        conn.execute(SiteFeature.__table__.insert().values(
+            id=str(uuid.uuid4()), site_id=site_id, timestamp=NOW, rain_1h_mm=rain_1h_mm
+        ))
+    return site_id
+
+
+def test_initial_tiers_come_from_the_latest_prediction(engine):
+    with engine.begin() as conn:
+        sites = {
+            "was_high": add_site(conn, "was high", [(1, "LOW"), (5, "HIGH")]),
+            "now_high": add_site(conn, "now high", [(1, "HIGH"), (5, "LOW")], rain_1h_mm=0.0),
+            "medium": add_site(conn, "medium", [(2, "MEDIUM")]),
+            "unknown": add_site(conn, "unknown")
+        }
+
+    scheduler, _ = make_scheduler()
+    scheduler.sync_sites(load_active_sites())
+    tiers = {name: scheduler.sites[site_id].tier for name, site_id in sites.items()}
+    assert tiers == {"was_high": "quiet", "now_high": "high", "medium": "elevated", "unknown": "default"}
@@ -0,0 +1,153 @@
+# Bulk site import: streaming readers, validation and proximity dedup
+import io
+import json
+
+import pytest
+from sqlalchemy.pool import StaticPool
+
+pytest.importorskip("shapely")
+
+from services.database_service.site_import import (
+    ProximityIndex, detect_format, distance_m, read_csv, read_geojson, to_site_record
+)
+
+
+class TrickleStream(io.StringIO):
+    """Hands out a few characters per read to split values across buffer refills"""
+
+    def read(self, size=-1):
+        return super().read(5)
+
+
+def feature(name, coordinates, geometry_type="Point"):
+    return {"type": "Feature", "properties": {"name": name}, "geometry": {"type": geometry_type, "coordinates": coordinates}}
+
+
+def test_geojson_features_stream_across_small_reads():
+    document = {
+        "type": "FeatureCollection",
+        "crs": {"type": "name", "properties": {"name": "EPSG:4326"}},
+        "features": [feature(f"site {i}", [7.123456 + i, 46.0]) for i in range(20)],
+        "bbox": [7, 46, 27, 46]
+    }
+    rows = list(read_geojson(TrickleStream(json.dumps(document))))
+
+    assert [row for row, _, _ in rows] == list(range(1, 21))
+    assert rows[-1][1] == {"name": "site 19"}
+    assert rows[-1][2].x == pytest.approx(26.123456)
+
+
+def test_csv_reads_coordinate_aliases_and_wkt():
+    text = "Name,Lat,Lng,geometry\nA,46.5,7.5,\nB,,,POINT (8 47)\nC,oops,7,\n"
+    rows = list(read_csv(io.StringIO(text)))
+
+    assert rows[0][0] == 2
+    assert (rows[0][2].x, rows[0][2].y) == (7.5, 46.5)
+    assert (rows[1][2].x, rows[1][2].y) == (8, 47)
+    assert rows[2][2].startswith("unreadable geometry")
+
+
+def test_validation_rejects_bad_rows_with_reasons():
+    from shapely.geometry import LineString, Point, Polygon
+
+    bowtie = Polygon([(0, 0), (1, 1), (1, 0), (0, 1)])
+    with pytest.raises(ValueError, match="Self-intersection"):
+        to_site_record(1, {"name": "a"}, bowtie)
+    with pytest.raises(ValueError, match="unsupported geometry"):
+        to_site_record(1, {"name": "a"}, LineString([(0, 0), (1, 1)]))
+    with pytest.raises(ValueError, match="out of range"):
+        to_site_record(1, {"name": "a"}, Point(500000, 5100000))
+    with pytest.raises(ValueError, match="missing name"):
+        to_site_record(1, {}, Point(7, 46))
+
+    square = Polygon([(7, 46), (7.01, 46), (7.01, 46.01), (7, 46.01)])
+    record = to_site_record(3, {"name": "slope", "threshold": "0.6"}, square)
+    assert 7 < record.longitude < 7.01 and 46 < record.latitude < 46.01
+    assert record.threshold == 0.6
+    assert to_site_record(4, {"name": "peak"}, Point(7, 46, 2100)).elevation == 2100
+
+
+def test_proximity_index_finds_neighbours_at_high_latitude():
+    index = ProximityIndex(50)
+    index.add(78.0, 15.0, "svalbard")
+
+    # ~40 m east spans several grid cells this far north
+    east = 15.0 + 40 / (111_320 * 0.2079)
+    assert distance_m(78.0, 15.0, 78.0, east) == pytest.approx(40, rel=0.01)
+    assert index.find(78.0, east) == "svalbard"
+    assert index.find(78.001, 15.0) is None
+
+
+def test_detect_format_from_extension():
+    assert detect_format("sites.GeoJSON") == "geojson"
+    assert detect_format("sites.gpkg") == "gpkg"
+    with pytest.raises(ValueError):
+        detect_format("sites.xlsx")
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    from sqlalchemy import create_engine
+    from services.common.models import AlertConfig, Base, Site
+    from services.database_service import site_import
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Site.__table__, AlertConfig.__table__])
+    monkeypatch.setattr(site_import, "engine", engine)
+    return engine
+
+
+def truncated_geojson(count):
+    text = json.dumps({"type": "FeatureCollection", "features": [feature(f"site {i}", [7 + i, 46.0]) for i in range(count)]})
+    # Cut into the last feature
+    return text[:-20]
+
+
+def site_count(engine):
+    from sqlalchemy import func, select
+    from services.common.models import Site
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Site.__table__)).scalar()
+
+
+def test_a_file_breaking_off_after_committed_chunks_gets_a_partial_summary(engine):
+    from services.database_service.site_import import import_sites
+
+    summary = import_sites(read_geojson(io.StringIO(truncated_geojson(6))), chunk_size=2, dedupe_meters=0)
+
+    # Five complete features, the last of them written with the unfinished chunk
+    assert summary["created"] == 5 and summary["rows_read"] == 5
+    assert summary["error"].startswith("Stopped after row 5: Malformed GeoJSON")
+    assert site_count(engine) == 5
+
+
+def test_a_file_unreadable_before_the_first_chunk_imports_nothing(engine):
+    from services.database_service.site_import import import_sites
+
+    with pytest.raises(ValueError, match="Malformed GeoJSON"):
+        import_sites(read_geojson(io.StringIO(truncated_geojson(3))), chunk_size=10, dedupe_meters=0)
+    assert site_count(engine) == 0
+
+
+def test_the_import_endpoint_invalidates_the_site_index_when_it_fails(engine, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from services.api_gateway.routers import sites
+    from services.api_gateway.site_index import site_index
+
+    app = FastAPI()
+    app.include_router(sites.router)
+    client = TestClient(app)
+
+    def upload(text):
+        return client.post("/api/sites/import", params={"chunk_size": 2, "dedupe_meters": 0},
+                           files={"file": ("sites.geojson", text.encode())})
+
+    invalidations = []
+    monkeypatch.setattr(site_index, "invalidate", lambda: invalidations.append(True))
+
+    response = upload(truncated_geojson(6))
+    assert response.status_code == 200 and response.json()["created"] == 5
+    assert response.json()["error"]
+    assert upload("{\"features\": [{").status_code == 400
+    assert len(invalidations) == 2
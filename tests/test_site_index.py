@@ -0,0 +1,123 @@
+# Gateway spatial index for the site risk map
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("shapely")
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from services.common.models import Base, Site, Model, Prediction
+from services.api_gateway.site_index import (
+    SiteIndex, build_snapshot, parse_bbox, risk_map, with_predictions, with_sites
+)
+
+
+def site(name, latitude, longitude):
+    return (str(uuid.uuid4()), name, latitude, longitude)
+
+
+def names(snapshot, positions):
+    return sorted(snapshot.names[position] for position in positions)
+
+
+def test_query_covers_tree_and_appended_sites_and_the_antimeridian():
+    snapshot = build_snapshot([site("alps", 46.0, 7.0), site("fiji", -17.0, 179.5)])
+    snapshot = with_sites(snapshot, [site("samoa", -13.8, -171.8), site("jura", 46.5, 6.5)])
+
+    # Appended sites are scanned until enough accumulate to rebuild the tree
+    assert snapshot.indexed == 2 and len(snapshot) == 4
+    assert names(snapshot, snapshot.query((6.0, 45.0, 8.0, 47.0))) == ["alps", "jura"]
+    assert names(snapshot, snapshot.query((170.0, -20.0, -170.0, -10.0))) == ["fiji", "samoa"]
+    assert with_sites(snapshot, [(snapshot.ids[0], "alps", 46.0, 7.0)]) is snapshot
+
+
+def test_only_newer_predictions_replace_a_sites_risk():
+    alps = site("alps", 46.0, 7.0)
+    now = datetime(2026, 10, 19, 12)
+    snapshot = with_predictions(build_snapshot([alps]), [(alps[0], now, 0.9, "HIGH")])
+    snapshot = with_predictions(snapshot, [(alps[0], now - timedelta(hours=1), 0.1, "LOW")])
+
+    marker = risk_map(snapshot, (0, 40, 10, 50), zoom=14)["sites"][0]
+    assert (marker["probability"], marker["risk_level"], marker["predicted_at"]) == (0.9, "HIGH", now)
+
+
+def test_low_zoom_clusters_nearby_sites_and_keeps_the_highest_risk():
+    rows = [site(f"valley {i}", 46.0 + i * 0.001, 7.0) for i in range(3)] + [site("andes", -33.0, -70.0)]
+    snapshot = with_predictions(build_snapshot(rows), [
+        (rows[0][0], datetime(2026, 10, 19), 0.2, "LOW"),
+        (rows[1][0], datetime(2026, 10, 19), 0.8, "HIGH")
+    ])
+
+    clustered = risk_map(snapshot, (-180, -85, 180, 85), zoom=3, cluster_max_zoom=11)
+    assert clustered["clustered"] and clustered["total"] == 4
+    assert [marker["name"] for marker in clustered["sites"]] == ["andes"]
+    [valley] = clustered["clusters"]
+    assert (valley["count"], valley["max_probability"], valley["risk_level"], valley["high_risk_count"]) == (3, 0.8, "HIGH", 1)
+
+    detailed = risk_map(snapshot, (-180, -85, 180, 85), zoom=14, cluster_max_zoom=11)
+    assert not detailed["clustered"] and len(detailed["sites"]) == 4
+
+    # Too many markers for the view: clustered anyway, coarsening as needed
+    capped = risk_map(snapshot, (-180, -85, 180, 85), zoom=14, cluster_max_zoom=11, max_items=2)
+    assert capped["clustered"] and len(capped["sites"]) + len(capped["clusters"]) <= 2
+
+
+def test_parse_bbox_rejects_malformed_views():
+    assert parse_bbox("170,-20,-170,-10") == (170.0, -20.0, -170.0, -10.0)
+    for value in ("1,2,3", "a,b,c,d", "0,50,10,40", "0,0,190,10", "nan,0,1,1"):
+        with pytest.raises(ValueError):
+            parse_bbox(value)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_refresh_merges_changes_and_reloads_after_deactivation():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Site.__table__, Model.__table__, Prediction.__table__])
+    sites, predictions = Site.__table__, Prediction.__table__
+
+    def add_site(name, latitude, longitude):
+        site_id = str(uuid.uuid4())
+        with engine.begin() as conn:
+            conn.execute(sites.insert(), [{
+                "id": site_id, "name": name, "location": "", "latitude": latitude, "longitude": longitude,
+                "is_active": True, "created_at": datetime.utcnow()
+            }])
+        return site_id
+
+    def add_prediction(site_id, probability, risk_level):
+        with engine.begin() as conn:
+            conn.execute(predictions.insert(), [{
+                "id": str(uuid.uuid4()), "site_id": site_id, "timestamp": datetime.utcnow(),
+                "probability": probability, "risk_level": risk_level
+            }])
+
+    alps = add_site("alps", 46.0, 7.0)
+    add_prediction(alps, 0.3, "LOW")
+    clock = FakeClock()
+    index = SiteIndex(session_factory=lambda: Session(engine), refresh_interval=10, clock=clock)
+    assert len(index.snapshot()) == 1
+
+    jura = add_site("jura", 46.5, 6.5)
+    add_prediction(alps, 0.9, "HIGH")
+    assert len(index.snapshot()) == 1
+    clock.now = 10
+    snapshot = index.snapshot()
+    assert len(snapshot) == 2 and snapshot.tree is not None and snapshot.indexed == 1
+    assert risk_map(snapshot, (0, 40, 10, 50), zoom=14)["sites"][0]["risk_level"] == "HIGH"
+
+    with engine.begin() as conn:
+        conn.execute(update(sites).where(sites.c.id == jura).values(is_active=False))
+    index.invalidate()
+    snapshot = index.snapshot()
+    assert list(snapshot.names) == ["alps"] and snapshot.probability[0] == 0.9
@@ -0,0 +1,80 @@
+# Pooled SMTP delivery against the local stand-in server
+import smtplib
+
+import pytest
+
+from services.alert_manager.smtp_pool import SMTPPool, build_message
+from services.alert_manager.smtp_standin import StandInSMTPServer
+
+
+def message(*recipients):
+    return build_message("Rockfall alert", "HIGH risk at Test Site", "alerts@example.org", recipients)
+
+
+def make_pool(server, **options):
+    return SMTPPool("127.0.0.1", server.port, "alerts", "secret", starttls=False, **options)
+
+
+def test_messages_share_one_authenticated_connection():
+    with StandInSMTPServer() as server:
+        pool = make_pool(server, size=2)
+        for _ in range(5):
+            assert pool.send(message("a@example.org", "b@example.org")) == {}
+        pool.close()
+
+    assert server.connections == 1
+    assert [recipients for recipients, _ in server.messages] == [("a@example.org", "b@example.org")] * 5
+
+
+def test_submitted_messages_run_on_at_most_size_connections():
+    with StandInSMTPServer(message_delay=0.01) as server:
+        pool = make_pool(server, size=3)
+        futures = [pool.submit(message(f"ops{i}@example.org")) for i in range(30)]
+        assert all(future.result(timeout=10) == {} for future in futures)
+        pool.close()
+
+    assert len(server.messages) == 30
+    assert server.connections <= 3
+
+
+def test_reconnects_when_the_server_ends_the_session():
+    with StandInSMTPServer(max_messages_per_connection=2) as server:
+        pool = make_pool(server, size=1)
+        for _ in range(5):
+            pool.send(message("a@example.org"))
+        pool.close()
+
+    assert len(server.messages) == 5
+    assert server.connections == 3
+
+
+def test_refused_recipients_are_reported_and_the_connection_kept():
+    with StandInSMTPServer() as server:
+        pool = make_pool(server, size=1)
+        refused = pool.send(message("a@example.org", "refused@example.org"))
+        assert list(refused) == ["refused@example.org"]
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.send(message("refused@example.org"))
+        pool.send(message("b@example.org"))
+        pool.close()
+
+    assert server.connections == 1
+    assert [recipients for recipients, _ in server.messages] == [("a@example.org",), ("b@example.org",)]
+
+
+def test_rotates_connections_at_the_message_cap():
+    with StandInSMTPServer() as server:
+        pool = make_pool(server, size=1, max_messages=2)
+        for _ in range(5):
+            pool.send(message("a@example.org"))
+        pool.close()
+
+    assert server.connections == 3
+
+
+def test_unreachable_server_fails_the_message():
+    with StandInSMTPServer() as server:
+        port = server.port
+    pool = SMTPPool("127.0.0.1", port, starttls=False, size=1, timeout=2)
+    with pytest.raises(OSError):
+        pool.send(message("a@example.org"))